@@ -0,0 +1,509 @@
+"""
+========================================
+ARCHIVO FRÍO DEL HISTORIAL DE AUDITORÍA
+========================================
+Guardar años de historial en 'historial_auditoria' hace más lentos el
+VACUUM, las copias de seguridad y la caché de PostgreSQL, aunque casi
+nunca se consulte.
+
+El archivador (python archivar_auditoria.py) MUEVE las filas más antiguas
+que AUDITORIA_DIAS_EN_CALIENTE a archivos comprimidos en disco local:
+
+    archivo_auditoria/
+        indice.json                    <- min/max de id, fecha e id_registro por segmento
+        segmento_000001_004812.seg     <- filas 1..4812
+        segmento_004813_051022.seg
+
+Cada segmento:
+- Es de solo escritura: se crea una vez y nunca se modifica.
+- Es "columnar": cada columna se comprime por separado, así para filtrar
+  por grupo o por tabla solo se descomprimen esas columnas.
+- Guarda las vistas COMPLETAS de antes/después (no depende de la base
+  de datos para reconstruirlas).
+
+Los endpoints de /auditoria leen la tabla y el archivo como si fueran
+uno solo (ver consultar_historial()).
+"""
+
+import json
+import logging
+import os
+import struct
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    import fcntl  # Bloqueo entre procesos (no existe en Windows)
+except ImportError:  # pragma: no cover - depende del sistema operativo
+    fcntl = None
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+
+from .auditoria_compacta import reconstruir
+from .consultas import historial_filtrado
+from .config import settings
+from .models import HistorialAuditoria
+
+logger = logging.getLogger(__name__)
+
+_MAGICO = b"AUDSEG1\n"
+_LARGO_CABECERA = struct.Struct("<I")
+
+# Columnas guardadas en cada segmento (mismos nombres que AuditoriaResponse)
+COLUMNAS = (
+    "id",
+    "tabla_afectada",
+    "id_registro",
+    "operacion",
+    "grupo_responsable",
+    "datos_anteriores",
+    "datos_nuevos",
+    "fecha_operacion",
+    "observaciones",
+)
+
+
+def _fecha(valor: str) -> datetime:
+    """Lee una fecha ISO del archivo (las fechas sin zona se asumen UTC)"""
+    fecha = datetime.fromisoformat(valor)
+    return fecha if fecha.tzinfo else fecha.replace(tzinfo=timezone.utc)
+
+
+def fecha_con_zona(fecha: Optional[datetime]) -> Optional[datetime]:
+    """
+    Una fecha de la petición sin zona horaria se toma como UTC.
+
+    Se aplica ANTES de consultar la tabla y el archivo: si la fecha llegara
+    sin zona a PostgreSQL, la leería en la zona horaria de la sesión y los
+    dos lados filtrarían por instantes distintos.
+    """
+    if fecha is None or fecha.tzinfo:
+        return fecha
+    return fecha.replace(tzinfo=timezone.utc)
+
+
+# ========================================
+# FORMATO DE LOS SEGMENTOS
+# ========================================
+
+def escribir_segmento(ruta: Path, registros: List[dict]) -> None:
+    """
+    Escribe un segmento columnar comprimido.
+
+    Formato: MAGICO | largo de la cabecera | cabecera JSON | columnas zlib
+    La cabecera indica dónde empieza y cuánto mide cada columna.
+    """
+    bloques = []
+    posiciones = {}
+    inicio = 0
+    for columna in COLUMNAS:
+        valores = [registro[columna] for registro in registros]
+        bloque = zlib.compress(
+            json.dumps(valores, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 9
+        )
+        posiciones[columna] = [inicio, len(bloque)]
+        inicio += len(bloque)
+        bloques.append(bloque)
+
+    cabecera = json.dumps({"filas": len(registros), "columnas": posiciones}).encode("utf-8")
+
+    temporal = ruta.with_suffix(".tmp")
+    with open(temporal, "wb") as archivo:
+        archivo.write(_MAGICO)
+        archivo.write(_LARGO_CABECERA.pack(len(cabecera)))
+        archivo.write(cabecera)
+        for bloque in bloques:
+            archivo.write(bloque)
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(temporal, ruta)
+
+
+@lru_cache(maxsize=64)
+def leer_columna(ruta: Path, columna: str) -> Tuple[Any, ...]:
+    """
+    Descomprime UNA columna de un segmento.
+
+    Los segmentos nunca cambian, así que el resultado se puede guardar
+    en caché sin riesgo.
+    """
+    with open(ruta, "rb") as archivo:
+        if archivo.read(len(_MAGICO)) != _MAGICO:
+            raise ValueError(f"{ruta} no es un segmento de auditoría")
+        (largo,) = _LARGO_CABECERA.unpack(archivo.read(_LARGO_CABECERA.size))
+        cabecera = json.loads(archivo.read(largo))
+        inicio, tamano = cabecera["columnas"][columna]
+        archivo.seek(len(_MAGICO) + _LARGO_CABECERA.size + largo + inicio)
+        valores = json.loads(zlib.decompress(archivo.read(tamano)))
+
+    if columna == "fecha_operacion":
+        valores = [_fecha(valor) for valor in valores]
+    return tuple(valores)
+
+
+# ========================================
+# ARCHIVO (ÍNDICE + SEGMENTOS)
+# ========================================
+
+class ArchivoAuditoria:
+    """
+    Carpeta con los segmentos y su índice.
+
+    Hay una sola instancia por proceso: 'archivo'.
+    """
+
+    def __init__(self, carpeta: Optional[Path] = None):
+        self.carpeta = carpeta or Path(settings.AUDITORIA_ARCHIVO_DIR)
+        self._segmentos: List[dict] = []
+        self._version: Optional[Tuple[int, int]] = None
+
+    @property
+    def ruta_indice(self) -> Path:
+        return self.carpeta / "indice.json"
+
+    def segmentos(self) -> List[dict]:
+        """Entradas del índice (se recarga si el archivador lo cambió)"""
+        try:
+            info = os.stat(self.ruta_indice)
+        except FileNotFoundError:
+            self._segmentos, self._version = [], None
+            return self._segmentos
+
+        version = (info.st_ino, info.st_mtime_ns)
+        if version != self._version:
+            with open(self.ruta_indice, "r", encoding="utf-8") as archivo:
+                self._segmentos = json.load(archivo)["segmentos"]
+            self._version = version
+        return self._segmentos
+
+    def ultimo_id(self) -> int:
+        """Mayor id ya archivado (0 si no hay archivo)"""
+        return max((segmento["id_max"] for segmento in self.segmentos()), default=0)
+
+    def ids_archivados(self, ids: Iterable[int]) -> Set[int]:
+        """
+        Cuáles de 'ids' están guardados en algún segmento.
+
+        Que un id sea menor que ultimo_id() no significa que esté
+        archivado: los lotes se eligen por fecha, y los ids no crecen con
+        la fecha (se asignan al hacer flush, y el generador de datos de
+        prueba usa fechas al azar). Solo cuenta la columna 'id' de los
+        segmentos, que es lo que realmente se escribió.
+        """
+        pendientes = set(ids)
+        archivados: Set[int] = set()
+        for segmento in self.segmentos():
+            if not pendientes:
+                break
+            if not any(segmento["id_min"] <= id_ <= segmento["id_max"] for id_ in pendientes):
+                continue
+            encontrados = pendientes.intersection(leer_columna(self.carpeta / segmento["archivo"], "id"))
+            archivados |= encontrados
+            pendientes -= encontrados
+        return archivados
+
+    def agregar_segmento(self, registros: List[dict]) -> dict:
+        """
+        Escribe un segmento nuevo y lo agrega al índice.
+
+        Args:
+            registros: Filas con las vistas completas, en orden de id
+
+        Returns:
+            dict: Entrada del índice del segmento
+        """
+        self.carpeta.mkdir(parents=True, exist_ok=True)
+        ids = [registro["id"] for registro in registros]
+        fechas = [_fecha(registro["fecha_operacion"]) for registro in registros]
+        id_registros = [registro["id_registro"] for registro in registros]
+
+        nombre = f"segmento_{min(ids):06d}_{max(ids):06d}.seg"
+        escribir_segmento(self.carpeta / nombre, registros)
+
+        entrada = {
+            "archivo": nombre,
+            "filas": len(registros),
+            "id_min": min(ids),
+            "id_max": max(ids),
+            "fecha_min": min(fechas).isoformat(),
+            "fecha_max": max(fechas).isoformat(),
+            "id_registro_min": min(id_registros),
+            "id_registro_max": max(id_registros),
+        }
+
+        # El índice se reemplaza completo: los lectores ven el viejo o el nuevo
+        segmentos = self.segmentos() + [entrada]
+        temporal = self.ruta_indice.with_suffix(".tmp")
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump({"segmentos": segmentos}, archivo, indent=1)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.replace(temporal, self.ruta_indice)
+        return entrada
+
+    def buscar(
+        self,
+        tabla: Optional[str] = None,
+        operacion: Optional[str] = None,
+        grupo: Optional[str] = None,
+        id_registro: Optional[int] = None,
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None,
+        limite: Optional[int] = None,
+        despues_de: Optional[Tuple[datetime, int]] = None
+    ) -> List[dict]:
+        """
+        Busca en el archivo, de lo más reciente a lo más antiguo.
+
+        Los segmentos cuyo rango de fechas o de id_registro no coincide
+        se descartan sin abrirlos.
+
+        Args:
+            despues_de: (fecha_operacion, id) del último registro de la
+                        página anterior; solo se buscan los siguientes
+
+        Returns:
+            List[dict]: Registros (formato AuditoriaResponse), fecha descendente
+        """
+        desde, hasta = fecha_con_zona(desde), fecha_con_zona(hasta)
+        if despues_de is not None:
+            despues_de = (fecha_con_zona(despues_de[0]), despues_de[1])
+        encontrados: List[dict] = []
+
+        for segmento in sorted(self.segmentos(), key=lambda s: s["fecha_max"], reverse=True):
+            if desde is not None and _fecha(segmento["fecha_max"]) < desde:
+                continue
+            if hasta is not None and _fecha(segmento["fecha_min"]) >= hasta:
+                continue
+            if despues_de is not None and _fecha(segmento["fecha_min"]) > despues_de[0]:
+                continue  # Todo el segmento ya se entregó en páginas anteriores
+            if id_registro is not None and not (
+                segmento["id_registro_min"] <= id_registro <= segmento["id_registro_max"]
+            ):
+                continue
+            if limite is not None and encontrados and len(encontrados) >= limite and \
+                    _fecha(segmento["fecha_max"]) < encontrados[-1]["_fecha"]:
+                break  # Los segmentos restantes son más antiguos que todo lo encontrado
+
+            encontrados.extend(self._filtrar_segmento(
+                self.carpeta / segmento["archivo"],
+                tabla, operacion, grupo, id_registro, desde, hasta, despues_de
+            ))
+            encontrados.sort(key=lambda r: (r["_fecha"], r["id"]), reverse=True)
+            if limite is not None:
+                del encontrados[limite:]
+
+        for registro in encontrados:
+            del registro["_fecha"]
+        return encontrados
+
+    @staticmethod
+    def _filtrar_segmento(ruta: Path, tabla, operacion, grupo, id_registro, desde, hasta, despues_de) -> List[dict]:
+        """Filtra un segmento descomprimiendo primero solo las columnas del filtro"""
+        fechas = leer_columna(ruta, "fecha_operacion")
+        posiciones = range(len(fechas))
+
+        if desde is not None or hasta is not None:
+            posiciones = [
+                i for i in posiciones
+                if (desde is None or fechas[i] >= desde) and (hasta is None or fechas[i] < hasta)
+            ]
+        if despues_de is not None:
+            ids = leer_columna(ruta, "id")
+            posiciones = [i for i in posiciones if (fechas[i], ids[i]) < despues_de]
+        for columna, valor in (
+            ("tabla_afectada", tabla),
+            ("operacion", operacion),
+            ("grupo_responsable", grupo),
+            ("id_registro", id_registro),
+        ):
+            if valor is not None and posiciones:
+                valores = leer_columna(ruta, columna)
+                posiciones = [i for i in posiciones if valores[i] == valor]
+
+        if not posiciones:
+            return []
+
+        columnas = {columna: leer_columna(ruta, columna) for columna in COLUMNAS}
+        registros = []
+        for i in posiciones:
+            registro = {columna: columnas[columna][i] for columna in COLUMNAS}
+            registro["_fecha"] = registro["fecha_operacion"]
+            registro["fecha_operacion"] = registro["fecha_operacion"].isoformat()
+            registros.append(registro)
+        return registros
+
+    @contextmanager
+    def bloqueo(self):
+        """Evita que dos archivadores trabajen al mismo tiempo"""
+        self.carpeta.mkdir(parents=True, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(self.carpeta / ".lock", "a+b") as candado:
+            fcntl.flock(candado, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(candado, fcntl.LOCK_UN)
+
+
+# ========================================
+# ARCHIVADOR
+# ========================================
+
+def _retirar_de_la_tabla(db: Session, filas: List[HistorialAuditoria], vistas: List[dict]) -> None:
+    """
+    Borra de la tabla las filas ya archivadas (en la transacción de 'db').
+
+    Si un registro sigue teniendo historial en la tabla, su fila más antigua
+    que queda recibe el estado completo en 'datos_anteriores' y pasa a ser
+    un punto completo: así la reconstrucción de la auditoría compacta no
+    necesita leer el archivo.
+    """
+    ids = [fila.id for fila in filas]
+    estados: Dict[Tuple[str, int], Optional[str]] = {}
+    for fila, vista in zip(filas, vistas):  # En orden de id: queda el último estado
+        estados[(fila.tabla_afectada, fila.id_registro)] = vista["datos_nuevos"]
+
+    # Primera fila que queda en la tabla de cada registro (una sola consulta)
+    primeras = db.query(func.min(HistorialAuditoria.id))\
+        .filter(tuple_(HistorialAuditoria.tabla_afectada, HistorialAuditoria.id_registro).in_(estados))\
+        .filter(HistorialAuditoria.id > max(ids))\
+        .group_by(HistorialAuditoria.tabla_afectada, HistorialAuditoria.id_registro)\
+        .scalar_subquery()
+    siguientes = db.query(HistorialAuditoria).filter(HistorialAuditoria.id.in_(primeras)).all()
+
+    for siguiente in siguientes:
+        estado = estados[(siguiente.tabla_afectada, siguiente.id_registro)]
+        if not estado:
+            continue
+        completo = json.loads(estado)
+        completo.update(json.loads(siguiente.datos_anteriores) if siguiente.datos_anteriores else {})
+        siguiente.datos_anteriores = json.dumps(completo, default=str, separators=(",", ":"))
+        siguiente.completo = True
+
+    db.query(HistorialAuditoria)\
+        .filter(HistorialAuditoria.id.in_(ids))\
+        .delete(synchronize_session=False)
+    db.commit()
+
+
+def archivar(db: Session, dias_en_caliente: int, filas_por_segmento: int) -> int:
+    """
+    Mueve al archivo las filas con más de 'dias_en_caliente' días.
+
+    Para cada lote: 1) escribe el segmento, 2) lo agrega al índice,
+    3) borra las filas de la tabla. Si el proceso se interrumpe entre 2 y 3,
+    la siguiente ejecución termina de borrar las filas que ya estaban
+    archivadas (nunca se archivan dos veces). Solo se borran las filas
+    cuyo id aparece en un segmento (ver ids_archivados()).
+
+    Returns:
+        int: Filas archivadas
+    """
+    corte = datetime.now(timezone.utc) - timedelta(days=dias_en_caliente)
+    total = 0
+
+    with archivo.bloqueo():
+        # Terminar una ejecución anterior interrumpida. Entre los ids menores
+        # que el último archivado también hay filas recientes que nunca se
+        # archivaron: esas se quedan en la tabla.
+        candidatas = db.query(HistorialAuditoria)\
+            .filter(HistorialAuditoria.id <= archivo.ultimo_id())\
+            .order_by(HistorialAuditoria.id.asc())\
+            .all()
+        archivadas = archivo.ids_archivados(fila.id for fila in candidatas)
+        pendientes = [fila for fila in candidatas if fila.id in archivadas]
+        if pendientes:
+            _retirar_de_la_tabla(db, pendientes, reconstruir(db, pendientes))
+
+        while True:
+            filas = db.query(HistorialAuditoria)\
+                .filter(HistorialAuditoria.fecha_operacion < corte)\
+                .order_by(HistorialAuditoria.id.asc())\
+                .limit(filas_por_segmento)\
+                .all()
+            if not filas:
+                break
+
+            vistas = reconstruir(db, filas)
+            entrada = archivo.agregar_segmento(vistas)
+            _retirar_de_la_tabla(db, filas, vistas)
+
+            total += len(filas)
+            logger.info("Archivadas %s filas en %s", len(filas), entrada["archivo"])
+
+    return total
+
+
+# ========================================
+# CONSULTA COMBINADA (TABLA + ARCHIVO)
+# ========================================
+
+def consultar_historial(
+    db: Session,
+    tabla: Optional[str] = None,
+    operacion: Optional[str] = None,
+    grupo: Optional[str] = None,
+    id_registro: Optional[int] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    skip: int = 0,
+    limit: Optional[int] = None,
+    despues_de: Optional[Tuple[datetime, int]] = None
+) -> List[dict]:
+    """
+    Consulta el historial en la tabla y, si hace falta, en el archivo.
+
+    Todo lo archivado es más antiguo que lo que queda en la tabla, así que
+    el archivo solo se abre cuando la tabla no alcanza a llenar la página.
+
+    Con 'skip' cada lado tiene que leer skip + limit filas para descartar
+    las primeras; con 'despues_de' (cursor, ver cursor_historial()) cada
+    lado lee solo 'limit' filas a partir de donde terminó la página anterior.
+
+    Args:
+        db: Sesión de base de datos
+        tabla, operacion, grupo, id_registro: Filtros (None = todos)
+        desde, hasta: Rango de fecha_operacion [desde, hasta); sin zona = UTC
+        skip, limit: Paginación (limit None = todo)
+        despues_de: (fecha_operacion, id) del último registro de la página anterior
+
+    Returns:
+        List[dict]: Registros (formato AuditoriaResponse), fecha descendente
+    """
+    # La misma regla para los dos lados (ver fecha_con_zona())
+    desde, hasta = fecha_con_zona(desde), fecha_con_zona(hasta)
+    if despues_de is not None:
+        despues_de = (fecha_con_zona(despues_de[0]), despues_de[1])
+
+    necesarios = None if limit is None else skip + limit
+    filas = historial_filtrado(db, tabla, operacion, grupo, id_registro, desde, hasta, necesarios, despues_de)
+    registros = reconstruir(db, filas)
+
+    if necesarios is None or len(registros) < necesarios:
+        vistos = {registro["id"] for registro in registros}
+        archivados = archivo.buscar(tabla, operacion, grupo, id_registro, desde, hasta, necesarios, despues_de)
+        # Un archivado interrumpido puede dejar filas en ambos lados
+        registros.extend(registro for registro in archivados if registro["id"] not in vistos)
+
+    fin = None if limit is None else skip + limit
+    return registros[skip:fin]
+
+
+def cursor_historial(registros: List[dict]) -> Tuple[datetime, int]:
+    """(fecha_operacion, id) del último registro de una página, para 'despues_de'"""
+    ultimo = registros[-1]
+    return _fecha(ultimo["fecha_operacion"]), ultimo["id"]
+
+
+# ========================================
+# INSTANCIA DEL PROCESO
+# ========================================
+archivo = ArchivoAuditoria()
@@ -0,0 +1,170 @@
+"""
+========================================
+ARCHIVO DE PRODUCTOS Y CLIENTES ELIMINADOS
+========================================
+DELETE /productos/{id} y DELETE /clientes/{id} solo marcan el registro
+con activo = False. Con el tiempo, más de la mitad de 'productos'
+eran registros eliminados: cada listado de activos, cada índice y cada
+VACUUM tenía que pasar por encima de ellos.
+
+El archivador (python archivar_eliminados.py) MUEVE los registros
+eliminados hace más de ARCHIVO_ELIMINADOS_DIAS a 'productos_archivo' y
+'clientes_archivo' (mismas columnas, ver app/models/archivo.py).
+
+Para la API no cambia nada:
+
+- GET /{id} y /lote buscan también en el archivo si no lo encuentran.
+- ?incluir_inactivos=true y /cambios leen las dos tablas juntas
+  (UNION ALL) con los mismos filtros, orden y cursor.
+- PUT /{id} sobre un registro archivado lo devuelve primero a la tabla
+  principal (por ejemplo, para reactivarlo con activo = true).
+- El email y el documento de un cliente archivado siguen ocupados.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, union_all
+from sqlalchemy.orm import Session, aliased
+
+from .campos import opciones_columnas
+from .models import Cliente, ClienteArchivado, Producto, ProductoArchivado
+
+logger = logging.getLogger(__name__)
+
+# Tabla principal -> tabla de archivo
+ARCHIVOS = {Producto: ProductoArchivado, Cliente: ClienteArchivado}
+
+_con_archivo: Dict[Any, Any] = {}
+
+
+def modelo_archivo(modelo: Any) -> Optional[Any]:
+    """Modelo del archivo de 'modelo' (None si no tiene)"""
+    return ARCHIVOS.get(modelo)
+
+
+def _columnas(modelo: Any) -> List[str]:
+    """Nombres de columna, en el mismo orden para la tabla y su archivo"""
+    return [columna.name for columna in modelo.__table__.columns]
+
+
+def con_archivo(modelo: Any) -> Any:
+    """
+    Entidad que lee la tabla principal y su archivo como una sola.
+
+    Se usa igual que el modelo (con_archivo(Producto).precio, etc.) y
+    devuelve instancias de Producto o Cliente. PostgreSQL aplica los
+    filtros y el ORDER BY ... LIMIT a cada parte del UNION ALL por
+    separado, usando sus índices.
+    """
+    if modelo not in _con_archivo:
+        archivo = ARCHIVOS[modelo]
+        nombres = _columnas(modelo)
+        union = union_all(
+            select(*[modelo.__table__.c[nombre] for nombre in nombres]),
+            select(*[archivo.__table__.c[nombre] for nombre in nombres])
+        ).subquery(f"{modelo.__tablename__}_con_archivo")
+        _con_archivo[modelo] = aliased(modelo, union, name=f"{modelo.__tablename__}_con_archivo")
+    return _con_archivo[modelo]
+
+
+def buscar_archivado(
+    db: Session,
+    modelo: Any,
+    id_registro: int,
+    campos: Optional[Tuple[str, ...]] = None
+) -> Optional[Any]:
+    """
+    Busca un registro en el archivo (cuando no está en la tabla principal).
+
+    Args:
+        campos: Campos a leer (None = todos)
+
+    Returns:
+        ProductoArchivado / ClienteArchivado, o None si tampoco está archivado
+    """
+    archivo = ARCHIVOS[modelo]
+    query = db.query(archivo)
+    if campos:
+        query = query.options(opciones_columnas(archivo, campos))
+    return query.filter(archivo.id == id_registro).first()
+
+
+def existe_archivado(db: Session, modelo: Any, columna: str, valor: Any) -> bool:
+    """Indica si algún registro archivado tiene ese valor (ej: email)"""
+    archivo = ARCHIVOS[modelo]
+    return db.query(archivo.id).filter(getattr(archivo, columna) == valor).first() is not None
+
+
+def _mover(db: Session, origen: Any, destino: Any, ids: List[int]) -> None:
+    """INSERT ... SELECT en el destino y DELETE en el origen (misma transacción)"""
+    nombres = _columnas(origen)
+    db.execute(
+        insert(destino.__table__).from_select(
+            nombres,
+            select(*[origen.__table__.c[nombre] for nombre in nombres]).where(origen.id.in_(ids))
+        )
+    )
+    db.execute(delete(origen.__table__).where(origen.id.in_(ids)))
+
+
+def restaurar(db: Session, modelo: Any, id_registro: int) -> bool:
+    """
+    Devuelve un registro archivado a la tabla principal (sin hacer commit).
+
+    Se llama antes de modificarlo: si la petición falla, el rollback lo
+    deja archivado como estaba.
+
+    Returns:
+        bool: True si estaba archivado
+    """
+    archivo = ARCHIVOS[modelo]
+    fila = db.query(archivo.id).filter(archivo.id == id_registro).with_for_update().first()
+    if fila is None:
+        return False
+    _mover(db, archivo, modelo, [id_registro])
+    return True
+
+
+def archivar(db: Session, dias: int, lote: int) -> Dict[str, int]:
+    """
+    Mueve al archivo los registros eliminados hace más de 'dias'.
+
+    Cada lote es una transacción corta. Las filas se bloquean con
+    FOR UPDATE SKIP LOCKED: si alguien está modificando una, se salta
+    y se archiva en la siguiente ejecución. Un PUT que llegue justo
+    después de moverla responde 412 y, al reintentar, la restaura.
+
+    Args:
+        db: Sesión de base de datos
+        dias: Antigüedad mínima de la eliminación
+        lote: Filas movidas por transacción
+
+    Returns:
+        Dict[str, int]: Filas archivadas por tabla
+    """
+    limite = datetime.now(timezone.utc) - timedelta(days=dias)
+    movidas = {}
+
+    for modelo, archivo in ARCHIVOS.items():
+        total = 0
+        while True:
+            # La eliminación lógica actualiza fecha_actualizacion (NOT NULL)
+            ids = [
+                fila.id for fila in db.query(modelo.id)
+                .filter(modelo.activo == False, modelo.fecha_actualizacion < limite)
+                .order_by(modelo.id)
+                .limit(lote)
+                .with_for_update(skip_locked=True)
+                .all()
+            ]
+            if not ids:
+                break
+            _mover(db, modelo, archivo, ids)
+            db.commit()
+            total += len(ids)
+            logger.info(f"🗄️ {modelo.__tablename__}: {total} archivados")
+        movidas[modelo.__tablename__] = total
+
+    return movidas
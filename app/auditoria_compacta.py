@@ -0,0 +1,158 @@
+"""
+========================================
+AUDITORÍA COMPACTA (SOLO DIFERENCIAS)
+========================================
+Antes, al actualizar un producto se guardaban TODOS sus campos en
+'datos_anteriores' y el cuerpo completo de la petición en 'datos_nuevos',
+aunque solo cambiara el precio. Cada fila de auditoría ocupaba varias
+veces más que el cambio que registraba (y eso se paga en tamaño de la
+tabla, WAL y copias de seguridad).
+
+Ahora se guarda SOLO lo que cambió:
+
+    datos_anteriores = {"precio": 1500000.0}
+    datos_nuevos     = {"precio": 1400000.0}
+
+CREATE sigue guardando el registro completo en 'datos_nuevos', y DELETE
+y un UPDATE de cada AUDITORIA_PUNTO_COMPLETO_CADA versiones guardan todos
+los campos anteriores en 'datos_anteriores' (columna 'completo' = True):
+son los puntos de partida para reconstruir los demás.
+
+Para la API no cambia nada: reconstruir() repasa el historial de cada
+registro desde el último punto completo y devuelve las vistas COMPLETAS
+de antes y después, igual que las filas antiguas (que se siguen leyendo
+sin problema). Un producto con 100.000 UPDATE no hace más lenta su
+auditoría: cada vista repasa a lo sumo AUDITORIA_PUNTO_COMPLETO_CADA filas.
+"""
+
+import json
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .consultas import pasos_de_registros
+from .models import HistorialAuditoria
+from .schemas import AuditoriaResponse
+
+
+def instantanea(objeto: Any, campos: Sequence[str]) -> Dict[str, Any]:
+    """
+    Copia los campos auditados de un producto o cliente.
+
+    Los Decimal se convierten a float (igual que en el historial existente)
+    para que la comparación no dependa del tipo.
+
+    Args:
+        objeto: Producto o Cliente
+        campos: Nombres de los campos a copiar
+
+    Returns:
+        Dict[str, Any]: campo -> valor
+    """
+    datos = {}
+    for campo in campos:
+        valor = getattr(objeto, campo)
+        datos[campo] = float(valor) if isinstance(valor, Decimal) else valor
+    return datos
+
+
+def diferencia(
+    antes: Dict[str, Any],
+    despues: Dict[str, Any]
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Compara dos instantáneas y deja solo los campos que cambiaron.
+
+    Returns:
+        Tuple: (valores anteriores, valores nuevos) de los campos modificados,
+        o (None, None) si no cambió nada
+    """
+    cambiados = [campo for campo in despues if antes.get(campo) != despues[campo]]
+    if not cambiados:
+        return None, None
+    return (
+        {campo: antes.get(campo) for campo in cambiados},
+        {campo: despues[campo] for campo in cambiados},
+    )
+
+
+def es_punto_completo(operacion: str, version: int) -> bool:
+    """
+    Indica si la fila de auditoría debe guardar el estado completo.
+
+    Args:
+        operacion: CREATE, UPDATE o DELETE
+        version: Versión del registro después del cambio
+
+    Returns:
+        bool: True en CREATE y DELETE, y en UPDATE cada AUDITORIA_PUNTO_COMPLETO_CADA versiones
+    """
+    if operacion != "UPDATE":
+        return True
+    return version % max(1, settings.AUDITORIA_PUNTO_COMPLETO_CADA) == 0
+
+
+def _cargar_json(valor: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Lee un campo JSON del historial (tolera valores corruptos)"""
+    if not valor:
+        return None
+    try:
+        datos = json.loads(valor)
+    except ValueError:
+        return None
+    return datos if isinstance(datos, dict) else None
+
+
+def reconstruir(db: Session, filas: Iterable[HistorialAuditoria]) -> List[dict]:
+    """
+    Convierte filas del historial en respuestas con las vistas completas.
+
+    Para cada fila se lee el historial de su registro desde el último
+    punto completo (una sola consulta para todas) y se van aplicando los
+    cambios en orden: cada fila ve el estado acumulado hasta ese momento.
+
+    Args:
+        db: Sesión de base de datos
+        filas: Filas de HistorialAuditoria (en cualquier orden)
+
+    Returns:
+        List[dict]: Datos de AuditoriaResponse, en el mismo orden que 'filas'
+    """
+    filas = list(filas)
+    if not filas:
+        return []
+
+    historial = pasos_de_registros(db, sorted({fila.id for fila in filas}))
+
+    # Recorrer la historia de cada registro acumulando el estado
+    vistas: Dict[int, Tuple[Optional[dict], Optional[dict]]] = {}
+    estados: Dict[Tuple[str, int], Dict[str, Any]] = {}
+    for paso in historial:
+        if paso.id in vistas:
+            continue  # Tramo compartido por dos filas pedidas
+        clave = (paso.tabla_afectada, paso.id_registro)
+        # En un punto completo no hace falta lo anterior
+        estado = {} if paso.completo else estados.get(clave, {})
+        anteriores = _cargar_json(paso.datos_anteriores)
+        nuevos = _cargar_json(paso.datos_nuevos)
+
+        if paso.operacion == "CREATE":
+            antes = None
+            despues = dict(nuevos or {})
+        else:
+            antes = {**estado, **(anteriores or {})}
+            despues = {**antes, **(nuevos or {})}
+
+        estados[clave] = despues
+        vistas[paso.id] = (antes, despues)
+
+    respuestas = []
+    for fila in filas:
+        datos = AuditoriaResponse.model_validate(fila).model_dump(mode="json")
+        antes, despues = vistas.get(fila.id, (None, None))
+        datos["datos_anteriores"] = json.dumps(antes, default=str) if antes else None
+        datos["datos_nuevos"] = json.dumps(despues, default=str) if despues else None
+        respuestas.append(datos)
+    return respuestas
@@ -0,0 +1,270 @@
+"""
+========================================
+AUTOCOMPLETAR NOMBRES (TYPEAHEAD)
+========================================
+Mientras el usuario escribe "gonz", el formulario pide sugerencias en
+cada tecla. Con ILIKE '%gonz%' cada tecla recorre toda la tabla, y
+además "Gonzalez" no encuentra "María González Pérez" por la tilde.
+
+Aquí cada worker guarda en memoria una lista ORDENADA de las palabras
+de todos los nombres activos, sin tildes y en minúsculas:
+
+    ("gonzalez", 17), ("maria", 17), ("perez", 17), ...
+
+Buscar un prefijo es una búsqueda binaria (bisect) en esa lista: unos
+microsegundos, sin tocar la base de datos.
+
+- Crear/actualizar/eliminar en este worker actualiza la lista al instante.
+- Los cambios hechos en otros workers se traen cada
+  AUTOCOMPLETAR_REFRESCO_SEGUNDOS con una consulta que lee solo las
+  filas con fecha_actualizacion reciente (índice fecha_actualizacion, id).
+- La carga inicial y esas consultas corren en el pool de hilos
+  (sincronizar()), no en el event loop: mientras un worker carga los
+  nombres sigue atendiendo las demás peticiones.
+- Un prefijo muy corto ("ma") coincide con miles de palabras: la búsqueda
+  deja de recorrer el índice al reunir AUTOCOMPLETAR_MAX_CANDIDATOS y
+  ordena solo esos (las primeras palabras en orden alfabético).
+"""
+
+import bisect
+import heapq
+import logging
+import re
+import threading
+import time
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models import Cliente, Producto
+
+logger = logging.getLogger(__name__)
+
+_PALABRA = re.compile(r"\w+")
+
+
+def normalizar(texto: str) -> str:
+    """
+    Quita tildes y pasa a minúsculas: "María González" -> "maria gonzalez"
+
+    La ñ también pierde su tilde ("Muñoz" -> "munoz"), igual que hace
+    la extensión unaccent de PostgreSQL.
+    """
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return sin_tildes.casefold()
+
+
+class IndicePrefijos:
+    """
+    Índice en memoria de los nombres activos de una tabla.
+
+    Hay una instancia por tabla y por proceso:
+    'autocompletar_productos' y 'autocompletar_clientes'.
+    """
+
+    def __init__(self, modelo: Any):
+        self.modelo = modelo
+        self._entradas: List[Tuple[str, int]] = []  # (palabra, id) ordenadas
+        self._registros: Dict[int, Tuple[str, str, Tuple[str, ...]]] = {}  # id -> (nombre, normalizado, palabras)
+        self._construido = False
+        self._desde: Optional[datetime] = None  # fecha_actualizacion más reciente vista
+        self._ultima_revision = 0.0  # time.monotonic() de la última consulta de cambios
+        # Las búsquedas (event loop) y los cambios (pool de hilos) no se cruzan
+        self._candado = threading.Lock()
+        self._sincronizando = threading.Lock()  # Una sola sincronización a la vez
+
+    # ========================================
+    # MANTENIMIENTO
+    # ========================================
+
+    def _agregar(self, id_registro: int, nombre: str) -> None:
+        """Inserta (o reemplaza) un nombre en el índice"""
+        self._quitar(id_registro)
+        normalizado = normalizar(nombre)
+        palabras = tuple(dict.fromkeys(_PALABRA.findall(normalizado)))
+        self._registros[id_registro] = (nombre, normalizado, palabras)
+        for palabra in palabras:
+            bisect.insort(self._entradas, (palabra, id_registro))
+
+    def _quitar(self, id_registro: int) -> None:
+        """Saca un nombre del índice (si estaba)"""
+        registro = self._registros.pop(id_registro, None)
+        if registro is None:
+            return
+        for palabra in registro[2]:
+            posicion = bisect.bisect_left(self._entradas, (palabra, id_registro))
+            if posicion < len(self._entradas) and self._entradas[posicion] == (palabra, id_registro):
+                del self._entradas[posicion]
+
+    def _aplicar_fila(self, id_registro: int, nombre: str, activo: bool, fecha: Optional[datetime]) -> None:
+        """Aplica una fila leída de la base de datos"""
+        if activo:
+            self._agregar(id_registro, nombre)
+        else:
+            self._quitar(id_registro)
+        if fecha is not None and (self._desde is None or fecha > self._desde):
+            self._desde = fecha
+
+    def _construir(self, db: Session) -> None:
+        """Carga todos los nombres activos (una consulta, solo la primera vez)"""
+        modelo = self.modelo
+        filas = db.query(modelo.id, modelo.nombre, modelo.fecha_actualizacion)\
+            .filter(modelo.activo == True)\
+            .all()
+
+        registros = {}
+        entradas = []
+        desde = None
+        for fila in filas:
+            normalizado = normalizar(fila.nombre)
+            palabras = tuple(dict.fromkeys(_PALABRA.findall(normalizado)))
+            registros[fila.id] = (fila.nombre, normalizado, palabras)
+            entradas.extend((palabra, fila.id) for palabra in palabras)
+            if desde is None or fila.fecha_actualizacion > desde:
+                desde = fila.fecha_actualizacion
+        entradas.sort()  # Ordenar una vez es mucho más rápido que insertar en orden
+
+        # Se arma aparte y se reemplaza de una vez: las búsquedas no ven un índice a medias
+        with self._candado:
+            self._registros, self._entradas, self._desde = registros, entradas, desde
+            self._construido = True
+
+    def _traer_cambios(self, db: Session) -> None:
+        """
+        Aplica lo que otros workers cambiaron desde la última revisión.
+
+        Se relee un margen hacia atrás (SINCRONIZACION_MARGEN_SEGUNDOS)
+        para no perder transacciones que aún no habían hecho COMMIT;
+        aplicar dos veces la misma fila no cambia nada.
+        """
+        modelo = self.modelo
+        query = db.query(modelo.id, modelo.nombre, modelo.activo, modelo.fecha_actualizacion)
+        if self._desde is not None:
+            desde = self._desde - timedelta(seconds=settings.SINCRONIZACION_MARGEN_SEGUNDOS)
+            query = query.filter(modelo.fecha_actualizacion >= desde)
+        filas = query.all()
+        with self._candado:
+            for fila in filas:
+                self._aplicar_fila(fila.id, fila.nombre, fila.activo, fila.fecha_actualizacion)
+
+    def debe_sincronizar(self) -> bool:
+        """Indica si hay que llamar a sincronizar() antes de buscar"""
+        return not self._construido or \
+            time.monotonic() - self._ultima_revision >= settings.AUTOCOMPLETAR_REFRESCO_SEGUNDOS
+
+    def sincronizar(self, db: Session) -> None:
+        """
+        Construye el índice la primera vez y luego trae cambios cada tanto.
+
+        Consulta la base de datos: se ejecuta en el pool de hilos. Si varias
+        peticiones llegan a la vez, la primera sincroniza y las demás
+        esperan y no repiten la consulta.
+        """
+        with self._sincronizando:
+            if not self.debe_sincronizar():
+                return  # Otra petición acaba de hacerlo
+            ahora = time.monotonic()
+            if not self._construido:
+                self._construir(db)
+            else:
+                self._traer_cambios(db)
+            self._ultima_revision = ahora
+
+    def aplicar_cambio(self, registro: Any) -> None:
+        """
+        Actualiza un nombre tras crear/actualizar/eliminar en este worker.
+
+        Si el índice todavía no se ha construido no hace nada: se
+        construirá completo en la primera búsqueda.
+        """
+        if not self._construido:
+            return
+        try:
+            with self._candado:
+                if registro.activo:
+                    self._agregar(registro.id, registro.nombre)
+                else:
+                    self._quitar(registro.id)
+        except Exception:
+            # Un error en el índice nunca debe hacer fallar la escritura;
+            # se descarta y se reconstruye en la siguiente búsqueda
+            logger.exception("No se pudo actualizar el índice de autocompletar")
+            self._construido = False
+
+    # ========================================
+    # BÚSQUEDA
+    # ========================================
+
+    def _ids_con_prefijo(self, prefijo: str) -> set:
+        """
+        Ids con alguna palabra que empieza por 'prefijo' (búsqueda binaria).
+
+        Se detiene al reunir AUTOCOMPLETAR_MAX_CANDIDATOS ids.
+        """
+        ids = set()
+        entradas = self._entradas
+        maximo = settings.AUTOCOMPLETAR_MAX_CANDIDATOS
+        posicion = bisect.bisect_left(entradas, (prefijo,))
+        while posicion < len(entradas) and len(ids) < maximo and entradas[posicion][0].startswith(prefijo):
+            ids.add(entradas[posicion][1])
+            posicion += 1
+        return ids
+
+    def buscar(self, texto: str, limite: int) -> List[Dict[str, Any]]:
+        """
+        Sugerencias cuyo nombre tiene una palabra que empieza por cada
+        palabra escrita ("gonz" -> "María González", "ma go" -> "María González").
+
+        Primero los nombres que empiezan por el texto completo, luego el
+        resto, en orden alfabético (entre los primeros
+        AUTOCOMPLETAR_MAX_CANDIDATOS del índice, ver _ids_con_prefijo()).
+
+        Args:
+            texto: Lo que el usuario lleva escrito
+            limite: Máximo de sugerencias
+
+        Returns:
+            List[dict]: [{"id", "nombre"}]
+        """
+        normalizado = normalizar(texto).strip()
+        terminos = sorted(set(_PALABRA.findall(normalizado)), key=len, reverse=True)
+        if not terminos:
+            return []
+
+        with self._candado:
+            return self._buscar(normalizado, terminos, limite)
+
+    def _buscar(self, normalizado: str, terminos: List[str], limite: int) -> List[Dict[str, Any]]:
+        """buscar() con el candado tomado"""
+        # El término más largo es el más selectivo: se busca en el índice
+        # y los demás se verifican solo sobre esos candidatos
+        candidatos = self._ids_con_prefijo(terminos[0])
+        resto = terminos[1:]
+        if resto:
+            candidatos = {
+                id_registro for id_registro in candidatos
+                if all(
+                    any(palabra.startswith(termino) for palabra in self._registros[id_registro][2])
+                    for termino in resto
+                )
+            }
+
+        def prioridad(id_registro: int):
+            _nombre, nombre_normalizado, _palabras = self._registros[id_registro]
+            return (not nombre_normalizado.startswith(normalizado), nombre_normalizado, id_registro)
+
+        return [
+            {"id": id_registro, "nombre": self._registros[id_registro][0]}
+            for id_registro in heapq.nsmallest(limite, candidatos, key=prioridad)
+        ]
+
+
+# ========================================
+# INSTANCIAS DEL PROCESO
+# ========================================
+autocompletar_productos = IndicePrefijos(Producto)
+autocompletar_clientes = IndicePrefijos(Cliente)
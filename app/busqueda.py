@@ -0,0 +1,215 @@
+"""
+========================================
+BÚSQUEDA CON FACETAS
+========================================
+La página de resultados muestra los productos encontrados y, al lado,
+cuántos hay por categoría, por rango de precio y si tienen stock.
+
+En lugar de buscar y luego volver a recorrer todo para contar, se hace
+en UNA consulta (PostgreSQL):
+
+- 'pagina':       los productos de la página, por nombre
+- 'coincidencias': hasta MAX_CONTEO_FACETAS + 1 productos que coinciden
+                  (la fila de más solo indica que hay más; no se cuenta)
+- 'facetas':      GROUPING SETS cuenta por categoría, por rango de precio
+                  y por stock en una sola pasada sobre 'coincidencias'
+
+Si hay más coincidencias que MAX_CONTEO_FACETAS, los conteos se hacen
+sobre las primeras y la respuesta lo indica ('conteo_exacto': false).
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .models import Producto
+
+# Máximo de coincidencias que se cuentan para las facetas
+MAX_CONTEO_FACETAS = 10000
+
+# Rangos de precio (pesos colombianos): (etiqueta, mínimo incluido, máximo excluido)
+RANGOS_PRECIO: List[Tuple[str, Optional[int], Optional[int]]] = [
+    ("menos de 50.000", None, 50_000),
+    ("50.000 - 200.000", 50_000, 200_000),
+    ("200.000 - 1.000.000", 200_000, 1_000_000),
+    ("1.000.000 - 3.000.000", 1_000_000, 3_000_000),
+    ("más de 3.000.000", 3_000_000, None),
+]
+
+
+def _sql_rango_precio() -> str:
+    """Expresión CASE que asigna el rango de precio de cada producto"""
+    casos = []
+    for etiqueta, _minimo, maximo in RANGOS_PRECIO:
+        if maximo is None:
+            casos.append(f"ELSE '{etiqueta}'")
+        else:
+            casos.append(f"WHEN precio < {maximo} THEN '{etiqueta}'")
+    return "CASE " + " ".join(casos) + " END"
+
+
+def _rango_de(precio: Any) -> str:
+    """Rango de precio de un producto (misma regla que _sql_rango_precio)"""
+    for etiqueta, _minimo, maximo in RANGOS_PRECIO:
+        if maximo is None or precio < maximo:
+            return etiqueta
+    return RANGOS_PRECIO[-1][0]
+
+
+def _filtros_sql(query: Optional[str], categoria: Optional[str], en_stock: Optional[bool]) -> Tuple[str, dict]:
+    """Condiciones WHERE comunes a la página y a las facetas"""
+    condiciones = ["activo"]
+    parametros: Dict[str, Any] = {}
+    if query:
+        condiciones.append("nombre ILIKE :patron")
+        parametros["patron"] = f"%{query}%"
+    if categoria:
+        condiciones.append("categoria = :categoria")
+        parametros["categoria"] = categoria
+    if en_stock is True:
+        condiciones.append("stock > 0")
+    elif en_stock is False:
+        condiciones.append("stock = 0")
+    return " AND ".join(condiciones), parametros
+
+
+def _ordenar_facetas(conteos: Dict[str, Dict[Any, int]]) -> Dict[str, List[dict]]:
+    """Convierte los conteos en listas ordenadas para la respuesta"""
+    orden_rangos = {etiqueta: i for i, (etiqueta, _, _) in enumerate(RANGOS_PRECIO)}
+    return {
+        "categoria": [
+            {"valor": valor, "total": total}
+            for valor, total in sorted(conteos["categoria"].items(), key=lambda c: (-c[1], c[0] is None, c[0] or ""))
+        ],
+        "rango_precio": [
+            {"valor": valor, "total": total}
+            for valor, total in sorted(conteos["rango_precio"].items(), key=lambda c: orden_rangos[c[0]])
+        ],
+        "en_stock": [
+            {"valor": valor, "total": total}
+            for valor, total in sorted(conteos["en_stock"].items(), reverse=True)
+        ],
+    }
+
+
+def buscar_con_facetas(
+    db: Session,
+    query: Optional[str],
+    categoria: Optional[str],
+    en_stock: Optional[bool],
+    skip: int,
+    limit: int
+) -> Dict[str, Any]:
+    """
+    Busca productos y cuenta las facetas de los resultados.
+
+    Returns:
+        dict: {"productos", "total", "conteo_exacto", "facetas"}
+        ('productos' son dicts en PostgreSQL y objetos Producto en otros motores)
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return _buscar_postgresql(db, query, categoria, en_stock, skip, limit)
+    return _buscar_generico(db, query, categoria, en_stock, skip, limit)
+
+
+def _buscar_postgresql(db, query, categoria, en_stock, skip, limit) -> Dict[str, Any]:
+    """Página + facetas en un solo viaje a PostgreSQL"""
+    where, parametros = _filtros_sql(query, categoria, en_stock)
+    parametros.update({"skip": skip, "limit": limit, "maximo": MAX_CONTEO_FACETAS, "tope": MAX_CONTEO_FACETAS + 1})
+
+    sql = text(f"""
+        WITH pagina AS (
+            SELECT * FROM productos
+            WHERE {where}
+            ORDER BY nombre, id
+            OFFSET :skip LIMIT :limit
+        ),
+        coincidencias AS (
+            SELECT categoria, {_sql_rango_precio()} AS rango_precio, stock > 0 AS en_stock,
+                   row_number() OVER () AS fila
+            FROM productos
+            WHERE {where}
+            LIMIT :tope
+        ),
+        facetas AS (
+            SELECT categoria, rango_precio, en_stock, COUNT(*) AS total,
+                   GROUPING(categoria, rango_precio, en_stock) AS nivel
+            FROM coincidencias
+            WHERE fila <= :maximo
+            GROUP BY GROUPING SETS ((categoria), (rango_precio), (en_stock), ())
+        )
+        SELECT
+            (SELECT COALESCE(json_agg(pagina ORDER BY nombre, id), '[]') FROM pagina) AS productos,
+            (SELECT COALESCE(json_agg(facetas), '[]') FROM facetas) AS facetas,
+            EXISTS (SELECT 1 FROM coincidencias WHERE fila > :maximo) AS hay_mas
+    """)
+    fila = db.execute(sql, parametros).one()
+    productos = fila.productos if isinstance(fila.productos, list) else json.loads(fila.productos)
+    filas_facetas = fila.facetas if isinstance(fila.facetas, list) else json.loads(fila.facetas)
+
+    # GROUPING(...) indica qué columna agrupa cada fila: 3 = solo categoria,
+    # 5 = solo rango_precio, 6 = solo en_stock, 7 = total
+    conteos: Dict[str, Dict[Any, int]] = {"categoria": {}, "rango_precio": {}, "en_stock": {}}
+    total = 0
+    for faceta in filas_facetas:
+        if faceta["nivel"] == 3:
+            conteos["categoria"][faceta["categoria"]] = faceta["total"]
+        elif faceta["nivel"] == 5:
+            conteos["rango_precio"][faceta["rango_precio"]] = faceta["total"]
+        elif faceta["nivel"] == 6:
+            conteos["en_stock"][faceta["en_stock"]] = faceta["total"]
+        elif faceta["nivel"] == 7:
+            total = faceta["total"]
+
+    return _respuesta(productos, total, not fila.hay_mas, conteos)
+
+
+def _buscar_generico(db, query, categoria, en_stock, skip, limit) -> Dict[str, Any]:
+    """Otros motores (sin GROUPING SETS): mismas reglas, conteo en Python"""
+    filtros = [Producto.activo == True]
+    if query:
+        filtros.append(Producto.nombre.ilike(f"%{query}%"))
+    if categoria:
+        filtros.append(Producto.categoria == categoria)
+    if en_stock is True:
+        filtros.append(Producto.stock > 0)
+    elif en_stock is False:
+        filtros.append(Producto.stock == 0)
+
+    productos = db.query(Producto).filter(*filtros)\
+        .order_by(Producto.nombre, Producto.id)\
+        .offset(skip).limit(limit).all()
+    coincidencias = db.query(Producto.categoria, Producto.precio, Producto.stock)\
+        .filter(*filtros).limit(MAX_CONTEO_FACETAS + 1).all()
+    # La fila de más solo indica que hay más: no entra en los conteos
+    conteo_exacto = len(coincidencias) <= MAX_CONTEO_FACETAS
+    coincidencias = coincidencias[:MAX_CONTEO_FACETAS]
+
+    conteos: Dict[str, Dict[Any, int]] = {"categoria": {}, "rango_precio": {}, "en_stock": {}}
+    for fila in coincidencias:
+        for faceta, valor in (
+            ("categoria", fila.categoria),
+            ("rango_precio", _rango_de(fila.precio)),
+            ("en_stock", fila.stock > 0),
+        ):
+            conteos[faceta][valor] = conteos[faceta].get(valor, 0) + 1
+
+    return _respuesta(productos, len(coincidencias), conteo_exacto, conteos)
+
+
+def _respuesta(productos: list, total: int, conteo_exacto: bool, conteos: Dict[str, Dict[Any, int]]) -> Dict[str, Any]:
+    """
+    Arma la respuesta.
+
+    'total' y las facetas se cuentan sobre las mismas filas (como mucho
+    MAX_CONTEO_FACETAS), así que las facetas siempre suman 'total'.
+    conteo_exacto=False indica que hay más coincidencias sin contar.
+    """
+    return {
+        "productos": productos,
+        "total": total,
+        "conteo_exacto": conteo_exacto,
+        "facetas": _ordenar_facetas(conteos),
+    }
@@ -0,0 +1,156 @@
+"""
+========================================
+SELECCIÓN DE CAMPOS (SPARSE FIELDSETS)
+========================================
+Permite que el cliente de la API pida solo algunos campos con el
+parámetro ?fields=nombre,precio,stock
+
+Así las columnas pesadas (descripcion, imagen_url, direccion...)
+no se leen de PostgreSQL ni se serializan a JSON cuando no se necesitan.
+"""
+
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple, Type
+
+from fastapi import HTTPException, Query, Response, status
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+from sqlalchemy.orm import load_only
+
+# El ID siempre se devuelve, aunque no se pida
+CAMPOS_OBLIGATORIOS = ("id",)
+
+
+def parametro_fields() -> Any:
+    """
+    Declaración común del parámetro ?fields= para los endpoints de lectura.
+
+    Returns:
+        Query: Parámetro opcional de FastAPI
+    """
+    return Query(
+        None,
+        description="Campos a devolver separados por coma (ej: nombre,precio,stock). "
+                    "Si no se envía, se devuelven todos los campos."
+    )
+
+
+def parsear_campos(
+    fields: Optional[str],
+    schema: Type[BaseModel]
+) -> Optional[Tuple[str, ...]]:
+    """
+    Convierte el texto "nombre,precio" en una tupla de campos válidos.
+
+    Args:
+        fields: Valor del parámetro ?fields= (o None)
+        schema: Schema de respuesta completo (ej: ProductoResponse)
+
+    Returns:
+        Tuple[str, ...] | None: Campos pedidos (con 'id' incluido),
+        o None si se piden todos
+
+    Raises:
+        HTTPException 400: Si se pide un campo que no existe
+    """
+    if not fields:
+        return None
+
+    pedidos = [campo.strip() for campo in fields.split(",") if campo.strip()]
+    if not pedidos:
+        return None
+
+    desconocidos = [campo for campo in pedidos if campo not in schema.model_fields]
+    if desconocidos:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campos no válidos: {', '.join(desconocidos)}. "
+                   f"Campos disponibles: {', '.join(schema.model_fields)}"
+        )
+
+    # Conservar el orden del schema y eliminar duplicados
+    seleccion = set(pedidos) | set(CAMPOS_OBLIGATORIOS)
+    return tuple(campo for campo in schema.model_fields if campo in seleccion)
+
+
+def opciones_columnas(modelo: Any, campos: Tuple[str, ...]):
+    """
+    Opción de SQLAlchemy que limita el SELECT a las columnas pedidas.
+
+    Args:
+        modelo: Clase del modelo (ej: Producto)
+        campos: Campos devueltos por parsear_campos()
+
+    Returns:
+        load_only: Opción para usar con query.options(...)
+    """
+    return load_only(*[getattr(modelo, campo) for campo in campos])
+
+
+@lru_cache(maxsize=256)
+def schema_parcial(schema: Type[BaseModel], campos: Tuple[str, ...]) -> Type[BaseModel]:
+    """
+    Crea (y guarda en caché) un schema con solo los campos pedidos.
+
+    Se reutilizan los mismos tipos y validaciones del schema completo.
+
+    Args:
+        schema: Schema de respuesta completo
+        campos: Campos a conservar
+
+    Returns:
+        Type[BaseModel]: Schema reducido
+    """
+    definiciones = {
+        campo: (schema.model_fields[campo].annotation, schema.model_fields[campo])
+        for campo in campos
+    }
+    return create_model(
+        f"{schema.__name__}Parcial",
+        __config__=ConfigDict(from_attributes=True),
+        **definiciones
+    )
+
+
+@lru_cache(maxsize=256)
+def _adaptador_lista(schema: Type[BaseModel]) -> TypeAdapter:
+    """Adaptador de Pydantic para serializar listas de un schema"""
+    return TypeAdapter(List[schema])
+
+
+def serializar_parcial(
+    datos: Any,
+    schema: Type[BaseModel],
+    campos: Tuple[str, ...]
+) -> bytes:
+    """
+    Convierte uno o varios objetos a JSON usando solo los campos pedidos.
+
+    Args:
+        datos: Objeto del modelo o lista de objetos
+        schema: Schema de respuesta completo
+        campos: Campos a devolver
+
+    Returns:
+        bytes: JSON ya serializado
+    """
+    parcial = schema_parcial(schema, campos)
+
+    if isinstance(datos, list):
+        adaptador = _adaptador_lista(parcial)
+        return adaptador.dump_json(adaptador.validate_python(datos, from_attributes=True))
+
+    return parcial.model_validate(datos).model_dump_json().encode("utf-8")
+
+
+def respuesta_parcial(
+    datos: Any,
+    schema: Type[BaseModel],
+    campos: Tuple[str, ...]
+) -> Response:
+    """
+    Responde con uno o varios objetos usando solo los campos pedidos.
+
+    Returns:
+        Response: Respuesta JSON ya serializada
+    """
+    return Response(content=serializar_parcial(datos, schema, campos), media_type="application/json")
@@ -0,0 +1,428 @@
+"""
+========================================
+SNAPSHOT DEL CATÁLOGO PÚBLICO
+========================================
+El catálogo se consulta muchísimas más veces de las que cambia.
+En lugar de consultar PostgreSQL en cada visita, se mantiene una
+"foto" (snapshot) de todos los productos activos, agrupados por
+categoría, ya serializada a JSON y ya comprimida (gzip y brotli).
+
+- GET /productos/catalogo sirve esa foto sin tocar la base de datos.
+- La foto se guarda en un archivo compartido por todos los workers del
+  mismo servidor; cada worker detecta cuando otro la cambió.
+- Crear/actualizar/eliminar producto solo AVISA del cambio: un hilo en
+  segundo plano espera CATALOGO_DEMORA_GUARDADO_SEGUNDOS (varios cambios
+  seguidos se guardan juntos), trae de la base de datos lo cambiado y
+  vuelve a serializar solo las categorías afectadas. La petición de
+  escritura no espera la compresión ni el bloqueo del archivo.
+- Cada CATALOGO_VERIFICAR_SEGUNDOS, la siguiente consulta del catálogo
+  (en el pool de hilos, no en el event loop) trae también lo cambiado
+  por otros servidores, por archivar_eliminados.py, poblar_datos.py o a
+  mano: filas con fecha_actualizacion reciente (índice fecha_actualizacion,
+  id), más un conteo de productos activos que, si no coincide con la foto
+  (filas insertadas con fechas antiguas, DELETE a mano), la reconstruye
+  completa. Toda lectura de la base de datos se hace con el archivo
+  bloqueado: lo que se escribe nunca es más viejo que lo que ya estaba.
+
+⚠️ Un UPDATE hecho a mano con SQL debe actualizar fecha_actualizacion
+para que el catálogo lo vea.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+try:
+    import fcntl  # Bloqueo entre procesos (no existe en Windows)
+except ImportError:  # pragma: no cover - depende del sistema operativo
+    fcntl = None
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .database import SessionLocal
+from .middleware.compresion import brotli
+from .models import Producto
+from .schemas import ProductoResponse
+
+logger = logging.getLogger(__name__)
+
+SIN_CATEGORIA = "Sin categoría"
+
+# Inicio del archivo: cambia si cambian los campos de ProductoResponse
+# (un archivo de una versión anterior de la API no se usa)
+_MAGICO = b"CATALOGO2:" + hashlib.blake2b(
+    json.dumps(ProductoResponse.model_json_schema(), sort_keys=True).encode("utf-8"), digest_size=6
+).hexdigest().encode("ascii") + b"\n"
+# Cabecera del archivo: longitud del JSON, del gzip, del brotli y de los metadatos
+_CABECERA = struct.Struct("<QQQQ")
+
+# Nivel de compresión: al reconstruir completo (pocas veces) se comprime
+# al máximo; al guardar cambios, algo menos para que sea rápido
+NIVELES_COMPLETO = {"gzip": 9, "br": 8}
+NIVELES_CAMBIOS = {"gzip": 5, "br": 4}
+
+
+def _ruta_por_defecto() -> Path:
+    """Archivo en la carpeta temporal, distinto para cada base de datos"""
+    clave = hashlib.blake2b(
+        f"{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}".encode("utf-8"),
+        digest_size=6
+    ).hexdigest()
+    return Path(tempfile.gettempdir()) / f"catalogo_tienda_{clave}.bin"
+
+
+def _categoria(producto: dict) -> str:
+    return producto["categoria"] or SIN_CATEGORIA
+
+
+class CatalogoSnapshot:
+    """
+    Foto del catálogo en memoria, sincronizada con un archivo compartido.
+
+    Hay una sola instancia por proceso: 'catalogo'.
+    """
+
+    def __init__(self, ruta: Optional[Path] = None):
+        self.ruta = ruta or (Path(settings.CATALOGO_ARCHIVO) if settings.CATALOGO_ARCHIVO else _ruta_por_defecto())
+        # categoría -> {id -> producto serializado}; None = sin cargar
+        self._categorias: Optional[Dict[str, Dict[int, dict]]] = None
+        self._fragmentos: Dict[str, bytes] = {}  # categoría -> su JSON ya serializado
+        self._foto: Optional[Tuple[Dict[str, bytes], str]] = None  # ({"identity"/"gzip"/"br": bytes}, etag)
+        self._desde: Optional[datetime] = None  # fecha_actualizacion más reciente vista
+        # (inodo, mtime) del archivo del que salieron la foto y los productos
+        self._version_foto: Optional[Tuple[int, int]] = None
+        self._version: Optional[Tuple[int, int]] = None
+
+        self._candado = threading.Lock()  # Protege los indicadores de abajo
+        self._hilos = threading.Lock()  # Un solo hilo del proceso modifica la foto
+        self._guardado_programado = False
+        self._verificando = False
+        self._proxima_verificacion = 0.0  # time.monotonic()
+
+    # ========================================
+    # SINCRONIZACIÓN CON LA BASE DE DATOS
+    # ========================================
+
+    def _construir(self, db: Session) -> None:
+        """Lee TODOS los productos activos (una consulta)"""
+        # La marca se toma antes de leer: lo que cambie durante la lectura
+        # se vuelve a traer en la siguiente sincronización
+        self._desde = db.query(func.max(Producto.fecha_actualizacion)).scalar()
+        categorias: Dict[str, Dict[int, dict]] = {}
+        for fila in db.query(Producto).filter(Producto.activo == True).all():
+            producto = ProductoResponse.model_validate(fila).model_dump(mode="json")
+            categorias.setdefault(_categoria(producto), {})[fila.id] = producto
+        self._categorias = categorias
+        self._fragmentos = {}
+
+    def _traer_cambios(self, db: Session) -> Set[str]:
+        """
+        Aplica los productos con fecha_actualizacion reciente.
+
+        Se relee un margen hacia atrás (SINCRONIZACION_MARGEN_SEGUNDOS)
+        para no perder transacciones que aún no habían hecho COMMIT;
+        aplicar dos veces la misma fila no cambia nada.
+
+        Returns:
+            Set[str]: Categorías que cambiaron
+        """
+        query = db.query(Producto)
+        if self._desde is not None:
+            desde = self._desde - timedelta(seconds=settings.SINCRONIZACION_MARGEN_SEGUNDOS)
+            query = query.filter(Producto.fecha_actualizacion >= desde)
+
+        cambiadas: Set[str] = set()
+        for fila in query.all():
+            anterior = self._quitar(fila.id)
+            nuevo = ProductoResponse.model_validate(fila).model_dump(mode="json") if fila.activo else None
+            if nuevo is not None:
+                self._categorias.setdefault(_categoria(nuevo), {})[fila.id] = nuevo
+            if anterior != nuevo:
+                cambiadas.update(_categoria(p) for p in (anterior, nuevo) if p is not None)
+            if self._desde is None or fila.fecha_actualizacion > self._desde:
+                self._desde = fila.fecha_actualizacion
+        return cambiadas
+
+    def _quitar(self, producto_id: int) -> Optional[dict]:
+        """Saca un producto de la foto en memoria y lo devuelve (si estaba)"""
+        for nombre, productos in self._categorias.items():
+            producto = productos.pop(producto_id, None)
+            if producto is not None:
+                if not productos:
+                    del self._categorias[nombre]
+                return producto
+        return None
+
+    def _total(self) -> int:
+        return sum(len(productos) for productos in self._categorias.values())
+
+    def sincronizar(self, verificar_conteo: bool = False) -> None:
+        """
+        Pone la foto al día con la base de datos y la guarda si cambió.
+
+        Parte del archivo compartido (lo último que guardó cualquier worker);
+        si no hay archivo, lee la tabla completa.
+
+        Args:
+            verificar_conteo: Comparar además el número de productos activos
+                (detecta inserciones con fechas antiguas y DELETE a mano)
+        """
+        with self._bloqueo():
+            self._recargar_productos()
+            db = SessionLocal()
+            try:
+                completo = self._categorias is None
+                if not completo:
+                    cambiadas = self._traer_cambios(db)
+                    if verificar_conteo:
+                        activos = db.query(func.count(Producto.id)).filter(Producto.activo == True).scalar()
+                        completo = activos != self._total()
+                if completo:
+                    self._construir(db)
+            finally:
+                db.close()
+
+            if completo:
+                self._guardar(self._categorias.keys(), NIVELES_COMPLETO)
+            elif cambiadas:
+                self._guardar(cambiadas, NIVELES_CAMBIOS)
+
+    def avisar_cambio(self) -> None:
+        """
+        Programa la actualización de la foto (tras crear/actualizar/eliminar).
+
+        No toca la foto ni el archivo: la petición de escritura no espera.
+        Los avisos que llegan mientras tanto se atienden con el mismo guardado.
+        """
+        with self._candado:
+            if self._guardado_programado:
+                return
+            self._guardado_programado = True
+        temporizador = threading.Timer(settings.CATALOGO_DEMORA_GUARDADO_SEGUNDOS, self._guardar_cambios)
+        temporizador.daemon = True
+        temporizador.start()
+
+    def _guardar_cambios(self) -> None:
+        """Hilo en segundo plano de avisar_cambio()"""
+        with self._candado:
+            self._guardado_programado = False
+        if self._foto is None and not self.ruta.exists():
+            return  # Nadie ha pedido el catálogo: se construirá en la primera consulta
+        try:
+            self.sincronizar()
+        except Exception:
+            # Se descarta la foto y se reconstruye completa en la siguiente consulta
+            logger.exception("No se pudo actualizar el snapshot del catálogo")
+            self._categorias = None
+            self._version = None
+
+    # ========================================
+    # LECTURA
+    # ========================================
+
+    def debe_verificar(self) -> bool:
+        """
+        Indica si quien llama debe ejecutar verificar() antes de obtener().
+
+        Solo un llamador a la vez por proceso recibe True (los demás sirven
+        la foto actual), salvo que todavía no haya foto.
+        """
+        with self._candado:
+            if self._foto is None:
+                return True
+            if self._verificando or time.monotonic() < self._proxima_verificacion:
+                return False
+            self._verificando = True
+            return True
+
+    def verificar(self) -> None:
+        """Sincroniza con la base de datos, incluido el conteo (ejecutar en el pool de hilos)"""
+        try:
+            if self._foto is not None and time.monotonic() < self._proxima_verificacion:
+                return  # Otro hilo acaba de hacerlo
+            self.sincronizar(verificar_conteo=True)
+            self._proxima_verificacion = time.monotonic() + settings.CATALOGO_VERIFICAR_SEGUNDOS
+        finally:
+            with self._candado:
+                self._verificando = False
+
+    def obtener(self, codificacion: str) -> Tuple[bytes, str, str]:
+        """
+        Devuelve el catálogo serializado (sin consultar la base de datos).
+
+        Args:
+            codificacion: "br", "gzip" o "identity"
+
+        Returns:
+            Tuple[bytes, str, str]: (cuerpo, codificación usada, etag)
+        """
+        self._recargar_foto()
+        cuerpos, etag = self._foto
+        if codificacion not in cuerpos:
+            codificacion = "identity"
+        return cuerpos[codificacion], codificacion, etag
+
+    # ========================================
+    # ARCHIVO COMPARTIDO
+    # ========================================
+
+    def _serializar(self, cambiadas: Iterable[str]) -> bytes:
+        """
+        Arma el JSON agrupado por categoría y ordenado por nombre.
+
+        Solo se vuelven a serializar las categorías en 'cambiadas'; las
+        demás reutilizan su JSON anterior.
+        """
+        for nombre in cambiadas:
+            self._fragmentos.pop(nombre, None)
+
+        fragmentos = []
+        for nombre in sorted(self._categorias, key=lambda c: (c == SIN_CATEGORIA, c)):
+            fragmento = self._fragmentos.get(nombre)
+            if fragmento is None:
+                fragmento = json.dumps(
+                    {
+                        "categoria": nombre,
+                        "productos": sorted(self._categorias[nombre].values(), key=lambda p: (p["nombre"], p["id"]))
+                    },
+                    ensure_ascii=False, separators=(",", ":")
+                ).encode("utf-8")
+                self._fragmentos[nombre] = fragmento
+            fragmentos.append(fragmento)
+
+        # Categorías que quedaron vacías
+        for nombre in set(self._fragmentos) - set(self._categorias):
+            del self._fragmentos[nombre]
+
+        inicio = json.dumps(
+            {"generado": datetime.now(timezone.utc).isoformat(), "total": self._total()},
+            separators=(",", ":")
+        ).encode("utf-8")
+        return inicio[:-1] + b',"categorias":[' + b",".join(fragmentos) + b"]}"
+
+    def _guardar(self, cambiadas: Iterable[str], niveles: Dict[str, int]) -> None:
+        """Serializa, comprime y escribe el archivo (reemplazo atómico)"""
+        cuerpo = self._serializar(cambiadas)
+        comprimido_gzip = gzip.compress(cuerpo, compresslevel=niveles["gzip"])
+        comprimido_br = brotli.compress(cuerpo, quality=niveles["br"]) if brotli is not None else b""
+        metadatos = json.dumps({"desde": self._desde.isoformat() if self._desde else None}).encode("utf-8")
+
+        temporal = self.ruta.with_suffix(f".{os.getpid()}.tmp")
+        with open(temporal, "wb") as archivo:
+            archivo.write(_MAGICO)
+            archivo.write(_CABECERA.pack(len(cuerpo), len(comprimido_gzip), len(comprimido_br), len(metadatos)))
+            archivo.write(cuerpo)
+            archivo.write(comprimido_gzip)
+            archivo.write(comprimido_br)
+            archivo.write(metadatos)
+        os.replace(temporal, self.ruta)  # Los lectores ven el archivo viejo o el nuevo, nunca uno a medias
+
+        self._usar_cuerpos(cuerpo, comprimido_gzip, comprimido_br)
+        self._version = self._version_foto = self._version_archivo()
+
+    def _leer_archivo(self) -> Optional[Tuple[bytes, bytes, bytes, Optional[datetime]]]:
+        """
+        Lee el archivo compartido.
+
+        Returns:
+            Tuple: (JSON, gzip, brotli, desde), o None si no existe o es de
+            una versión anterior (se reemplaza al guardar)
+        """
+        try:
+            with open(self.ruta, "rb") as archivo:
+                datos = archivo.read()
+        except FileNotFoundError:
+            return None
+        if not datos.startswith(_MAGICO):
+            return None
+        largo_json, largo_gzip, largo_br, largo_metadatos = _CABECERA.unpack_from(datos, len(_MAGICO))
+        inicio = len(_MAGICO) + _CABECERA.size
+        cuerpo = datos[inicio:inicio + largo_json]
+        inicio += largo_json
+        comprimido_gzip = datos[inicio:inicio + largo_gzip]
+        inicio += largo_gzip
+        comprimido_br = datos[inicio:inicio + largo_br]
+        inicio += largo_br
+        desde = json.loads(datos[inicio:inicio + largo_metadatos])["desde"]
+        return cuerpo, comprimido_gzip, comprimido_br, datetime.fromisoformat(desde) if desde else None
+
+    def _recargar_foto(self) -> None:
+        """Si otro worker escribió una versión nueva, servirla (sin bloqueo)"""
+        version = self._version_archivo()
+        if version is None or version == self._version_foto:
+            return
+        leido = self._leer_archivo()
+        if leido is not None:
+            self._usar_cuerpos(*leido[:3])
+            self._version_foto = version
+
+    def _recargar_productos(self) -> None:
+        """Carga los productos del archivo si otro worker lo cambió (con el bloqueo tomado)"""
+        version = self._version_archivo()
+        if version is None or version == self._version:
+            return
+        leido = self._leer_archivo()
+        if leido is None:
+            self._categorias = None
+            return
+        cuerpo, comprimido_gzip, comprimido_br, self._desde = leido
+        self._usar_cuerpos(cuerpo, comprimido_gzip, comprimido_br)
+        self._categorias = self._productos_desde_json(cuerpo)
+        self._fragmentos = {}
+        self._version = self._version_foto = version
+
+    def _usar_cuerpos(self, cuerpo: bytes, comprimido_gzip: bytes, comprimido_br: bytes) -> None:
+        """Guarda en memoria las tres versiones del cuerpo (en un solo paso)"""
+        cuerpos = {"identity": cuerpo, "gzip": comprimido_gzip}
+        if comprimido_br:
+            cuerpos["br"] = comprimido_br
+        self._foto = (cuerpos, '"' + hashlib.blake2b(cuerpo, digest_size=16).hexdigest() + '"')
+
+    @staticmethod
+    def _productos_desde_json(cuerpo: bytes) -> Dict[str, Dict[int, dict]]:
+        """Reconstruye categoría -> {id -> producto} desde el JSON"""
+        contenido = json.loads(cuerpo)
+        return {
+            categoria["categoria"]: {producto["id"]: producto for producto in categoria["productos"]}
+            for categoria in contenido["categorias"]
+        }
+
+    def _version_archivo(self) -> Optional[Tuple[int, int]]:
+        """Identifica la versión del archivo sin leerlo"""
+        try:
+            info = os.stat(self.ruta)
+        except FileNotFoundError:
+            return None
+        return info.st_ino, info.st_mtime_ns
+
+    @contextmanager
+    def _bloqueo(self):
+        """Evita que dos hilos o dos workers modifiquen la foto al mismo tiempo"""
+        with self._hilos:
+            if fcntl is None:
+                yield
+                return
+            with open(self.ruta.with_suffix(".lock"), "a+b") as candado:
+                fcntl.flock(candado, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(candado, fcntl.LOCK_UN)
+
+
+# ========================================
+# INSTANCIA DEL PROCESO
+# ========================================
+catalogo = CatalogoSnapshot()
@@ -0,0 +1,106 @@
+"""
+========================================
+CONTROL DE CONCURRENCIA OPTIMISTA (If-Match)
+========================================
+Dos grupos abren el mismo producto, ambos lo editan y guardan: sin
+control, el segundo PUT borraba sin aviso los cambios del primero.
+
+Cada producto y cliente tiene una columna 'version' que aumenta en cada
+modificación. GET /{id} la devuelve en el cuerpo y en el header ETag:
+
+    GET /productos/7          -> ETag: "3"
+    PUT /productos/7          If-Match: "3"   -> 200, ETag: "4"
+    PUT /productos/7          If-Match: "3"   -> 412 (alguien ya guardó la 4)
+
+El UPDATE es condicional (WHERE id = ? AND version = ?, ver
+app/models/producto.py), así que no hace falta SELECT ... FOR UPDATE
+ni mantener filas bloqueadas durante la petición. Sin If-Match el
+UPDATE sigue siendo condicional respecto a la versión leída.
+"""
+
+from typing import Any, Optional
+
+from fastapi import Header, HTTPException, status
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+HEADER_IF_MATCH = "If-Match"
+
+
+def etag_de(version: int) -> str:
+    """Valor del header ETag para una versión: "3" (con comillas)"""
+    return f'"{version}"'
+
+
+def parametro_if_match() -> Any:
+    """
+    Declaración común del header If-Match para actualizar y eliminar.
+
+    Returns:
+        Header: Parámetro opcional de FastAPI
+    """
+    return Header(
+        None,
+        alias=HEADER_IF_MATCH,
+        description='Versión que se leyó (header ETag o campo "version"). '
+                    "Si el registro cambió desde entonces, responde 412."
+    )
+
+
+def _versiones(if_match: str) -> Optional[set]:
+    """
+    Versiones aceptadas por el header: '"3"', 'W/"3"', '3' o una lista
+    separada por comas. None significa '*' (cualquier versión).
+    """
+    versiones = set()
+    for valor in if_match.split(","):
+        valor = valor.strip()
+        if valor == "*":
+            return None
+        if valor.startswith("W/"):
+            valor = valor[2:]
+        valor = valor.strip('"')
+        if valor.isdigit():
+            versiones.add(int(valor))
+    return versiones
+
+
+def _conflicto(recurso: str) -> HTTPException:
+    """Error 412 con instrucciones para el cliente"""
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail=f"{recurso} fue modificado por otra petición. Vuelve a consultarlo y aplica tus cambios sobre la versión actual."
+    )
+
+
+def verificar_if_match(if_match: Optional[str], version_actual: int, recurso: str) -> None:
+    """
+    Compara el header If-Match con la versión guardada.
+
+    Args:
+        if_match: Valor del header (None = no se envió)
+        version_actual: Versión leída de la base de datos
+        recurso: Texto para el mensaje de error (ej: "El producto 7")
+
+    Raises:
+        HTTPException 412: Si la versión no coincide
+    """
+    if if_match is None:
+        return
+    versiones = _versiones(if_match)
+    if versiones is not None and version_actual not in versiones:
+        raise _conflicto(recurso)
+
+
+def confirmar_version(db: Session, recurso: str) -> None:
+    """
+    Hace commit del UPDATE condicional.
+
+    Raises:
+        HTTPException 412: Si otra petición cambió la fila entre la lectura y el UPDATE
+    """
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise _conflicto(recurso)
@@ -8,7 +8,7 @@ el nombre del grupo de estudiantes.
 """
 
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 class Settings(BaseSettings):
@@ -29,11 +29,158 @@ class Settings(BaseSettings):
     DB_USER: str  # Usuario de la base de datos
     DB_PASSWORD: str  # Contraseña del usuario
 
+    # Tamaño del pool de conexiones (por proceso / worker)
+    DB_POOL_SIZE: int = 5  # Conexiones que se mantienen abiertas
+    DB_MAX_OVERFLOW: int = 10  # Conexiones extra permitidas en picos
+    DB_POOL_TIMEOUT: int = 30  # Segundos esperando una conexión libre
+
+    # SQL compilado que SQLAlchemy guarda por motor (cada combinación de
+    # ?fields=, filtros y orden ocupa una entrada; ver app/consultas.py)
+    DB_CACHE_SENTENCIAS: int = 1500
+
+    CREAR_TABLAS_AL_INICIAR: bool = True  # Ejecutar create_all() al importar main.py
+
+    # Réplicas de solo lectura (opcional). Formato JSON: ["replica1", "replica2:5433"]
+    # Usan el mismo usuario, contraseña y base de datos que el servidor principal.
+    DB_REPLICA_HOSTS: List[str] = []
+    DB_VENTANA_LECTURA_PRIMARIA: float = 5.0  # Segundos leyendo del principal tras escribir
+
     # ========================================
     # IDENTIFICACIÓN DEL GRUPO
     # ========================================
 
-    GRUPO_ESTUDIANTES: str = "GRUPO_1"  # Nombre del grupo que usa la API
+    GRUPO_ESTUDIANTES: str = "GRUPO_1"  # Grupo por defecto si la petición no indica uno
+
+    # Cada petición puede indicar su grupo con el header X-Grupo o con un token.
+    # GRUPO_TOKENS se escribe en JSON en el .env: {"token-secreto": "GRUPO_2"}
+    GRUPO_TOKENS: Dict[str, str] = {}  # Token -> nombre del grupo
+    GRUPOS_PERMITIDOS: List[str] = []  # Si no está vacío, solo se aceptan estos grupos
+
+    # ========================================
+    # SERVIDOR DE PRODUCCIÓN (servidor.py)
+    # ========================================
+
+    SERVIDOR_HOST: str = "0.0.0.0"
+    SERVIDOR_PUERTO: int = 8000
+    SERVIDOR_WORKERS: int = 0  # 0 = un worker por núcleo de CPU
+    SERVIDOR_MAX_CONEXIONES_BD: int = 0  # Total de conexiones a repartir entre workers (0 = no repartir); limita los workers
+    SERVIDOR_TIEMPO_APAGADO: int = 30  # Segundos para terminar peticiones en curso al apagar
+
+    # ========================================
+    # CONTROL DE ADMISIÓN (por worker)
+    # ========================================
+
+    # Peticiones simultáneas por tipo; el exceso recibe 503 en lugar de
+    # esperar una conexión del pool. 0 = calcular a partir del pool.
+    ADMISION_MAX_LECTURAS: int = 0
+    ADMISION_MAX_ESCRITURAS: int = 0
+    ADMISION_MAX_AUDITORIA: int = 0
+    # Peticiones por segundo por grupo; el exceso recibe 429. 0 = sin límite.
+    # Sin token (y sin GRUPOS_PERMITIDOS) el límite se aplica por IP del cliente.
+    ADMISION_TASA_POR_GRUPO: float = 0
+    ADMISION_RAFAGA_POR_GRUPO: int = 50
+
+    # ========================================
+    # TIEMPO MÁXIMO POR CONSULTA (statement_timeout)
+    # ========================================
+
+    # Milisegundos que puede durar una consulta según el tipo de ruta;
+    # al vencer, PostgreSQL la cancela y la API responde 503. 0 = sin límite.
+    DB_TIMEOUT_LECTURAS_MS: int = 5000
+    DB_TIMEOUT_ESCRITURAS_MS: int = 10000
+    DB_TIMEOUT_AUDITORIA_MS: int = 30000
+
+    # ========================================
+    # COALESCENCIA DE PETICIONES IDÉNTICAS
+    # ========================================
+
+    # Prefijos de ruta donde las peticiones GET idénticas y simultáneas
+    # comparten una sola consulta. Lista vacía = desactivado.
+    COALESCENCIA_RUTAS: List[str] = ["/productos", "/clientes"]
+
+    # ========================================
+    # SINCRONIZACIÓN INCREMENTAL (/cambios)
+    # ========================================
+
+    # Los cambios más recientes que este margen se entregan en la siguiente
+    # consulta, para no saltarse transacciones que aún no han hecho COMMIT
+    SINCRONIZACION_MARGEN_SEGUNDOS: float = 2.0
+
+    # ========================================
+    # SNAPSHOT DEL CATÁLOGO (/productos/catalogo)
+    # ========================================
+
+    CATALOGO_ARCHIVO: str = ""  # Archivo compartido por los workers (vacío = carpeta temporal)
+    CATALOGO_DEMORA_GUARDADO_SEGUNDOS: float = 0.2  # Los cambios de este intervalo se guardan juntos
+    # Cada cuánto se traen los cambios hechos fuera de este servidor (otros
+    # servidores, scripts, SQL a mano): es lo máximo que la foto puede atrasarse
+    CATALOGO_VERIFICAR_SEGUNDOS: float = 5.0
+
+    # ========================================
+    # IDEMPOTENCIA (header Idempotency-Key)
+    # ========================================
+
+    IDEMPOTENCIA_TTL_HORAS: int = 24  # Tiempo que se guarda la respuesta de cada clave
+
+    # ========================================
+    # AUTOCOMPLETAR (/productos/autocompletar, /clientes/autocompletar)
+    # ========================================
+
+    # Cada cuánto cada worker busca en la base de datos los nombres que
+    # cambiaron en otros workers (los de su propio worker se aplican al instante)
+    AUTOCOMPLETAR_REFRESCO_SEGUNDOS: float = 2.0
+    # Máximo de nombres que se ordenan por búsqueda (prefijos muy cortos)
+    AUTOCOMPLETAR_MAX_CANDIDATOS: int = 2000
+
+    # ========================================
+    # RESUMEN DE AUDITORÍA POR HORA (/auditoria/resumen)
+    # ========================================
+
+    # Filas entre las que se reparte cada conteo: escrituras concurrentes
+    # del mismo grupo y tabla no esperan el bloqueo de una única fila
+    AUDITORIA_RESUMEN_PARTICIONES: int = 8
+
+    # ========================================
+    # AUDITORÍA COMPACTA (SOLO DIFERENCIAS)
+    # ========================================
+
+    # Cada cuántas versiones un UPDATE guarda el estado completo del registro:
+    # es el máximo de filas que se repasan para reconstruir una vista
+    # (ver app/auditoria_compacta.py)
+    AUDITORIA_PUNTO_COMPLETO_CADA: int = 50
+
+    # ========================================
+    # ARCHIVO FRÍO DE AUDITORÍA
+    # ========================================
+
+    AUDITORIA_ARCHIVO_DIR: str = "archivo_auditoria"  # Carpeta de los segmentos
+    AUDITORIA_DIAS_EN_CALIENTE: int = 180  # Más antiguo que esto se archiva
+    AUDITORIA_FILAS_POR_SEGMENTO: int = 50000
+
+    # ========================================
+    # ARCHIVO DE PRODUCTOS Y CLIENTES ELIMINADOS
+    # ========================================
+
+    ARCHIVO_ELIMINADOS_DIAS: int = 90  # Eliminados hace más de esto pasan a *_archivo
+    ARCHIVO_ELIMINADOS_LOTE: int = 5000  # Filas movidas por transacción
+
+    # ========================================
+    # COMPRESIÓN DE RESPUESTAS
+    # ========================================
+
+    COMPRESION_MINIMO_BYTES: int = 1024  # Respuestas más pequeñas no se comprimen
+    COMPRESION_CACHE_ENTRADAS: int = 256  # Respuestas comprimidas guardadas en memoria
+
+    # ========================================
+    # PERFILADOR DE CPU (/debug/profile)
+    # ========================================
+
+    # Desactivado por defecto. Solo responde con los dos valores configurados
+    # y el header X-Perfil-Token igual a PERFIL_TOKEN.
+    PERFIL_HABILITADO: bool = False
+    PERFIL_TOKEN: str = ""
+    PERFIL_FRECUENCIA_HZ: int = 100  # Muestras por segundo por defecto
+    PERFIL_MAX_SEGUNDOS: int = 60  # Duración máxima de un perfil
 
     class Config:
         """
@@ -55,6 +202,57 @@ class Settings(BaseSettings):
         """
         return f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+    @property
+    def limites_admision(self) -> Dict[str, int]:
+        """
+        Peticiones simultáneas permitidas por tipo de ruta.
+
+        Si no se configuran, se calculan con el tamaño del pool:
+        lecturas y escrituras pueden usar todo el pool, las consultas
+        de auditoría (más pesadas) solo la mitad.
+
+        Returns:
+            Dict[str, int]: Límite por tipo ("lecturas", "escrituras", "auditoria")
+        """
+        pool = self.DB_POOL_SIZE + self.DB_MAX_OVERFLOW
+        return {
+            "lecturas": self.ADMISION_MAX_LECTURAS or pool,
+            "escrituras": self.ADMISION_MAX_ESCRITURAS or pool,
+            "auditoria": self.ADMISION_MAX_AUDITORIA or max(1, pool // 2),
+        }
+
+    @property
+    def timeouts_consulta(self) -> Dict[str, int]:
+        """
+        Tiempo máximo de cada consulta (ms) por tipo de ruta.
+
+        Returns:
+            Dict[str, int]: Milisegundos por tipo ("lecturas", "escrituras", "auditoria")
+        """
+        return {
+            "lecturas": self.DB_TIMEOUT_LECTURAS_MS,
+            "escrituras": self.DB_TIMEOUT_ESCRITURAS_MS,
+            "auditoria": self.DB_TIMEOUT_AUDITORIA_MS,
+        }
+
+    @property
+    def replica_urls(self) -> List[str]:
+        """
+        Construye las URLs de conexión de las réplicas de lectura.
+
+        Cada elemento de DB_REPLICA_HOSTS puede ser "host" o "host:puerto".
+
+        Returns:
+            List[str]: URLs de conexión (vacía si no hay réplicas)
+        """
+        urls = []
+        for replica in self.DB_REPLICA_HOSTS:
+            host, _, puerto = replica.partition(":")
+            urls.append(
+                f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@{host}:{puerto or self.DB_PORT}/{self.DB_NAME}"
+            )
+        return urls
+
 
 # ========================================
 # INSTANCIA GLOBAL DE CONFIGURACIÓN
@@ -0,0 +1,140 @@
+"""
+========================================
+CONSULTAS FRECUENTES EN CACHÉ (lambda_stmt)
+========================================
+Con db.query(...).filter(...), en cada petición se vuelve a armar la
+expresión y SQLAlchemy recorre todo el árbol para calcular su clave de
+caché antes de encontrar el SQL ya compilado. En las consultas que más
+se repiten (obtener por id, buscar por email, historial de auditoría)
+ese trabajo de Python es buena parte del tiempo de la petición.
+
+Con lambda_stmt() la consulta se arma UNA vez por proceso: las
+siguientes llamadas solo extraen los valores de las variables (ids,
+email, filtros) y reutilizan el SQL compilado.
+
+Las partes opcionales se agregan con 'sentencia += lambda s: ...': cada
+combinación de filtros tiene su propia entrada en la caché.
+
+⚠️ Dentro de las lambdas solo se usan variables con VALORES (números,
+textos, fechas, listas); nunca se construyen partes de la consulta que
+dependan de ellos con if/for (eso se hace fuera de la lambda).
+"""
+
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, func, lambda_stmt, select, tuple_
+from sqlalchemy.orm import Session, aliased
+
+from .models import Cliente, HistorialAuditoria, Producto
+
+# Alias para pasos_de_registros(): la fila pedida y su último punto completo
+_pedida = aliased(HistorialAuditoria, name="pedida")
+_punto = aliased(HistorialAuditoria, name="punto")
+
+
+def producto_por_id(db: Session, producto_id: int) -> Optional[Producto]:
+    """SELECT ... FROM productos WHERE id = :id"""
+    sentencia = lambda_stmt(lambda: select(Producto).where(Producto.id == producto_id))
+    return db.execute(sentencia).scalars().first()
+
+
+def cliente_por_id(db: Session, cliente_id: int) -> Optional[Cliente]:
+    """SELECT ... FROM clientes WHERE id = :id"""
+    sentencia = lambda_stmt(lambda: select(Cliente).where(Cliente.id == cliente_id))
+    return db.execute(sentencia).scalars().first()
+
+
+def cliente_activo_por_email(db: Session, email: str) -> Optional[Cliente]:
+    """SELECT ... FROM clientes WHERE email = :email AND activo"""
+    sentencia = lambda_stmt(
+        lambda: select(Cliente).where(Cliente.email == email, Cliente.activo == True)
+    )
+    return db.execute(sentencia).scalars().first()
+
+
+def historial_filtrado(
+    db: Session,
+    tabla: Optional[str],
+    operacion: Optional[str],
+    grupo: Optional[str],
+    id_registro: Optional[int],
+    desde: Optional[datetime],
+    hasta: Optional[datetime],
+    limite: Optional[int],
+    despues_de: Optional[Tuple[datetime, int]] = None
+) -> List[HistorialAuditoria]:
+    """
+    Filas del historial con los filtros dados (None = sin filtro),
+    de la más reciente a la más antigua.
+
+    'despues_de' es el (fecha_operacion, id) de la última fila de la
+    página anterior: se continúa justo después (cursor).
+    """
+    sentencia = lambda_stmt(lambda: select(HistorialAuditoria))
+    if tabla is not None:
+        sentencia += lambda s: s.where(HistorialAuditoria.tabla_afectada == tabla)
+    if operacion is not None:
+        sentencia += lambda s: s.where(HistorialAuditoria.operacion == operacion)
+    if grupo is not None:
+        sentencia += lambda s: s.where(HistorialAuditoria.grupo_responsable == grupo)
+    if id_registro is not None:
+        sentencia += lambda s: s.where(HistorialAuditoria.id_registro == id_registro)
+    if desde is not None:
+        sentencia += lambda s: s.where(HistorialAuditoria.fecha_operacion >= desde)
+    if hasta is not None:
+        sentencia += lambda s: s.where(HistorialAuditoria.fecha_operacion < hasta)
+    if despues_de is not None:
+        fecha_cursor, id_cursor = despues_de
+        sentencia += lambda s: s.where(
+            tuple_(HistorialAuditoria.fecha_operacion, HistorialAuditoria.id) < tuple_(fecha_cursor, id_cursor)
+        )
+
+    sentencia += lambda s: s.order_by(HistorialAuditoria.fecha_operacion.desc(), HistorialAuditoria.id.desc())
+    if limite is not None:
+        sentencia += lambda s: s.limit(limite)
+
+    return db.execute(sentencia).scalars().all()
+
+
+def pasos_de_registros(db: Session, filas: Sequence[int]) -> List[Any]:
+    """
+    Lo que necesita auditoria_compacta.reconstruir() para las filas 'filas'
+    (ids del historial): para cada una, las filas de su registro desde el
+    último punto completo hasta ella, en orden de id.
+
+    Cada fila pedida lee como máximo AUDITORIA_PUNTO_COMPLETO_CADA + 1
+    filas. Si dos filas pedidas comparten tramo, sus pasos se repiten
+    (seguidos, por el orden de id).
+    """
+    # La lista va en un parámetro expandido (IN (:filas_1, :filas_2, ...))
+    sentencia = lambda_stmt(
+        lambda: select(
+            HistorialAuditoria.id,
+            HistorialAuditoria.tabla_afectada,
+            HistorialAuditoria.id_registro,
+            HistorialAuditoria.operacion,
+            HistorialAuditoria.datos_anteriores,
+            HistorialAuditoria.datos_nuevos,
+            HistorialAuditoria.completo,
+        )
+        .join(
+            _pedida,
+            (_pedida.tabla_afectada == HistorialAuditoria.tabla_afectada)
+            & (_pedida.id_registro == HistorialAuditoria.id_registro)
+            & (HistorialAuditoria.id <= _pedida.id)
+        )
+        .where(_pedida.id.in_(bindparam("filas", expanding=True)))
+        .where(
+            HistorialAuditoria.id >= select(func.coalesce(func.max(_punto.id), 0))
+            .where(
+                _punto.tabla_afectada == _pedida.tabla_afectada,
+                _punto.id_registro == _pedida.id_registro,
+                _punto.completo == True,
+                _punto.id <= _pedida.id,
+            )
+            .scalar_subquery()
+        )
+        .order_by(HistorialAuditoria.id.asc())
+    )
+    return db.execute(sentencia, {"filas": list(filas)}).all()
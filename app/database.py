@@ -8,10 +8,17 @@ trabajar con la base de datos usando objetos de Python en lugar
 de escribir SQL directamente.
 """
 
+import itertools
+import time
+from typing import Dict, Optional
+
+from fastapi import Request
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
+from .grupo import grupo_de_headers
+from .plazos import instalar_en_motor, instalar_en_sesiones
 
 # ========================================
 # MOTOR DE BASE DE DATOS
@@ -23,14 +30,45 @@ Se encarga de gestionar las conexiones.
 Parámetros:
 - connect_args: {"check_same_thread": False} es para SQLite, pero no afecta a PostgreSQL
 - pool_pre_ping: True verifica que la conexión esté viva antes de usarla
+- pool_size / max_overflow / pool_timeout: tamaño del pool (ver servidor.py,
+  que lo reparte entre los workers)
+- query_cache_size: cuántas consultas compiladas se guardan (ver app/consultas.py)
 - echo: False significa que no imprimirá todas las queries SQL (útil para debugging si es True)
 """
 engine = create_engine(
     settings.database_url,
     pool_pre_ping=True,  # Verifica conexiones antes de usarlas
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    query_cache_size=settings.DB_CACHE_SENTENCIAS,
     echo=False  # Cambia a True si quieres ver las queries SQL en consola
 )
 
+# ========================================
+# RÉPLICAS DE LECTURA (OPCIONAL)
+# ========================================
+"""
+Si DB_REPLICA_HOSTS tiene valores, los endpoints de solo lectura
+(listar, obtener, buscar y toda la auditoría) usan estas réplicas.
+Las escrituras siempre van al servidor principal ('engine').
+"""
+motores_replica = [
+    create_engine(
+        url,
+        pool_pre_ping=True,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        query_cache_size=settings.DB_CACHE_SENTENCIAS,
+        echo=False
+    )
+    for url in settings.replica_urls
+]
+
+# Reparte las lecturas entre las réplicas por turnos (round-robin)
+_turno_replicas = itertools.cycle(motores_replica) if motores_replica else None
+
 # ========================================
 # FÁBRICA DE SESIONES
 # ========================================
@@ -45,6 +83,18 @@ SessionLocal = sessionmaker(
     bind=engine        # Asociar con nuestro engine de PostgreSQL
 )
 
+# ========================================
+# PLAZOS Y CANCELACIÓN DE CONSULTAS
+# ========================================
+"""
+Cada transacción de una petición lleva su statement_timeout, y las
+consultas de una petición cuyo cliente se desconectó se cancelan
+(ver app/plazos.py y app/middleware/cancelacion.py).
+"""
+for motor in [engine, *motores_replica]:
+    instalar_en_motor(motor)
+instalar_en_sesiones(SessionLocal)
+
 # ========================================
 # CLASE BASE PARA MODELOS
 # ========================================
@@ -80,3 +130,92 @@ def get_db():
         yield db  # Proporcionar la sesión al endpoint
     finally:
         db.close()  # Cerrar la sesión cuando termine (siempre se ejecuta)
+
+
+# ========================================
+# LEER TUS PROPIAS ESCRITURAS
+# ========================================
+"""
+Las réplicas van unos milisegundos (o segundos) atrasadas respecto al
+servidor principal. Si un grupo acaba de crear un producto y lo consulta
+de inmediato, podría no verlo en la réplica.
+
+Por eso, durante DB_VENTANA_LECTURA_PRIMARIA segundos después de escribir,
+las lecturas de ese grupo se envían al servidor principal. La última
+escritura se recuerda en memoria (por grupo) y en una cookie, para que
+funcione aunque la siguiente petición la atienda otro worker.
+"""
+COOKIE_ULTIMA_ESCRITURA = "ultima_escritura"
+
+_ultimas_escrituras: Dict[str, float] = {}  # grupo -> time.time() de su última escritura
+
+
+def registrar_escritura(grupo: str) -> float:
+    """
+    Anota que un grupo acaba de escribir.
+
+    Args:
+        grupo: Grupo que hizo la escritura
+
+    Returns:
+        float: Momento de la escritura (segundos desde epoch)
+    """
+    ahora = time.time()
+    _ultimas_escrituras[grupo] = ahora
+    return ahora
+
+
+def _escribio_recientemente(request: Request) -> bool:
+    """Indica si quien hace la petición escribió dentro de la ventana"""
+    ventana = settings.DB_VENTANA_LECTURA_PRIMARIA
+    ahora = time.time()
+
+    ultima = _ultimas_escrituras.get(grupo_de_headers(request.headers), 0.0)
+    if ahora - ultima < ventana:
+        return True
+
+    try:
+        cookie = float(request.cookies.get(COOKIE_ULTIMA_ESCRITURA, 0))
+    except ValueError:
+        return False
+    return ahora - cookie < ventana
+
+
+def elegir_motor_lectura(request: Optional[Request] = None):
+    """
+    Elige el motor para una lectura: una réplica o el servidor principal.
+
+    Args:
+        request: Petición actual (para saber si escribió recientemente)
+
+    Returns:
+        Engine: Motor de SQLAlchemy a usar
+    """
+    if _turno_replicas is None:
+        return engine
+    if request is not None and _escribio_recientemente(request):
+        return engine
+    return next(_turno_replicas)
+
+
+def get_db_lectura(request: Request):
+    """
+    Igual que get_db(), pero para endpoints de SOLO LECTURA.
+
+    Usa una réplica si está configurada; si no, el servidor principal.
+
+    Yields:
+        Session: Sesión de base de datos (no se debe usar para escribir)
+    """
+    db = SessionLocal(bind=elegir_motor_lectura(request))
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def cerrar_conexiones():
+    """Cierra los pools de conexiones del principal y de las réplicas"""
+    engine.dispose()
+    for motor in motores_replica:
+        motor.dispose()
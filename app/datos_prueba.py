@@ -0,0 +1,521 @@
+"""
+========================================
+DATOS DE PRUEBA MASIVOS (COPY)
+========================================
+scripts/init_db.sql solo trae unas decenas de filas escritas a mano.
+Para probar carga o preparar un entorno de staging hacen falta millones,
+y generarlas con INSERT (o a través de la API) toma horas.
+
+Este módulo genera productos, clientes y su historial de auditoría:
+
+- Deterministas: la misma semilla y la misma escala producen
+  exactamente los mismos datos.
+- Realistas: nombres, precios por categoría, ciudades, stock agotado,
+  registros desactivados y un historial con el mismo formato que
+  escribe la API (CREATE completo, UPDATE solo con diferencias y un
+  punto completo cada tantas versiones, DELETE lógico; ver
+  app/auditoria_compacta.py).
+- Únicos: email y documento se derivan del id del cliente.
+
+La carga va por COPY, en UNA transacción:
+
+1. Se quitan TODOS los índices de las tablas a cargar: la llave
+   primaria, las restricciones UNIQUE (email y documento de clientes)
+   y los índices secundarios (se guarda su definición).
+2. Las filas se generan mientras COPY las lee: no se arman listas en
+   memoria, así que 10 millones de filas usan la misma RAM que 1.000.
+   El historial se va escribiendo en un archivo temporal y se carga
+   con un tercer COPY.
+3. Se recrean los índices (una construcción ordenada es mucho más
+   rápida que mantenerlos fila por fila), se ajustan las secuencias y
+   se suman los conteos a 'resumen_auditoria_hora'. Un id, email o
+   documento repetido hace fallar la recreación de su restricción y
+   se deshace toda la carga.
+
+Se usa desde la línea de comandos con poblar_datos.py.
+"""
+
+import json
+import logging
+import random
+import tempfile
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import IO, Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from .auditoria_compacta import diferencia, es_punto_completo
+from .autocompletar import normalizar
+
+logger = logging.getLogger(__name__)
+
+# Tablas que se cargan (en este orden)
+TABLAS = ("productos", "clientes", "historial_auditoria")
+
+# Cada cuántas filas se informa el avance
+AVISAR_CADA = 1_000_000
+
+# Memoria para reconstruir índices (solo en esta transacción)
+MEMORIA_INDICES = "1GB"
+
+CAMPOS_PRODUCTOS = ("nombre", "descripcion", "precio", "stock", "categoria", "imagen_url", "activo")
+CAMPOS_CLIENTES = ("nombre", "email", "telefono", "direccion", "ciudad", "documento", "activo")
+
+COLUMNAS_PRODUCTOS = (
+    "id", "nombre", "descripcion", "precio", "stock", "categoria", "imagen_url", "activo",
+    "fecha_creacion", "fecha_actualizacion", "grupo_creador", "grupo_ultima_modificacion", "version"
+)
+COLUMNAS_CLIENTES = (
+    "id", "nombre", "email", "telefono", "direccion", "ciudad", "documento", "activo",
+    "fecha_creacion", "fecha_actualizacion", "grupo_creador", "grupo_ultima_modificacion", "version"
+)
+# Sin 'id': lo asigna la secuencia de la tabla
+COLUMNAS_AUDITORIA = (
+    "tabla_afectada", "id_registro", "operacion", "grupo_responsable",
+    "datos_anteriores", "datos_nuevos", "fecha_operacion", "observaciones", "completo"
+)
+
+# Documento de los clientes generados: 8000000000 + id (10 dígitos, no
+# choca con los documentos de ejemplo de init_db.sql)
+BASE_DOCUMENTO = 8_000_000_000
+
+
+# ========================================
+# VOCABULARIO
+# ========================================
+
+# categoría -> (tipos de producto, marcas, rango de precio en COP)
+CATALOGO: Dict[str, Tuple[Sequence[str], Sequence[str], Tuple[int, int]]] = {
+    "Electrónica": (
+        ("Laptop", "Celular", "Tablet", "Monitor", "Audífonos", "Teclado", "Mouse", "Parlante", "Smartwatch", "Cámara"),
+        ("HP", "Lenovo", "Samsung", "Apple", "Xiaomi", "LG", "Logitech", "Sony", "Asus", "JBL"),
+        (80_000, 6_000_000),
+    ),
+    "Ropa": (
+        ("Camiseta", "Jeans", "Chaqueta", "Zapatillas", "Vestido", "Sudadera", "Camisa", "Falda", "Gorra", "Bermuda"),
+        ("Nike", "Adidas", "Zara", "Levi's", "Puma", "Arturo Calle", "Studio F", "Tennis", "Totto", "Reebok"),
+        (30_000, 600_000),
+    ),
+    "Hogar": (
+        ("Cafetera", "Licuadora", "Juego de Ollas", "Aspiradora", "Ventilador", "Sartén", "Lámpara", "Freidora de Aire", "Plancha", "Vajilla"),
+        ("Oster", "T-fal", "Xiaomi", "Rowenta", "Imusa", "Black+Decker", "Philips", "Samurai", "Universal", "Haceb"),
+        (25_000, 1_500_000),
+    ),
+    "Deportes": (
+        ("Bicicleta", "Mancuernas", "Colchoneta", "Balón", "Guantes", "Casco", "Raqueta", "Banda Elástica", "Maleta Deportiva", "Termo"),
+        ("Trek", "GW", "Adidas", "Nike", "Wilson", "Everlast", "Specialized", "Head", "Under Armour", "Golty"),
+        (20_000, 3_500_000),
+    ),
+    "Libros": (
+        ("Novela", "Antología de Cuentos", "Guía de Programación", "Manual de Cocina", "Biografía", "Ensayo", "Atlas", "Libro Infantil", "Poemario", "Curso de Inglés"),
+        ("Planeta", "Penguin Random House", "Norma", "Alfaguara", "Anagrama", "O'Reilly", "Panamericana", "Santillana", "Siruela", "Salamandra"),
+        (20_000, 180_000),
+    ),
+}
+
+MODELOS = ("Pro", "Max", "Lite", "Plus", "Classic", "Air", "Ultra", "Sport", "Mini", "Edición Especial")
+ADJETIVOS = ("resistente", "liviano", "de alta calidad", "con garantía de 1 año", "ideal para regalo",
+             "de diseño moderno", "fácil de usar", "con envío incluido", "recomendado", "de última generación")
+
+NOMBRES = ("María", "Carlos", "Ana", "Juan", "Laura", "Andrés", "Valentina", "Santiago", "Camila", "Felipe",
+           "Daniela", "Sebastián", "Natalia", "Mateo", "Sofía", "Alejandro", "Paula", "Julián", "Isabella", "Diego")
+APELLIDOS = ("González", "Rodríguez", "Martínez", "López", "García", "Pérez", "Ramírez", "Torres", "Díaz", "Vargas",
+             "Moreno", "Jiménez", "Restrepo", "Castro", "Ospina", "Gómez", "Muñoz", "Rojas", "Herrera", "Cárdenas")
+CIUDADES = ("Medellín", "Bogotá", "Cali", "Barranquilla", "Cartagena", "Bucaramanga", "Pereira", "Manizales",
+            "Santa Marta", "Ibagué", "Cúcuta", "Villavicencio", "Pasto", "Montería", "Armenia")
+VIAS = ("Calle", "Carrera", "Avenida", "Transversal", "Diagonal")
+
+GRUPOS = tuple(f"GRUPO_{n}" for n in range(1, 11))
+
+
+class Escala(NamedTuple):
+    """Cuántos datos generar"""
+    productos: int
+    clientes: int
+    cambios_por_registro: int  # UPDATE promedio en el historial de cada registro
+    dias: int  # Las fechas se reparten en los últimos N días
+
+
+# ========================================
+# FORMATO TEXTO DE COPY
+# ========================================
+
+_ESCAPES_COPY = str.maketrans({"\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _valor_copy(valor: Any) -> str:
+    """Convierte un valor al formato texto de COPY (NULL = \\N)"""
+    if valor is None:
+        return "\\N"
+    if valor is True:
+        return "t"
+    if valor is False:
+        return "f"
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    texto = str(valor)
+    # Casi ningún valor lleva caracteres especiales: se evita translate() si no hace falta
+    if "\\" in texto:
+        texto = texto.replace("\\", "\\\\")
+    if "\t" in texto or "\n" in texto or "\r" in texto:
+        texto = texto.translate(_ESCAPES_COPY)
+    return texto
+
+
+def _linea_copy(valores: Iterable[Any]) -> str:
+    """Una fila de COPY: valores separados por tabulador"""
+    return "\t".join(_valor_copy(v) for v in valores) + "\n"
+
+
+class _FlujoCopy:
+    """
+    Objeto tipo archivo para cursor.copy_expert(): genera las filas a
+    medida que PostgreSQL las pide.
+    """
+
+    def __init__(self, lineas: Iterator[str]):
+        self._lineas = lineas
+        self._pendiente = b""
+
+    def read(self, tamano: int = -1) -> bytes:
+        partes = [self._pendiente]
+        largo = len(self._pendiente)
+        for linea in self._lineas:
+            datos = linea.encode("utf-8")
+            partes.append(datos)
+            largo += len(datos)
+            if 0 <= tamano <= largo:
+                break
+        datos = b"".join(partes)
+        if tamano < 0:
+            self._pendiente = b""
+            return datos
+        self._pendiente = datos[tamano:]
+        return datos[:tamano]
+
+
+# ========================================
+# GENERACIÓN
+# ========================================
+
+def _json(datos: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Mismo formato JSON que registrar_auditoria()"""
+    return json.dumps(datos, default=str, separators=(",", ":")) if datos else None
+
+
+def _fechas_historial(azar: random.Random, inicio: datetime, dias: int, eventos: int) -> List[datetime]:
+    """Fechas crecientes para los eventos de un registro dentro del periodo"""
+    segundos = max(dias, 1) * 86_400
+    return [inicio + timedelta(seconds=s) for s in sorted(azar.randrange(segundos) for _ in range(eventos))]
+
+
+def _historial(
+    azar: random.Random,
+    estado: Dict[str, Any],
+    cambiar: Any,
+    escala: Escala,
+    inicio: datetime,
+    desactivar: bool
+) -> Tuple[Dict[str, Any], List[Tuple], datetime, datetime, str, str, int]:
+    """
+    Simula la vida de un registro: CREATE, algunos UPDATE y quizás DELETE.
+
+    Args:
+        estado: Campos auditados al crearse
+        cambiar: Función (azar, estado) -> dict con los campos que cambian
+
+    Returns:
+        Tuple: (estado final, eventos, fecha_creacion, fecha_actualizacion,
+                grupo_creador, grupo_ultima_modificacion, version)
+        Cada evento es (operacion, grupo, antes, despues, fecha, completo),
+        con los puntos completos de app/auditoria_compacta.py.
+    """
+    cambios = azar.randint(0, 2 * escala.cambios_por_registro) if escala.cambios_por_registro else 0
+    fechas = _fechas_historial(azar, inicio, escala.dias, 1 + cambios + (1 if desactivar else 0))
+
+    creador = azar.choice(GRUPOS)
+    eventos = [("CREATE", creador, None, dict(estado), fechas[0], True)]
+    grupo = creador
+
+    for fecha in fechas[1:1 + cambios]:
+        grupo = azar.choice(GRUPOS)
+        nuevo = dict(estado)
+        nuevo.update(cambiar(azar, estado))
+        antes, despues = diferencia(estado, nuevo)
+        if despues:
+            # La versión después del cambio es la posición del evento
+            completo = es_punto_completo("UPDATE", len(eventos) + 1)
+            eventos.append(("UPDATE", grupo, dict(estado) if completo else antes, despues, fecha, completo))
+        estado = nuevo
+
+    if desactivar:
+        grupo = azar.choice(GRUPOS)
+        estado = dict(estado, activo=False)
+        eventos.append(("DELETE", grupo, dict(estado, activo=True), {"activo": False}, fechas[-1], True))
+
+    # Cada modificación sube la versión (ver app/concurrencia.py)
+    version = len(eventos)
+    return estado, eventos, fechas[0], eventos[-1][4], creador, grupo, version
+
+
+def _productos(escala: Escala, semilla: int, id_inicial: int, inicio: datetime) -> Iterator[Tuple[int, Sequence[str], Tuple]]:
+    """Genera (id, campos, historial) de cada producto (ver _historial)"""
+    azar = random.Random(f"{semilla}:productos")
+    categorias = list(CATALOGO)
+
+    def cambiar(azar: random.Random, estado: Dict[str, Any]) -> Dict[str, Any]:
+        if azar.random() < 0.6:
+            return {"stock": max(0, estado["stock"] + azar.randint(-20, 30))}
+        factor = Decimal(azar.choice(("0.90", "0.95", "1.05", "1.10")))
+        return {"precio": float(max(Decimal(100), (Decimal(str(estado["precio"])) * factor).quantize(Decimal(100))))}
+
+    for i in range(escala.productos):
+        producto_id = id_inicial + i
+        categoria = categorias[azar.randrange(len(categorias))]
+        tipos, marcas, (minimo, maximo) = CATALOGO[categoria]
+        tipo, marca = azar.choice(tipos), azar.choice(marcas)
+        estado = {
+            "nombre": f"{tipo} {marca} {azar.choice(MODELOS)} {azar.randint(1, 99)}",
+            "descripcion": f"{tipo} {marca} {azar.choice(ADJETIVOS)}, {azar.choice(ADJETIVOS)}",
+            "precio": float(azar.randrange(minimo, maximo, 100)),
+            "stock": 0 if azar.random() < 0.08 else azar.randint(1, 200),
+            "categoria": categoria,
+            "imagen_url": f"https://picsum.photos/seed/p{producto_id}/400/300",
+            "activo": True,
+        }
+        historial = _historial(azar, estado, cambiar, escala, inicio, azar.random() < 0.05)
+        yield producto_id, CAMPOS_PRODUCTOS, historial
+
+
+def _clientes(escala: Escala, semilla: int, id_inicial: int, inicio: datetime) -> Iterator[Tuple[int, Sequence[str], Tuple]]:
+    """Genera (id, campos, historial) de cada cliente (ver _historial)"""
+    azar = random.Random(f"{semilla}:clientes")
+
+    def telefono(azar: random.Random) -> str:
+        return f"+57 3{azar.randint(0, 25):02d} {azar.randint(100, 999)} {azar.randint(1000, 9999)}"
+
+    def direccion(azar: random.Random) -> str:
+        return f"{azar.choice(VIAS)} {azar.randint(1, 150)} #{azar.randint(1, 120)}-{azar.randint(1, 99)}"
+
+    def cambiar(azar: random.Random, estado: Dict[str, Any]) -> Dict[str, Any]:
+        eleccion = azar.random()
+        if eleccion < 0.4:
+            return {"telefono": telefono(azar)}
+        if eleccion < 0.8:
+            return {"direccion": direccion(azar)}
+        return {"ciudad": azar.choice(CIUDADES), "direccion": direccion(azar)}
+
+    for i in range(escala.clientes):
+        cliente_id = id_inicial + i
+        nombre, apellido, segundo = azar.choice(NOMBRES), azar.choice(APELLIDOS), azar.choice(APELLIDOS)
+        # El id hace únicos el email y el documento aunque se repita el nombre
+        usuario = normalizar(f"{nombre}.{apellido}").replace(" ", "")
+        estado = {
+            "nombre": f"{nombre} {apellido} {segundo}",
+            "email": f"{usuario}.{cliente_id}@ejemplo.com",
+            "telefono": telefono(azar),
+            "direccion": direccion(azar),
+            "ciudad": azar.choice(CIUDADES),
+            "documento": str(BASE_DOCUMENTO + cliente_id),
+            "activo": True,
+        }
+        historial = _historial(azar, estado, cambiar, escala, inicio, azar.random() < 0.03)
+        yield cliente_id, CAMPOS_CLIENTES, historial
+
+
+def _lineas_tabla(
+    registros: Iterator[Tuple[int, Sequence[str], Tuple]],
+    tabla: str,
+    auditoria: IO[bytes],
+    observacion: str
+) -> Iterator[str]:
+    """
+    Filas COPY de productos o clientes.
+
+    El historial de cada registro se escribe a la vez en 'auditoria' (ya
+    en formato COPY): así cada registro se genera una sola vez y el
+    historial se carga después desde ese archivo.
+    """
+    for numero, (registro_id, campos, historial) in enumerate(registros, 1):
+        estado, eventos, creacion, actualizacion, creador, ultimo, version = historial
+        yield _linea_copy((
+            registro_id, *(estado[c] for c in campos),
+            creacion, actualizacion, creador, ultimo, version
+        ))
+        auditoria.write("".join(
+            _linea_copy((tabla, registro_id, operacion, grupo, _json(antes), _json(despues), fecha, observacion, completo))
+            for operacion, grupo, antes, despues, fecha, completo in eventos
+        ).encode("utf-8"))
+        if numero % AVISAR_CADA == 0:
+            logger.info(f"   {tabla}: {numero:,} filas")
+
+
+# ========================================
+# CARGA
+# ========================================
+
+def _quitar_indices(cursor: Any, tabla: str) -> List[str]:
+    """
+    Quita la llave primaria, las restricciones UNIQUE y los índices secundarios.
+
+    Ninguna tabla cargada es referenciada por una llave foránea, así que
+    la llave primaria se puede quitar dentro de la transacción.
+
+    Returns:
+        List[str]: Sentencias para volver a crearlos
+    """
+    cursor.execute(
+        """
+        SELECT c.conname, pg_get_constraintdef(c.oid)
+        FROM pg_constraint c
+        WHERE c.conrelid = %s::regclass AND c.contype IN ('p', 'u')
+        ORDER BY c.contype
+        """,
+        (tabla,)
+    )
+    restricciones = cursor.fetchall()
+
+    cursor.execute(
+        """
+        SELECT i.relname, pg_get_indexdef(i.oid)
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        WHERE x.indrelid = %s::regclass
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)
+        """,
+        (tabla,)
+    )
+    indices = cursor.fetchall()
+
+    recrear = []
+    for nombre, definicion in restricciones:
+        cursor.execute(f'ALTER TABLE {tabla} DROP CONSTRAINT "{nombre}"')
+        recrear.append(f'ALTER TABLE {tabla} ADD CONSTRAINT "{nombre}" {definicion}')
+    for nombre, definicion in indices:
+        cursor.execute(f'DROP INDEX "{nombre}"')
+        recrear.append(definicion)
+    return recrear
+
+
+def _copiar(cursor: Any, tabla: str, columnas: Sequence[str], origen: Any, congelar: bool) -> None:
+    """
+    COPY FROM STDIN desde un archivo (o un _FlujoCopy con las filas generadas).
+
+    Args:
+        congelar: FREEZE (solo si la tabla se vació en esta transacción):
+                  las filas quedan visibles sin que VACUUM tenga que reescribirlas
+    """
+    opciones = " WITH (FREEZE)" if congelar else ""
+    cursor.copy_expert(
+        f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN{opciones}",
+        origen,
+        size=1 << 20
+    )
+
+
+def _siguiente_id(cursor: Any, tabla: str) -> int:
+    cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {tabla}")
+    return cursor.fetchone()[0]
+
+
+def poblar(
+    conexion: Any,
+    escala: Escala,
+    semilla: int = 42,
+    truncar: bool = False,
+    fin: Optional[datetime] = None
+) -> Dict[str, int]:
+    """
+    Genera y carga los datos en una sola transacción.
+
+    Args:
+        conexion: Conexión psycopg2 (engine.raw_connection())
+        escala: Cantidad de datos a generar
+        semilla: Misma semilla = mismos datos
+        truncar: Vacía productos, clientes y auditoría antes de cargar
+                 (los ids empiezan en 1 y el resultado es reproducible)
+        fin: Fecha más reciente del historial (por defecto, hoy a medianoche UTC)
+
+    Returns:
+        Dict[str, int]: Filas cargadas por tabla
+    """
+    if fin is None:
+        fin = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    inicio = fin - timedelta(days=escala.dias)
+    observacion = f"Datos de prueba (semilla {semilla})"
+
+    cursor = conexion.cursor()
+    try:
+        # La carga se puede repetir si falla: no hace falta esperar el WAL en disco
+        cursor.execute("SET LOCAL synchronous_commit = off")
+        cursor.execute(f"SET LOCAL maintenance_work_mem = '{MEMORIA_INDICES}'")
+
+        if truncar:
+            cursor.execute(
+                "TRUNCATE productos, clientes, productos_archivo, clientes_archivo, "
+                "historial_auditoria, resumen_auditoria_hora RESTART IDENTITY"
+            )
+
+        recrear: List[str] = []
+        for tabla in TABLAS:
+            recrear.extend(_quitar_indices(cursor, tabla))
+        logger.info(f"🔧 {len(recrear)} índices y restricciones se recrearán al final")
+
+        id_producto = _siguiente_id(cursor, "productos")
+        id_cliente = _siguiente_id(cursor, "clientes")
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM historial_auditoria")
+        ultimo_historial = cursor.fetchone()[0]
+
+        with tempfile.TemporaryFile() as auditoria:
+            logger.info(f"📦 Cargando {escala.productos:,} productos")
+            productos = _productos(escala, semilla, id_producto, inicio)
+            _copiar(cursor, "productos", COLUMNAS_PRODUCTOS,
+                    _FlujoCopy(_lineas_tabla(productos, "productos", auditoria, observacion)), truncar)
+
+            logger.info(f"👥 Cargando {escala.clientes:,} clientes")
+            clientes = _clientes(escala, semilla, id_cliente, inicio)
+            _copiar(cursor, "clientes", COLUMNAS_CLIENTES,
+                    _FlujoCopy(_lineas_tabla(clientes, "clientes", auditoria, observacion)), truncar)
+
+            logger.info("📋 Cargando historial de auditoría")
+            auditoria.seek(0)
+            _copiar(cursor, "historial_auditoria", COLUMNAS_AUDITORIA, auditoria, truncar)
+
+        logger.info("🔧 Recreando índices")
+        for sentencia in recrear:
+            cursor.execute(sentencia)
+
+        # Los ids se dieron a mano: la secuencia debe seguir después del mayor
+        for tabla in TABLAS:
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), "
+                f"(SELECT COALESCE(MAX(id), 1) FROM {tabla}))"
+            )
+
+        cursor.execute(
+            """
+            INSERT INTO resumen_auditoria_hora (hora, grupo_responsable, tabla_afectada, operacion, total)
+            SELECT date_trunc('hour', fecha_operacion), grupo_responsable, tabla_afectada, operacion, COUNT(*)
+            FROM historial_auditoria
+            WHERE id > %s
+            GROUP BY 1, 2, 3, 4
+            ON CONFLICT (hora, grupo_responsable, tabla_afectada, operacion, particion)
+            DO UPDATE SET total = resumen_auditoria_hora.total + EXCLUDED.total
+            """,
+            (ultimo_historial,)
+        )
+
+        cursor.execute("SELECT COUNT(*) FROM historial_auditoria WHERE id > %s", (ultimo_historial,))
+        auditoria = cursor.fetchone()[0]
+
+        # Estadísticas frescas para que el planificador no asuma tablas vacías
+        for tabla in TABLAS:
+            cursor.execute(f"ANALYZE {tabla}")
+
+        conexion.commit()
+    except Exception:
+        conexion.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    return {"productos": escala.productos, "clientes": escala.clientes, "historial_auditoria": auditoria}
@@ -0,0 +1,260 @@
+"""
+========================================
+EVENTOS DE AUDITORÍA EN VIVO (LISTEN/NOTIFY)
+========================================
+En lugar de consultar GET /auditoria/ cada pocos segundos, los paneles
+pueden abrir GET /auditoria/eventos y recibir cada registro nuevo en el
+momento en que se guarda (Server-Sent Events).
+
+¿Cómo funciona?
+---------------
+1. registrar_auditoria() ejecuta pg_notify('auditoria_nueva', ...) dentro
+   de la misma transacción: PostgreSQL solo envía el aviso si hay COMMIT.
+2. Cada worker mantiene UNA conexión con LISTEN auditoria_nueva.
+3. Al llegar un aviso, el worker carga los registros una sola vez y los
+   reparte a todos los clientes conectados cuyos filtros coinciden.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Dict, List, Optional, Set
+
+import psycopg2
+import psycopg2.extensions
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from . import database
+from .config import settings
+from .auditoria_compacta import reconstruir
+from .models import HistorialAuditoria
+
+logger = logging.getLogger(__name__)
+
+# Canal de PostgreSQL por donde se avisan los registros nuevos
+CANAL_AUDITORIA = "auditoria_nueva"
+
+# Eventos pendientes por cliente; si se llena, el cliente se desconecta
+# y debe reconectarse con Last-Event-ID para continuar donde quedó
+MAX_EVENTOS_PENDIENTES = 1000
+
+
+def notificar_auditoria(db: Session, auditoria: HistorialAuditoria) -> None:
+    """
+    Avisa por LISTEN/NOTIFY que se escribió un registro de auditoría.
+
+    Debe llamarse ANTES del commit (después de db.flush() para tener el id).
+    El aviso solo sale si la transacción se confirma.
+
+    Args:
+        db: Sesión de base de datos
+        auditoria: Registro de auditoría recién insertado
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+
+    datos = json.dumps({
+        "id": auditoria.id,
+        "tabla": auditoria.tabla_afectada,
+        "operacion": auditoria.operacion,
+        "grupo": auditoria.grupo_responsable,
+    })
+    db.execute(text("SELECT pg_notify(:canal, :datos)"), {"canal": CANAL_AUDITORIA, "datos": datos})
+
+
+class Suscripcion:
+    """
+    Un cliente conectado al stream, con sus filtros.
+
+    Los filtros en None significan "todos".
+    """
+
+    def __init__(
+        self,
+        tabla: Optional[str] = None,
+        operacion: Optional[str] = None,
+        grupo: Optional[str] = None
+    ):
+        self.tabla = tabla
+        self.operacion = operacion.upper() if operacion else None
+        self.grupo = grupo
+        self.cola: "asyncio.Queue[Optional[dict]]" = asyncio.Queue(maxsize=MAX_EVENTOS_PENDIENTES)
+
+    def coincide(self, evento: dict) -> bool:
+        """Indica si un evento pasa los filtros de esta suscripción"""
+        return (
+            (self.tabla is None or evento["tabla"] == self.tabla)
+            and (self.operacion is None or evento["operacion"] == self.operacion)
+            and (self.grupo is None or evento["grupo"] == self.grupo)
+        )
+
+    def filtrar_consulta(self, query):
+        """Aplica los mismos filtros a una consulta de HistorialAuditoria"""
+        if self.tabla:
+            query = query.filter(HistorialAuditoria.tabla_afectada == self.tabla)
+        if self.operacion:
+            query = query.filter(HistorialAuditoria.operacion == self.operacion)
+        if self.grupo:
+            query = query.filter(HistorialAuditoria.grupo_responsable == self.grupo)
+        return query
+
+    def entregar(self, registro: Optional[dict]) -> bool:
+        """
+        Pone un registro en la cola del cliente.
+
+        Returns:
+            bool: False si el cliente va demasiado atrasado
+        """
+        try:
+            self.cola.put_nowait(registro)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def cerrar(self) -> None:
+        """Descarta lo pendiente y termina el stream del cliente"""
+        while not self.cola.empty():
+            self.cola.get_nowait()
+        self.cola.put_nowait(None)  # None = fin del stream
+
+
+class DifusorAuditoria:
+    """
+    Mantiene la conexión LISTEN del worker y reparte los eventos.
+
+    Hay una sola instancia por proceso: 'difusor'.
+    """
+
+    def __init__(self):
+        self._suscripciones: Set[Suscripcion] = set()
+        self._conexion = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def escuchando(self) -> bool:
+        """True si la conexión LISTEN está activa"""
+        return self._conexion is not None
+
+    def suscribir(self, suscripcion: Suscripcion) -> None:
+        """Registra un cliente; abre la conexión LISTEN si es el primero"""
+        self._suscripciones.add(suscripcion)
+        if self._conexion is None:
+            self._iniciar()
+
+    def cancelar(self, suscripcion: Suscripcion) -> None:
+        """Quita un cliente; cierra la conexión LISTEN si ya no quedan"""
+        self._suscripciones.discard(suscripcion)
+        if not self._suscripciones:
+            self.detener()
+
+    def _iniciar(self) -> None:
+        """Abre la conexión dedicada con LISTEN (fuera del pool)"""
+        if database.engine.dialect.name != "postgresql":
+            return
+        try:
+            conexion = psycopg2.connect(settings.database_url)
+            conexion.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conexion.cursor() as cursor:
+                cursor.execute(f"LISTEN {CANAL_AUDITORIA}")
+        except psycopg2.Error:
+            logger.exception("No se pudo abrir la conexión LISTEN de auditoría")
+            return
+
+        self._conexion = conexion
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(conexion.fileno(), self._al_recibir)
+
+    def detener(self) -> None:
+        """Cierra la conexión LISTEN y termina los streams abiertos"""
+        if self._conexion is not None:
+            try:
+                self._loop.remove_reader(self._conexion.fileno())
+                self._conexion.close()
+            except Exception:  # La conexión ya podía estar cerrada
+                pass
+            self._conexion = None
+
+        for suscripcion in list(self._suscripciones):
+            suscripcion.cerrar()
+        self._suscripciones.clear()
+
+    def _al_recibir(self) -> None:
+        """Se ejecuta cuando PostgreSQL envía uno o más avisos"""
+        try:
+            self._conexion.poll()
+        except psycopg2.Error:
+            logger.exception("Se perdió la conexión LISTEN de auditoría")
+            self.detener()  # Los clientes se reconectarán con Last-Event-ID
+            return
+
+        eventos = []
+        while self._conexion.notifies:
+            aviso = self._conexion.notifies.pop(0)
+            try:
+                eventos.append(json.loads(aviso.payload))
+            except ValueError:
+                continue
+
+        # Solo cargar los registros que le interesan a algún cliente
+        eventos = [e for e in eventos if any(s.coincide(e) for s in self._suscripciones)]
+        if eventos:
+            self._loop.create_task(self._distribuir(eventos))
+
+    async def _distribuir(self, eventos: List[dict]) -> None:
+        """Carga los registros (una sola consulta) y los reparte"""
+        registros = await run_in_threadpool(_cargar_registros, [e["id"] for e in eventos])
+
+        for evento in eventos:
+            registro = registros.get(evento["id"])
+            if registro is None:
+                continue
+            for suscripcion in list(self._suscripciones):
+                if suscripcion.coincide(evento) and not suscripcion.entregar(registro):
+                    # Cliente demasiado lento: se le cierra el stream
+                    self._suscripciones.discard(suscripcion)
+                    suscripcion.cerrar()
+
+
+def registros_desde(suscripcion: Suscripcion, ultimo_id: int, limite: int) -> List[dict]:
+    """
+    Registros con id mayor a 'ultimo_id' que pasan los filtros (para reanudar).
+
+    Se leen del servidor principal: una réplica atrasada podría omitir
+    registros cuyo aviso ya se envió antes de conectarse el cliente.
+
+    Args:
+        suscripcion: Cliente con sus filtros
+        ultimo_id: Último id que el cliente ya recibió
+        limite: Máximo de registros a devolver
+
+    Returns:
+        List[dict]: Registros en orden de id ascendente
+    """
+    db = database.SessionLocal(bind=database.engine)
+    try:
+        query = db.query(HistorialAuditoria).filter(HistorialAuditoria.id > ultimo_id)
+        filas = suscripcion.filtrar_consulta(query)\
+            .order_by(HistorialAuditoria.id.asc())\
+            .limit(limite)\
+            .all()
+        return reconstruir(db, filas)
+    finally:
+        db.close()
+
+
+def _cargar_registros(ids: List[int]) -> Dict[int, dict]:
+    """Lee los registros del servidor principal (las réplicas pueden ir atrasadas)"""
+    db = database.SessionLocal(bind=database.engine)
+    try:
+        filas = db.query(HistorialAuditoria).filter(HistorialAuditoria.id.in_(ids)).all()
+        return {registro["id"]: registro for registro in reconstruir(db, filas)}
+    finally:
+        db.close()
+
+
+# ========================================
+# INSTANCIA DEL PROCESO
+# ========================================
+difusor = DifusorAuditoria()
@@ -0,0 +1,115 @@
+"""
+========================================
+IDENTIDAD DEL GRUPO POR PETICIÓN
+========================================
+Antes cada grupo necesitaba su propio despliegue de la API porque el
+nombre del grupo se leía solo de GRUPO_ESTUDIANTES en el archivo .env.
+
+Ahora cada petición puede indicar su grupo:
+1. Con un token:   Authorization: Bearer <token>  (ver GRUPO_TOKENS)
+2. Con un header:  X-Grupo: GRUPO_3
+3. Si no envía nada, se usa GRUPO_ESTUDIANTES como antes.
+
+Así un solo despliegue (con un solo pool de conexiones) atiende a todos
+los grupos.
+"""
+
+import re
+from typing import Mapping, Optional
+
+from fastapi import Header, HTTPException, status
+
+from .config import settings
+
+# Nombre de grupo válido: letras, números, guion y guion bajo (máx. 50, como la columna)
+PATRON_GRUPO = re.compile(r"^[A-Za-z0-9_\-]{1,50}$")
+
+HEADER_GRUPO = "x-grupo"
+
+
+def resolver_grupo(
+    x_grupo: Optional[str] = None,
+    authorization: Optional[str] = None
+) -> str:
+    """
+    Determina qué grupo hace la petición.
+
+    Args:
+        x_grupo: Valor del header X-Grupo
+        authorization: Valor del header Authorization
+
+    Returns:
+        str: Nombre del grupo
+
+    Raises:
+        HTTPException 401: Si el token no corresponde a ningún grupo
+        HTTPException 400: Si el nombre del grupo no es válido
+        HTTPException 403: Si el grupo no está en GRUPOS_PERMITIDOS
+    """
+    grupo = None
+
+    # 1. Token (tiene prioridad sobre el header)
+    if authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:].strip()
+        grupo = settings.GRUPO_TOKENS.get(token)
+        if grupo is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token de grupo no válido"
+            )
+
+    # 2. Header X-Grupo
+    elif x_grupo:
+        grupo = x_grupo.strip()
+        if not PATRON_GRUPO.match(grupo):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="El header X-Grupo solo admite letras, números, '-' y '_' (máximo 50)"
+            )
+
+    # 3. Valor por defecto del .env
+    else:
+        return settings.GRUPO_ESTUDIANTES
+
+    if settings.GRUPOS_PERMITIDOS and grupo not in settings.GRUPOS_PERMITIDOS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"El grupo '{grupo}' no está autorizado en esta API"
+        )
+
+    return grupo
+
+
+def grupo_de_headers(headers: Mapping[str, str]) -> str:
+    """
+    Igual que resolver_grupo() pero a partir de los headers crudos.
+
+    Útil en middlewares, donde no hay inyección de dependencias.
+    Si los headers no son válidos devuelve el grupo por defecto;
+    el endpoint se encargará de rechazar la petición.
+    """
+    try:
+        return resolver_grupo(headers.get(HEADER_GRUPO), headers.get("authorization"))
+    except HTTPException:
+        return settings.GRUPO_ESTUDIANTES
+
+
+def obtener_grupo(
+    x_grupo: Optional[str] = Header(
+        None,
+        description="Grupo que realiza la operación (si no se envía, se usa el del .env)"
+    ),
+    authorization: Optional[str] = Header(None, include_in_schema=False)
+) -> str:
+    """
+    Dependencia de FastAPI que entrega el grupo de la petición.
+
+    Uso en endpoints:
+        @router.post("/")
+        def crear(grupo: str = Depends(obtener_grupo)):
+            ...
+
+    Returns:
+        str: Nombre del grupo responsable de la operación
+    """
+    return resolver_grupo(x_grupo, authorization)
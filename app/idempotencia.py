@@ -0,0 +1,229 @@
+"""
+========================================
+IDEMPOTENCIA (HEADER Idempotency-Key)
+========================================
+Las apps móviles reintentan un POST cuando no reciben respuesta. Si el
+primer intento sí llegó, el reintento volvía a insertar (duplicado),
+a escribir auditoría y a cargar la base de datos justo cuando la red
+ya estaba fallando.
+
+El cliente envía un valor único por operación:
+
+    POST /productos/
+    Idempotency-Key: 5f1c9a7e-...
+
+- Primera vez: se crea el registro y, en la MISMA transacción, se
+  guarda la respuesta en 'claves_idempotencia'.
+- Reintentos con la misma clave: reciben la respuesta guardada (con el
+  header Idempotent-Replayed: true) sin escribir nada.
+- Misma clave con datos distintos: 422 (la clave ya se usó para otra cosa).
+
+Si dos intentos llegan a la vez, la llave primaria (grupo, clave) hace
+que solo uno confirme; el otro deshace su inserción y devuelve la
+respuesta del primero. Si el registro tiene columnas únicas (email de
+clientes), el segundo intento choca antes con ellas, al hacer flush:
+insertar_o_repetir() resuelve ese caso de la misma forma.
+"""
+
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from fastapi import Header, HTTPException, Response, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models import ClaveIdempotencia
+
+HEADER_IDEMPOTENCIA = "Idempotency-Key"
+HEADER_REPETIDA = "Idempotent-Replayed"
+
+MAX_LARGO_CLAVE = 255
+
+# Cada cuántas claves guardadas (por proceso) se borran las vencidas
+PURGAR_CADA = 100
+
+_guardadas = 0
+
+
+def parametro_clave() -> Any:
+    """
+    Declaración común del header Idempotency-Key para los endpoints de creación.
+
+    Returns:
+        Header: Parámetro opcional de FastAPI
+    """
+    return Header(
+        None,
+        alias=HEADER_IDEMPOTENCIA,
+        description="Valor único por operación (ej: un UUID). Los reintentos con la misma clave "
+                    "reciben la respuesta original sin crear duplicados."
+    )
+
+
+def validar_clave(clave: Optional[str]) -> Optional[str]:
+    """
+    Normaliza el header recibido.
+
+    Raises:
+        HTTPException 400: Si la clave está vacía o es demasiado larga
+    """
+    if clave is None:
+        return None
+    clave = clave.strip()
+    if not clave or len(clave) > MAX_LARGO_CLAVE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"'{HEADER_IDEMPOTENCIA}' debe tener entre 1 y {MAX_LARGO_CLAVE} caracteres"
+        )
+    return clave
+
+
+def huella_peticion(ruta: str, datos: dict) -> str:
+    """
+    Hash de la petición: detecta una clave reutilizada con otros datos.
+
+    Args:
+        ruta: Método y ruta (ej: "POST /productos/")
+        datos: Cuerpo ya validado (model_dump(mode="json"))
+    """
+    crudo = json.dumps({"ruta": ruta, "datos": datos}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(crudo.encode("utf-8")).hexdigest()
+
+
+def _limite_vigencia() -> datetime:
+    """Las claves guardadas antes de este momento ya vencieron"""
+    return datetime.now(timezone.utc) - timedelta(hours=settings.IDEMPOTENCIA_TTL_HORAS)
+
+
+def respuesta_guardada(db: Session, grupo: str, clave: str, huella: str) -> Optional[Response]:
+    """
+    Busca la respuesta de un intento anterior con la misma clave.
+
+    Returns:
+        Response: Respuesta guardada, o None si la clave no se ha usado (o venció)
+
+    Raises:
+        HTTPException 422: Si la clave se usó con datos distintos
+    """
+    fila = db.query(ClaveIdempotencia).filter(
+        ClaveIdempotencia.grupo_responsable == grupo,
+        ClaveIdempotencia.clave == clave,
+        ClaveIdempotencia.fecha_creacion >= _limite_vigencia()
+    ).first()
+    if fila is None:
+        return None
+
+    if fila.huella != huella:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"La '{HEADER_IDEMPOTENCIA}' ya se usó con otros datos. Usa una clave nueva para cada operación."
+        )
+
+    return Response(
+        content=fila.respuesta,
+        status_code=fila.codigo_estado,
+        media_type="application/json",
+        headers={HEADER_REPETIDA: "true"}
+    )
+
+
+def guardar_respuesta(
+    db: Session,
+    grupo: str,
+    clave: str,
+    huella: str,
+    codigo_estado: int,
+    cuerpo: str
+) -> None:
+    """
+    Agrega la respuesta a la transacción actual (se confirma junto con la creación).
+
+    Args:
+        cuerpo: JSON de la respuesta (model_dump_json())
+    """
+    global _guardadas
+
+    limite = _limite_vigencia()
+    # Una clave vencida se puede volver a usar
+    db.query(ClaveIdempotencia).filter(
+        ClaveIdempotencia.grupo_responsable == grupo,
+        ClaveIdempotencia.clave == clave,
+        ClaveIdempotencia.fecha_creacion < limite
+    ).delete(synchronize_session=False)
+
+    db.add(ClaveIdempotencia(
+        grupo_responsable=grupo,
+        clave=clave,
+        huella=huella,
+        codigo_estado=codigo_estado,
+        respuesta=cuerpo
+    ))
+
+    _guardadas += 1
+    if _guardadas % PURGAR_CADA == 0:
+        db.query(ClaveIdempotencia)\
+            .filter(ClaveIdempotencia.fecha_creacion < limite)\
+            .delete(synchronize_session=False)
+
+
+def _respuesta_del_otro_intento(db: Session, grupo: str, clave: Optional[str], huella: Optional[str]) -> Optional[Response]:
+    """
+    Después de un IntegrityError: deshace la transacción y busca la
+    respuesta del intento con la misma clave que ganó la carrera.
+
+    Returns:
+        Response: Respuesta del otro intento, o None si el conflicto no
+                  fue por él (el que llama vuelve a lanzar el error)
+    """
+    db.rollback()
+    if clave is None:
+        return None
+    return respuesta_guardada(db, grupo, clave, huella)
+
+
+def insertar_o_repetir(db: Session, grupo: str, clave: Optional[str], huella: Optional[str]) -> Optional[Response]:
+    """
+    Hace flush (INSERT sin commit); si choca con un intento con la misma
+    clave que ya confirmó, devuelve la respuesta de ese intento.
+
+    Con columnas únicas, el reintento concurrente espera al primero en el
+    índice único y falla aquí, antes de llegar a la clave de idempotencia.
+
+    Returns:
+        Response: Respuesta del otro intento, o None si el flush se realizó
+
+    Raises:
+        IntegrityError: Si el conflicto no es con otro intento de la misma clave
+    """
+    try:
+        db.flush()
+        return None
+    except IntegrityError:
+        guardada = _respuesta_del_otro_intento(db, grupo, clave, huella)
+        if guardada is None:
+            raise
+        return guardada
+
+
+def confirmar_o_repetir(db: Session, grupo: str, clave: Optional[str], huella: Optional[str]) -> Optional[Response]:
+    """
+    Hace commit; si otro intento con la misma clave ganó la carrera,
+    deshace esta transacción y devuelve la respuesta de ese intento.
+
+    Returns:
+        Response: Respuesta del otro intento, o None si este commit se realizó
+
+    Raises:
+        IntegrityError: Si el conflicto no es por la clave de idempotencia
+    """
+    try:
+        db.commit()
+        return None
+    except IntegrityError:
+        guardada = _respuesta_del_otro_intento(db, grupo, clave, huella)
+        if guardada is None:
+            raise
+        return guardada
@@ -0,0 +1,146 @@
+"""
+========================================
+CONSULTA POR LOTE (VARIOS IDS A LA VEZ)
+========================================
+El carrito, la lista de deseos y los pedidos necesitan 20-50 productos
+concretos. En lugar de llamar GET /productos/{id} una vez por producto
+(una petición HTTP y una consulta por cada uno), se pide:
+
+    GET /productos/lote?ids=15,3,27
+
+y se resuelven todos con UNA consulta:
+
+    SELECT ... FROM productos WHERE id = ANY(:ids)
+
+La respuesta conserva el orden de los ids pedidos e indica cuáles no
+existen.
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import Integer, any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+
+from .archivo_eliminados import modelo_archivo
+from .campos import opciones_columnas, serializar_parcial
+
+# Máximo de ids por petición (un carrito grande cabe de sobra)
+MAX_IDS_POR_LOTE = 100
+
+
+def parametro_ids() -> Any:
+    """
+    Declaración común del parámetro ?ids= para los endpoints de lote.
+
+    Returns:
+        Query: Parámetro obligatorio de FastAPI
+    """
+    return Query(
+        ...,
+        description=f"IDs separados por coma (ej: 15,3,27). Máximo {MAX_IDS_POR_LOTE}."
+    )
+
+
+def parsear_ids(ids: str) -> List[int]:
+    """
+    Convierte el texto "15,3,27" en una lista de ids sin repetidos.
+
+    Args:
+        ids: Valor del parámetro ?ids=
+
+    Returns:
+        List[int]: Ids en el orden pedido (sin duplicados)
+
+    Raises:
+        HTTPException 400: Si algún id no es un número o son demasiados
+    """
+    try:
+        pedidos = [int(valor) for valor in ids.split(",") if valor.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'ids' debe ser una lista de números separados por coma (ej: 15,3,27)"
+        )
+
+    unicos = list(dict.fromkeys(pedidos))  # Quita repetidos conservando el orden
+    if not unicos:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Debes enviar al menos un id en 'ids'"
+        )
+    if len(unicos) > MAX_IDS_POR_LOTE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Máximo {MAX_IDS_POR_LOTE} ids por petición (se enviaron {len(unicos)})"
+        )
+    return unicos
+
+
+def _buscar_por_ids(
+    db: Session,
+    modelo: Any,
+    ids: List[int],
+    campos: Optional[Tuple[str, ...]]
+) -> Dict[int, Any]:
+    """Una consulta por todos los ids: {id: registro}"""
+    if db.get_bind().dialect.name == "postgresql":
+        filtro = modelo.id == any_(bindparam("ids", ids, type_=ARRAY(Integer)))
+    else:
+        filtro = modelo.id.in_(ids)
+
+    query = db.query(modelo)
+    if campos:
+        query = query.options(opciones_columnas(modelo, campos))
+    return {registro.id: registro for registro in query.filter(filtro).all()}
+
+
+def consultar_lote(
+    db: Session,
+    modelo: Any,
+    ids: List[int],
+    campos: Optional[Tuple[str, ...]] = None
+) -> Tuple[List[Any], List[int]]:
+    """
+    Busca varios registros por id en una sola consulta.
+
+    En PostgreSQL se envía un único parámetro de tipo arreglo
+    (id = ANY(:ids)): el texto de la consulta es el mismo sin importar
+    cuántos ids se pidan, así se reutiliza el plan.
+
+    Args:
+        db: Sesión de base de datos
+        modelo: Producto o Cliente
+        ids: Ids pedidos (ya validados con parsear_ids)
+        campos: Campos a leer (None = todos)
+
+    Returns:
+        Tuple: (registros en el orden de 'ids', ids que no existen)
+    """
+    por_id = _buscar_por_ids(db, modelo, ids, campos)
+
+    # Los que faltan pueden ser eliminados que ya se movieron al archivo
+    archivo = modelo_archivo(modelo)
+    pendientes = [id_registro for id_registro in ids if id_registro not in por_id]
+    if archivo is not None and pendientes:
+        por_id.update(_buscar_por_ids(db, archivo, pendientes, campos))
+
+    encontrados = [por_id[id_registro] for id_registro in ids if id_registro in por_id]
+    faltantes = [id_registro for id_registro in ids if id_registro not in por_id]
+    return encontrados, faltantes
+
+
+def respuesta_lote_parcial(
+    encontrados: List[Any],
+    faltantes: List[int],
+    schema: Any,
+    campos: Tuple[str, ...]
+) -> Response:
+    """Respuesta de lote con solo los campos pedidos (?fields=)"""
+    contenido = (
+        b'{"encontrados":' + serializar_parcial(encontrados, schema, campos)
+        + b',"faltantes":' + json.dumps(faltantes).encode("utf-8") + b"}"
+    )
+    return Response(content=contenido, media_type="application/json")
@@ -0,0 +1,12 @@
+"""
+Este archivo hace que la carpeta 'middleware' sea un paquete de Python.
+
+Los middlewares se ejecutan antes y después de cada endpoint,
+por eso aquí van las funciones transversales (compresión, límites, etc.).
+"""
+
+from .compresion import CompresionMiddleware
+from .lectura_escritura import LecturaTrasEscrituraMiddleware
+from .admision import AdmisionMiddleware, ControlAdmision
+from .coalescencia import Coalescencia, CoalescenciaMiddleware
+from .cancelacion import CancelacionMiddleware
@@ -0,0 +1,216 @@
+"""
+========================================
+MIDDLEWARE DE CONTROL DE ADMISIÓN
+========================================
+Cuando llega un pico de tráfico, las peticiones se quedaban esperando
+una conexión libre del pool de SQLAlchemy hasta agotar el tiempo, y la
+API se volvía lenta para todos.
+
+Este middleware rechaza RÁPIDO el exceso de carga en lugar de encolarlo:
+- Límite de peticiones simultáneas por tipo (lecturas, escrituras y
+  consultas de auditoría) -> 503 Service Unavailable
+- Límite de peticiones por segundo por grupo (token bucket) -> 429 Too
+  Many Requests. El header X-Grupo lo puede escribir cualquiera, así que
+  solo cuenta como grupo si viene de un token o si GRUPOS_PERMITIDOS
+  limita los nombres posibles; si no, el límite es por IP del cliente
+  (ver clave_de_cubo()).
+
+Ambas respuestas incluyen 'Retry-After' para que el cliente sepa
+cuándo reintentar.
+"""
+
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+
+from ..config import settings
+from ..grupo import HEADER_GRUPO, resolver_grupo
+
+# Rutas que no usan la base de datos o que son conexiones largas
+RUTAS_EXENTAS = (
+    "/health",
+    "/docs",
+    "/redoc",
+    "/openapi.json",
+    "/productos/catalogo",
+    "/auditoria/eventos",
+    "/debug",
+)
+
+METODOS_ESCRITURA = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Máximo de grupos distintos que se recuerdan (el header X-Grupo es libre)
+MAX_GRUPOS_RECORDADOS = 10000
+
+
+def clasificar_ruta(metodo: str, ruta: str) -> str:
+    """
+    Clasifica una petición según el costo que tiene para la base de datos.
+
+    Returns:
+        str: "escrituras", "auditoria" o "lecturas"
+    """
+    if metodo in METODOS_ESCRITURA:
+        return "escrituras"
+    if ruta.startswith("/auditoria"):
+        return "auditoria"
+    return "lecturas"
+
+
+def clave_de_cubo(scope) -> str:
+    """
+    A quién se le cobra la ficha del límite por segundo.
+
+    Si se usara el X-Grupo tal cual, un cliente podría cambiarlo en cada
+    petición para saltarse el límite. Por eso solo cuenta el grupo de un
+    token válido, o el de X-Grupo cuando GRUPOS_PERMITIDOS está
+    configurado; en cualquier otro caso se usa la IP del cliente (detrás
+    de un proxy, la que indica X-Forwarded-For: ver proxy_headers en
+    servidor.py).
+
+    Returns:
+        str: "grupo:<nombre>" o "ip:<dirección>"
+    """
+    headers = Headers(scope=scope)
+    autorizacion = headers.get("authorization")
+    x_grupo = headers.get(HEADER_GRUPO)
+    con_token = bool(autorizacion) and autorizacion.lower().startswith("bearer ")
+    if con_token or (x_grupo and settings.GRUPOS_PERMITIDOS):
+        try:
+            return "grupo:" + resolver_grupo(x_grupo, autorizacion)
+        except HTTPException:
+            pass  # Token o grupo no válido: el endpoint lo rechazará
+    cliente = scope.get("client")
+    return "ip:" + (cliente[0] if cliente else "desconocido")
+
+
+class CuboDeFichas:
+    """
+    Token bucket: cada grupo (o IP, ver clave_de_cubo()) tiene 'rafaga'
+    fichas que se recargan a 'tasa' fichas por segundo. Cada petición
+    gasta una ficha.
+    """
+
+    def __init__(self, tasa: float, rafaga: int):
+        self.tasa = tasa
+        self.rafaga = rafaga
+        self._cubos: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # grupo -> (fichas, momento)
+
+    def consumir(self, grupo: str) -> float:
+        """
+        Intenta gastar una ficha del grupo.
+
+        Returns:
+            float: 0 si se permitió; si no, segundos hasta tener una ficha
+        """
+        ahora = time.monotonic()
+        fichas, momento = self._cubos.pop(grupo, (float(self.rafaga), ahora))
+        fichas = min(float(self.rafaga), fichas + (ahora - momento) * self.tasa)
+
+        espera = 0.0
+        if fichas >= 1:
+            fichas -= 1
+        else:
+            espera = (1 - fichas) / self.tasa
+
+        self._cubos[grupo] = (fichas, ahora)
+        if len(self._cubos) > MAX_GRUPOS_RECORDADOS:
+            self._cubos.popitem(last=False)  # Olvidar el grupo inactivo más antiguo
+        return espera
+
+
+class ControlAdmision:
+    """
+    Límites y contadores del control de admisión (uno por proceso).
+
+    Parámetros:
+    - limites: Peticiones simultáneas por tipo, ej: {"lecturas": 15, "escrituras": 15, "auditoria": 3}
+      (0 = sin límite para ese tipo)
+    - tasa_por_grupo: Peticiones por segundo por grupo (0 = sin límite)
+    - rafaga_por_grupo: Peticiones seguidas que un grupo puede hacer de golpe
+    """
+
+    def __init__(
+        self,
+        limites: Dict[str, int],
+        tasa_por_grupo: float = 0,
+        rafaga_por_grupo: int = 1
+    ):
+        self.limites = limites
+        self.en_curso: Dict[str, int] = {tipo: 0 for tipo in limites}
+        self.rechazadas: Dict[str, int] = {tipo: 0 for tipo in limites}
+        self.rechazadas["por_grupo"] = 0
+        self.cubos = CuboDeFichas(tasa_por_grupo, max(1, rafaga_por_grupo)) if tasa_por_grupo > 0 else None
+
+    def estadisticas(self) -> Dict[str, Dict[str, Optional[int]]]:
+        """Peticiones en curso y rechazadas, para monitoreo"""
+        return {
+            "limites": dict(self.limites),
+            "en_curso": dict(self.en_curso),
+            "rechazadas": dict(self.rechazadas),
+        }
+
+
+class AdmisionMiddleware:
+    """
+    Middleware ASGI que aplica un ControlAdmision a cada petición.
+    """
+
+    def __init__(self, app, control: ControlAdmision):
+        self.app = app
+        self.control = control
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(RUTAS_EXENTAS):
+            await self.app(scope, receive, send)
+            return
+
+        control = self.control
+
+        # 1. Límite por grupo o IP (429)
+        if control.cubos is not None:
+            espera = control.cubos.consumir(clave_de_cubo(scope))
+            if espera > 0:
+                control.rechazadas["por_grupo"] += 1
+                await self._rechazar(
+                    send, 429, "Demasiadas peticiones",
+                    "Se superó el límite de peticiones por segundo de tu grupo (o de tu IP, sin token)", espera
+                )
+                return
+
+        # 2. Límite de peticiones simultáneas por tipo (503)
+        tipo = clasificar_ruta(scope["method"], scope["path"])
+        limite = control.limites.get(tipo, 0)
+        if limite and control.en_curso[tipo] >= limite:
+            control.rechazadas[tipo] += 1
+            await self._rechazar(
+                send, 503, "Servidor ocupado",
+                f"Se alcanzó el máximo de {limite} peticiones simultáneas de tipo '{tipo}'", 1
+            )
+            return
+
+        control.en_curso[tipo] = control.en_curso.get(tipo, 0) + 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            control.en_curso[tipo] -= 1
+
+    @staticmethod
+    async def _rechazar(send, codigo: int, error: str, detalle: str, espera: float):
+        """Envía la respuesta de rechazo con Retry-After"""
+        cuerpo = json.dumps({"error": error, "detalle": detalle, "codigo": codigo}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": codigo,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(cuerpo)).encode("latin-1")),
+                (b"retry-after", str(max(1, math.ceil(espera))).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": cuerpo})
@@ -0,0 +1,108 @@
+"""
+========================================
+MIDDLEWARE DE PLAZOS Y CANCELACIÓN
+========================================
+Por cada petición:
+
+1. Elige el tiempo máximo de sus consultas según el tipo de ruta
+   (lecturas, escrituras o auditoría; ver app/plazos.py).
+2. En las rutas de RUTAS_CANCELABLES, vigila la conexión del cliente:
+   si se desconecta antes de recibir la respuesta, cancela en
+   PostgreSQL las consultas de esa petición que sigan corriendo y
+   libera la conexión del pool de inmediato.
+
+Para vigilar la desconexión, este middleware lee los mensajes del
+cliente (receive) en una tarea aparte y se los entrega al endpoint
+cuando los pide, sin cambiarlos.
+
+Solo se puede cancelar lo que corre en un hilo aparte
+(run_in_threadpool): la tarea que vigila necesita que el event loop
+esté libre mientras la consulta corre. El resto de los endpoints
+(listados, /{id}, /lote, /cambios, escrituras) ejecutan sus consultas
+en el propio event loop, así que la desconexión recién se vería al
+terminar; en esas rutas no se vigila y solo rige el plazo.
+"""
+
+import asyncio
+from typing import Dict
+
+from ..plazos import PeticionEnCurso, peticion_actual
+from .admision import clasificar_ruta
+
+MENSAJE_DESCONEXION = {"type": "http.disconnect"}
+
+# Rutas GET cuyas consultas corren con run_in_threadpool (prefijos).
+# Si un endpoint nuevo pasa sus consultas a un hilo, agregarlo aquí.
+RUTAS_CANCELABLES = (
+    "/auditoria",
+    "/productos/buscar/",
+    "/clientes/buscar/nombre",
+)
+
+
+def es_cancelable(metodo: str, ruta: str) -> bool:
+    """Indica si vale la pena vigilar la desconexión en esta ruta"""
+    return metodo == "GET" and ruta.startswith(RUTAS_CANCELABLES)
+
+
+class CancelacionMiddleware:
+    """
+    Middleware ASGI que fija el plazo de las consultas y, en las rutas
+    cancelables, las cancela si el cliente se va.
+
+    Args:
+        app: Aplicación ASGI
+        timeouts: Milisegundos por tipo de ruta (settings.timeouts_consulta)
+    """
+
+    def __init__(self, app, timeouts: Dict[str, int]):
+        self.app = app
+        self.timeouts = timeouts
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        tipo = clasificar_ruta(scope["method"], scope["path"])
+        peticion = PeticionEnCurso(self.timeouts.get(tipo, 0))
+        token = peticion_actual.set(peticion)
+
+        if not es_cancelable(scope["method"], scope["path"]):
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                peticion_actual.reset(token)
+            return
+
+        mensajes: asyncio.Queue = asyncio.Queue()
+        respondida = False
+
+        async def vigilar():
+            while True:
+                mensaje = await receive()
+                mensajes.put_nowait(mensaje)
+                if mensaje["type"] == "http.disconnect":
+                    # Después de responder, el servidor también avisa
+                    # "desconexión": eso no es un cliente que se fue
+                    if not respondida:
+                        peticion.cancelar()
+                    return
+
+        async def recibir():
+            if mensajes.empty() and vigilante.done():
+                return MENSAJE_DESCONEXION
+            return await mensajes.get()
+
+        async def enviar(mensaje):
+            nonlocal respondida
+            if mensaje["type"] == "http.response.body" and not mensaje.get("more_body", False):
+                respondida = True
+            await send(mensaje)
+
+        vigilante = asyncio.create_task(vigilar())
+        try:
+            await self.app(scope, recibir, enviar)
+        finally:
+            vigilante.cancel()
+            peticion_actual.reset(token)
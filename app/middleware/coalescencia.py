@@ -0,0 +1,137 @@
+"""
+========================================
+MIDDLEWARE DE COALESCENCIA ("SINGLE-FLIGHT")
+========================================
+En una venta relámpago llegan miles de peticiones IDÉNTICAS al mismo
+tiempo (GET /productos/15, GET /productos/?categoria=Ofertas...). Sin
+este middleware, cada una ejecuta la misma consulta en PostgreSQL.
+
+Con coalescencia:
+- La primera petición (la "líder") ejecuta el endpoint normalmente.
+- Las peticiones idénticas que llegan MIENTRAS la líder sigue en curso
+  no consultan la base de datos: esperan y reciben la misma respuesta.
+- Cuando la líder termina, se olvida: la siguiente petición vuelve a
+  consultar. No es una caché (no hay TTL), solo evita trabajo duplicado
+  simultáneo.
+
+Dos peticiones son "idénticas" si coinciden el método, la ruta, los
+parámetros, el grupo y los headers que cambian la respuesta.
+"""
+
+import asyncio
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers
+
+from ..database import COOKIE_ULTIMA_ESCRITURA
+from ..grupo import grupo_de_headers
+from .compresion import elegir_codificacion
+
+METODOS_COALESCIBLES = {"GET", "HEAD"}
+
+# Headers que cambian la respuesta y por tanto forman parte de la clave
+HEADERS_DE_LA_CLAVE = ("origin", "if-none-match")
+
+
+class Coalescencia:
+    """
+    Peticiones en vuelo y métricas de la coalescencia (una por proceso).
+
+    Parámetros:
+    - rutas: Prefijos de ruta a los que se aplica (ej: ["/productos", "/clientes"])
+    """
+
+    def __init__(self, rutas: Sequence[str]):
+        self.rutas = tuple(rutas)
+        self._en_vuelo: Dict[Tuple, "asyncio.Future"] = {}
+        self.lideres = 0  # Peticiones que ejecutaron el endpoint
+        self.colapsadas = 0  # Peticiones que reutilizaron la respuesta de una líder
+
+    def clave(self, scope) -> Optional[Tuple]:
+        """
+        Calcula la clave de la petición.
+
+        Returns:
+            Tuple | None: None si la petición no se puede coalescer
+        """
+        if scope["method"] not in METODOS_COALESCIBLES or not scope["path"].startswith(self.rutas):
+            return None
+
+        headers = Headers(scope=scope)
+        # Tras una escritura la petición debe leer del servidor principal;
+        # no se mezcla con peticiones que podrían ir a una réplica
+        escribio = f"{COOKIE_ULTIMA_ESCRITURA}=" in headers.get("cookie", "")
+        return (
+            scope["method"],
+            scope["path"],
+            scope.get("query_string", b""),
+            grupo_de_headers(headers),
+            elegir_codificacion(headers.get("accept-encoding", "")),
+            escribio,
+        ) + tuple(headers.get(nombre) for nombre in HEADERS_DE_LA_CLAVE)
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Métricas para monitoreo"""
+        total = self.lideres + self.colapsadas
+        return {
+            "lideres": self.lideres,
+            "colapsadas": self.colapsadas,
+            "en_vuelo": len(self._en_vuelo),
+            "porcentaje_colapsadas": round(100 * self.colapsadas / total, 1) if total else 0,
+        }
+
+
+class CoalescenciaMiddleware:
+    """
+    Middleware ASGI que aplica una Coalescencia a cada petición.
+
+    Debe ir por fuera de la compresión y del control de admisión:
+    las peticiones que esperan a una líder no ocupan cupo ni conexión.
+    """
+
+    def __init__(self, app, coalescencia: Coalescencia):
+        self.app = app
+        self.coalescencia = coalescencia
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        coalescencia = self.coalescencia
+        clave = coalescencia.clave(scope)
+        if clave is None:
+            await self.app(scope, receive, send)
+            return
+
+        # ¿Ya hay una petición idéntica en curso? Esperar su respuesta
+        pendiente = coalescencia._en_vuelo.get(clave)
+        if pendiente is not None:
+            mensajes = await asyncio.shield(pendiente)
+            if mensajes is not None:
+                coalescencia.colapsadas += 1
+                for mensaje in mensajes:
+                    await send(mensaje)
+                return
+            await self.app(scope, receive, send)
+            return
+
+        # Esta petición es la líder
+        futuro = asyncio.get_running_loop().create_future()
+        coalescencia._en_vuelo[clave] = futuro
+        coalescencia.lideres += 1
+        mensajes: List[dict] = []
+
+        async def enviar_y_guardar(mensaje):
+            mensajes.append(mensaje)
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar_y_guardar)
+        except BaseException:
+            futuro.set_result(None)  # Las que esperaban se ejecutan por su cuenta
+            raise
+        else:
+            futuro.set_result(mensajes)
+        finally:
+            del coalescencia._en_vuelo[clave]
@@ -0,0 +1,232 @@
+"""
+========================================
+MIDDLEWARE DE COMPRESIÓN
+========================================
+Comprime las respuestas JSON grandes con brotli o gzip, según lo que
+acepte el cliente en el header 'Accept-Encoding'.
+
+Además guarda en caché los cuerpos ya comprimidos: si el mismo listado
+de productos se pide muchas veces sin cambios, solo se comprime una vez.
+
+Un ETag fuerte promete "estos bytes exactos"; el cuerpo comprimido ya no
+son los mismos bytes, así que al comprimir el ETag pasa a ser débil
+(W/"3"). If-Match acepta ambas formas (ver app/concurrencia.py).
+"""
+
+import gzip
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli  # Opcional: mejor compresión que gzip
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+# Tipos de contenido que vale la pena comprimir
+TIPOS_COMPRIMIBLES = ("application/json", "text/", "application/javascript")
+
+# Tipos que NO se deben acumular en memoria (streaming)
+TIPOS_STREAMING = ("text/event-stream",)
+
+
+def _calidades(accept_encoding: str) -> Dict[str, float]:
+    """
+    Lee Accept-Encoding: {"gzip": 1.0, "br": 0.5, "*": 0.0, ...}
+
+    Sin 'q' la calidad es 1; un 'q' que no se entiende cuenta como 0
+    (no aceptada).
+    """
+    aceptadas = {}
+    for parte in accept_encoding.lower().split(","):
+        nombre, *parametros = parte.split(";")
+        nombre = nombre.strip()
+        if not nombre:
+            continue
+        calidad = 1.0
+        for parametro in parametros:
+            clave, _, valor = parametro.partition("=")
+            if clave.strip() == "q":
+                try:
+                    calidad = min(max(float(valor), 0.0), 1.0)
+                except ValueError:
+                    calidad = 0.0
+        aceptadas[nombre] = calidad
+    return aceptadas
+
+
+def elegir_codificacion(accept_encoding: str) -> Optional[str]:
+    """
+    Elige la codificación soportada que el cliente prefiere.
+
+    Respeta los valores 'q' (gzip;q=0 = nunca gzip) y el comodín '*',
+    que aplica a las codificaciones no nombradas. Con la misma calidad
+    se prefiere br.
+
+    Args:
+        accept_encoding: Valor del header Accept-Encoding (ej: "gzip, br;q=0.5, *;q=0")
+
+    Returns:
+        str | None: "br", "gzip" o None si no se puede comprimir
+    """
+    aceptadas = _calidades(accept_encoding)
+    comodin = aceptadas.get("*", 0.0)
+    soportadas = ("br", "gzip") if brotli is not None else ("gzip",)
+
+    elegida, mejor = None, 0.0
+    for nombre in soportadas:
+        calidad = aceptadas.get(nombre, comodin)
+        if calidad > mejor:
+            elegida, mejor = nombre, calidad
+    return elegida
+
+
+def etag_debil(etag: bytes) -> bytes:
+    """'"3"' -> 'W/"3"' (un ETag que ya es débil queda igual)"""
+    return etag if etag.startswith(b"W/") else b"W/" + etag
+
+
+def comprimir(cuerpo: bytes, codificacion: str) -> bytes:
+    """
+    Comprime un cuerpo de respuesta.
+
+    Args:
+        cuerpo: Bytes originales
+        codificacion: "br" o "gzip"
+
+    Returns:
+        bytes: Cuerpo comprimido
+    """
+    if codificacion == "br":
+        return brotli.compress(cuerpo, quality=5)
+    return gzip.compress(cuerpo, compresslevel=6)
+
+
+class CacheComprimidos:
+    """
+    Caché LRU de cuerpos ya comprimidos.
+
+    La clave es el hash del cuerpo original, así que una respuesta que no
+    cambió reutiliza el resultado anterior sin volver a comprimir.
+    """
+
+    def __init__(self, max_entradas: int = 256):
+        self.max_entradas = max_entradas
+        self._datos: "OrderedDict[Tuple[str, bytes], bytes]" = OrderedDict()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, cuerpo: bytes, codificacion: str) -> bytes:
+        """Devuelve el cuerpo comprimido, usando la caché si es posible"""
+        if self.max_entradas <= 0:
+            return comprimir(cuerpo, codificacion)
+
+        clave = (codificacion, hashlib.blake2b(cuerpo, digest_size=16).digest())
+        comprimido = self._datos.get(clave)
+
+        if comprimido is not None:
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return comprimido
+
+        self.fallos += 1
+        comprimido = comprimir(cuerpo, codificacion)
+        self._datos[clave] = comprimido
+        if len(self._datos) > self.max_entradas:
+            self._datos.popitem(last=False)  # Eliminar el menos usado
+        return comprimido
+
+    def estadisticas(self) -> Dict[str, int]:
+        """Resumen de uso de la caché"""
+        return {
+            "entradas": len(self._datos),
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+        }
+
+
+class CompresionMiddleware:
+    """
+    Middleware ASGI que comprime respuestas según 'Accept-Encoding'.
+
+    Parámetros:
+    - minimo_bytes: Respuestas más pequeñas se envían sin comprimir
+    - max_entradas_cache: Cuerpos comprimidos que se guardan en memoria
+    """
+
+    def __init__(self, app, minimo_bytes: int = 1024, max_entradas_cache: int = 256):
+        self.app = app
+        self.minimo_bytes = minimo_bytes
+        self.cache = CacheComprimidos(max_entradas_cache)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        codificacion = elegir_codificacion(
+            headers.get(b"accept-encoding", b"").decode("latin-1")
+        )
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio: Optional[dict] = None
+        partes: List[bytes] = []
+        directo = False  # True cuando la respuesta pasa sin tocarla
+
+        async def enviar(mensaje):
+            nonlocal inicio, directo
+
+            if mensaje["type"] == "http.response.start":
+                if not self._es_comprimible(mensaje):
+                    directo = True
+                    await send(mensaje)
+                    return
+                inicio = mensaje
+                return
+
+            if mensaje["type"] != "http.response.body" or directo:
+                await send(mensaje)
+                return
+
+            partes.append(mensaje.get("body", b""))
+            if mensaje.get("more_body", False):
+                return
+
+            await self._enviar_respuesta(send, inicio, b"".join(partes), codificacion)
+
+        await self.app(scope, receive, enviar)
+
+    def _es_comprimible(self, inicio: dict) -> bool:
+        """Indica si la respuesta se puede acumular y comprimir"""
+        headers = dict(inicio.get("headers") or [])
+        if b"content-encoding" in headers:
+            return False
+        tipo = headers.get(b"content-type", b"").decode("latin-1")
+        if tipo.startswith(TIPOS_STREAMING):
+            return False
+        return tipo.startswith(TIPOS_COMPRIMIBLES)
+
+    async def _enviar_respuesta(self, send, inicio: dict, cuerpo: bytes, codificacion: str):
+        """Envía la respuesta acumulada, comprimida si supera el umbral"""
+        headers = [
+            (nombre, valor) for nombre, valor in inicio.get("headers") or []
+            if nombre.lower() not in (b"content-length", b"vary")
+        ]
+        vary = dict(inicio.get("headers") or []).get(b"vary")
+        headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+
+        if len(cuerpo) >= self.minimo_bytes:
+            cuerpo = self.cache.obtener(cuerpo, codificacion)
+            headers = [
+                (nombre, etag_debil(valor) if nombre.lower() == b"etag" else valor)
+                for nombre, valor in headers
+            ]
+            headers.append((b"content-encoding", codificacion.encode("latin-1")))
+
+        headers.append((b"content-length", str(len(cuerpo)).encode("latin-1")))
+
+        await send({**inicio, "headers": headers})
+        await send({"type": "http.response.body", "body": cuerpo})
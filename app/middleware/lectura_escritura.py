@@ -0,0 +1,52 @@
+"""
+========================================
+MIDDLEWARE: LEER TUS PROPIAS ESCRITURAS
+========================================
+Después de cada escritura exitosa (POST, PUT, PATCH, DELETE) anota el
+momento de la escritura para el grupo y lo envía en una cookie.
+
+Así get_db_lectura() sabe que debe leer del servidor principal y no de
+una réplica que quizá todavía no tiene el cambio.
+"""
+
+from starlette.datastructures import Headers
+
+from ..config import settings
+from ..database import COOKIE_ULTIMA_ESCRITURA, motores_replica, registrar_escritura
+from ..grupo import grupo_de_headers
+
+METODOS_ESCRITURA = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class LecturaTrasEscrituraMiddleware:
+    """Middleware ASGI que registra las escrituras exitosas de cada grupo"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        # Sin réplicas todas las lecturas van al principal: no hay nada que hacer
+        if (
+            scope["type"] != "http"
+            or not motores_replica
+            or scope["method"] not in METODOS_ESCRITURA
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start" and mensaje["status"] < 400:
+                momento = registrar_escritura(grupo_de_headers(Headers(scope=scope)))
+                cookie = (
+                    f"{COOKIE_ULTIMA_ESCRITURA}={momento:.3f}; "
+                    f"Max-Age={int(settings.DB_VENTANA_LECTURA_PRIMARIA) + 1}; Path=/; HttpOnly"
+                )
+                mensaje = {
+                    **mensaje,
+                    "headers": list(mensaje.get("headers") or []) + [
+                        (b"set-cookie", cookie.encode("latin-1"))
+                    ],
+                }
+            await send(mensaje)
+
+        await self.app(scope, receive, enviar)
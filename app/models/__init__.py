@@ -8,6 +8,9 @@ Los modelos están organizados en archivos separados:
 - producto.py: Define la clase Producto (tabla productos)
 - cliente.py: Define la clase Cliente (tabla clientes)
 - auditoria.py: Define la clase HistorialAuditoria (tabla historial_auditoria)
+- resumen_auditoria.py: Define la clase ResumenAuditoriaHora (tabla resumen_auditoria_hora)
+- idempotencia.py: Define la clase ClaveIdempotencia (tabla claves_idempotencia)
+- archivo.py: Define ProductoArchivado y ClienteArchivado (tablas productos_archivo y clientes_archivo)
 
 ¿Por qué archivos separados?
 -----------------------------
@@ -21,6 +24,10 @@ Esto se llama "Principio de Responsabilidad Única" (SRP).
 from .producto import Producto
 from .cliente import Cliente
 from .auditoria import HistorialAuditoria
+from .resumen_auditoria import ResumenAuditoriaHora
+from .idempotencia import ClaveIdempotencia
+from .archivo import ProductoArchivado, ClienteArchivado
 
 # __all__ define qué se exporta cuando haces: from app.models import *
-__all__ = ["Producto", "Cliente", "HistorialAuditoria"]
+__all__ = ["Producto", "Cliente", "HistorialAuditoria", "ResumenAuditoriaHora", "ClaveIdempotencia",
+           "ProductoArchivado", "ClienteArchivado"]
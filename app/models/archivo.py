@@ -0,0 +1,91 @@
+"""
+========================================
+MODELOS: ARCHIVO DE PRODUCTOS Y CLIENTES ELIMINADOS
+========================================
+Este archivo define las clases ProductoArchivado y ClienteArchivado,
+que representan las tablas 'productos_archivo' y 'clientes_archivo'.
+
+Eliminar un producto o cliente solo lo marca con activo = False, así
+que las tablas principales se iban llenando de registros eliminados
+que todos los listados e índices tenían que saltar. Los que llevan
+mucho tiempo eliminados se mueven a estas tablas (ver
+app/archivo_eliminados.py).
+
+Las columnas se copian de Producto y Cliente: las tablas tienen
+exactamente la misma forma y una fila se puede mover de una a otra
+sin transformarla.
+"""
+
+from typing import List
+
+from sqlalchemy import Column, Index, Table
+
+from ..database import Base
+from .cliente import Cliente
+from .producto import Producto
+
+
+def _columnas_de(tabla: Table) -> List[Column]:
+    """
+    Copia las columnas de una tabla principal.
+
+    Sin valores por defecto ni restricciones UNIQUE: el id se conserva
+    (no usa secuencia) y un email archivado puede volver a aparecer en
+    la tabla principal si se restaura otro cliente más tarde.
+    """
+    return [
+        Column(
+            columna.name,
+            columna.type,
+            primary_key=columna.primary_key,
+            autoincrement=False,
+            nullable=columna.nullable,
+            comment=columna.comment
+        )
+        for columna in tabla.columns
+    ]
+
+
+class ProductoArchivado(Base):
+    """
+    🗄️ CLASE PRODUCTO ARCHIVADO - Producto eliminado hace tiempo
+
+    Mismas columnas que Producto (todas sus filas tienen activo = False).
+    GET /productos/{id}, /productos/lote y ?incluir_inactivos=true las
+    siguen devolviendo.
+    """
+
+    __table__ = Table(
+        "productos_archivo",
+        Base.metadata,
+        *_columnas_de(Producto.__table__),
+        # Para GET /productos/cambios (que también lee el archivo)
+        Index("idx_productos_archivo_actualizacion_id", "fecha_actualizacion", "id"),
+        comment="Productos eliminados movidos fuera de la tabla principal"
+    )
+
+    def __repr__(self):
+        return f"<ProductoArchivado(id={self.id}, nombre='{self.nombre}')>"
+
+
+class ClienteArchivado(Base):
+    """
+    🗄️ CLASE CLIENTE ARCHIVADO - Cliente eliminado hace tiempo
+
+    Mismas columnas que Cliente. Su email y su documento siguen
+    reservados: no se pueden usar para crear otro cliente.
+    """
+
+    __table__ = Table(
+        "clientes_archivo",
+        Base.metadata,
+        *_columnas_de(Cliente.__table__),
+        Index("idx_clientes_archivo_actualizacion_id", "fecha_actualizacion", "id"),
+        # Para comprobar que un email o documento nuevo no esté en uso
+        Index("idx_clientes_archivo_email", "email"),
+        Index("idx_clientes_archivo_documento", "documento"),
+        comment="Clientes eliminados movidos fuera de la tabla principal"
+    )
+
+    def __repr__(self):
+        return f"<ClienteArchivado(id={self.id}, email='{self.email}')>"
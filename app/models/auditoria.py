@@ -9,7 +9,7 @@ Esta tabla registra TODAS las operaciones que se realizan en la API.
 Es como un "libro de registro" donde queda escrito quién hizo qué y cuándo.
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Boolean, Column, Index, Integer, String, DateTime, Text
 from sqlalchemy.sql import text
 from typing import Any
 from ..database import Base
@@ -58,8 +58,9 @@ class HistorialAuditoria(Base):
         - id_registro: ID del producto/cliente afectado
         - operacion: "CREATE", "UPDATE" o "DELETE"
         - grupo_responsable: Qué grupo hizo la operación
-        - datos_anteriores: Datos antes del cambio (JSON)
-        - datos_nuevos: Datos después del cambio (JSON)
+        - datos_anteriores: Valores anteriores de los campos que cambiaron (JSON)
+        - datos_nuevos: Valores nuevos de los campos que cambiaron (JSON)
+        - completo: La fila guarda el estado completo (punto de partida)
         - fecha_operacion: Cuándo se hizo
         - observaciones: Comentarios adicionales
     """
@@ -67,6 +68,27 @@ class HistorialAuditoria(Base):
     # Nombre de la tabla en la base de datos PostgreSQL
     __tablename__ = "historial_auditoria"
 
+    # Índice compuesto para reconstruir la historia de un registro en orden
+    # (ver app/auditoria_compacta.py)
+    # Índice BRIN para los filtros ?desde=&hasta=: las filas se insertan en
+    # orden de fecha, así que guarda solo el rango de fechas de cada grupo de
+    # bloques (ocupa KB en lugar de GB) y PostgreSQL lee solo los bloques
+    # del rango pedido
+    # Índice parcial con solo los puntos completos: encuentra en qué fila
+    # empezar a reconstruir sin recorrer la historia del registro
+    __table_args__ = (
+        Index("idx_auditoria_registro_id", "tabla_afectada", "id_registro", "id"),
+        Index(
+            "idx_auditoria_punto_completo", "tabla_afectada", "id_registro", "id",
+            postgresql_where=text("completo"),
+        ),
+        Index(
+            "idx_auditoria_fecha_brin", "fecha_operacion",
+            postgresql_using="brin",
+            postgresql_with={"pages_per_range": 32},
+        ),
+    )
+
     # ========================================
     # COLUMNAS DE IDENTIFICACIÓN
     # ========================================
@@ -119,7 +141,8 @@ class HistorialAuditoria(Base):
         comment="Grupo que realizó la operación"
     )
     # Este campo indica qué grupo de estudiantes realizó la operación.
-    # Se toma automáticamente de settings.GRUPO_ESTUDIANTES
+    # Se toma del header X-Grupo / token de la petición,
+    # o de settings.GRUPO_ESTUDIANTES si la petición no indica grupo
 
     # ========================================
     # DATOS DE LA OPERACIÓN (JSON)
@@ -128,22 +151,36 @@ class HistorialAuditoria(Base):
     datos_anteriores = Column(
         Text,             # Se guarda como texto (JSON serializado)
         nullable=True,    # Opcional porque CREATE no tiene datos anteriores
-        comment="JSON con los datos antes de la modificación (solo UPDATE)"
+        comment="JSON con los valores anteriores de los campos modificados"
     )
-    # Para operaciones UPDATE, aquí se guardan los valores ANTES del cambio.
-    # Ejemplo: {"nombre": "Laptop HP", "precio": 1500000, ...}
+    # Para UPDATE y DELETE, aquí se guardan SOLO los campos que cambiaron,
+    # con su valor ANTES del cambio.
+    # Ejemplo: {"precio": 1500000.0}
     #
-    # Para CREATE y DELETE, este campo es NULL.
+    # Para CREATE, este campo es NULL.
+    # La API devuelve la vista completa (ver app/auditoria_compacta.py).
 
     datos_nuevos = Column(
         Text,             # Se guarda como texto (JSON serializado)
         nullable=True,    # Opcional
-        comment="JSON con los datos después de la modificación"
+        comment="JSON con los valores nuevos de los campos modificados"
     )
     # Aquí se guardan los datos NUEVOS después de la operación.
-    # Para CREATE: los datos del registro creado
-    # Para UPDATE: los datos modificados
-    # Para DELETE: generalmente {"activo": false}
+    # Para CREATE: el registro completo (punto de partida del historial)
+    # Para UPDATE: solo los campos que cambiaron, ej: {"precio": 1400000.0}
+    # Para DELETE: {"activo": false}
+
+    completo = Column(
+        Boolean,
+        nullable=False,
+        default=False,
+        server_default=text("FALSE"),
+        comment="La fila guarda el estado completo del registro (punto de partida para reconstruir)"
+    )
+    # True en CREATE (registro completo en 'datos_nuevos'), en DELETE y en un
+    # UPDATE de cada AUDITORIA_PUNTO_COMPLETO_CADA versiones (todos los campos
+    # anteriores en 'datos_anteriores'). La reconstrucción empieza en el
+    # último punto completo y no en el CREATE.
 
     fecha_operacion = Column(
         DateTime(timezone=True),  # Incluye zona horaria
@@ -8,7 +8,7 @@ la tabla 'clientes' en PostgreSQL.
 Cada instancia de esta clase es un cliente de la tienda virtual.
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text
+from sqlalchemy import Column, Index, Integer, String, Boolean, DateTime, Text
 from sqlalchemy.sql import text
 from typing import Any
 from ..database import Base
@@ -46,11 +46,18 @@ class Cliente(Base):
         - fecha_actualizacion: Última modificación
         - grupo_creador: Qué grupo lo creó
         - grupo_ultima_modificacion: Último grupo que lo modificó
+        - version: Aumenta en cada modificación (If-Match / ETag)
     """
 
     # Nombre de la tabla en la base de datos PostgreSQL
     __tablename__ = "clientes"
 
+    # Índice compuesto para la sincronización incremental (GET /clientes/cambios):
+    # permite leer "lo que cambió después del cursor" en orden sin recorrer la tabla
+    __table_args__ = (
+        Index("idx_clientes_actualizacion_id", "fecha_actualizacion", "id"),
+    )
+
     # ========================================
     # COLUMNAS PRINCIPALES
     # ========================================
@@ -143,7 +150,7 @@ class Cliente(Base):
         index=True,       # Índice para filtrar por grupo
         comment="Nombre del grupo de estudiantes que creó el cliente"
     )
-    # Se llena automáticamente con settings.GRUPO_ESTUDIANTES
+    # Se llena con el grupo de la petición o con settings.GRUPO_ESTUDIANTES
 
     grupo_ultima_modificacion = Column(
         String(50),
@@ -151,6 +158,20 @@ class Cliente(Base):
         comment="Nombre del grupo que hizo la última modificación"
     )
 
+    version = Column(
+        Integer,
+        nullable=False,
+        default=1,
+        server_default=text("1"),
+        comment="Número de versión: aumenta en cada modificación (control de concurrencia)"
+    )
+    # Con version_id_col, SQLAlchemy escribe cada cambio como
+    #   UPDATE clientes SET ..., version = <leída + 1> WHERE id = ? AND version = <leída>
+    # Si otro grupo modificó el cliente entre la lectura y el UPDATE, no se
+    # actualiza ninguna fila y se lanza StaleDataError (la API responde 412).
+    # Así dos ediciones simultáneas no se pisan, sin bloquear filas.
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         """
         Representación en string del objeto.
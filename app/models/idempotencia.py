@@ -0,0 +1,85 @@
+"""
+========================================
+MODELO: CLAVES DE IDEMPOTENCIA
+========================================
+Este archivo define la clase ClaveIdempotencia que representa
+la tabla 'claves_idempotencia' en PostgreSQL.
+
+Las apps móviles reintentan POST /productos/ y POST /clientes/ cuando
+la red falla. Si la primera petición sí llegó, el reintento creaba un
+duplicado. Con el header Idempotency-Key, la respuesta de la primera
+petición se guarda aquí y los reintentos la reciben sin volver a
+escribir nada.
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy.sql import text
+from ..database import Base
+
+
+class ClaveIdempotencia(Base):
+    """
+    🔑 CLASE CLAVE DE IDEMPOTENCIA - Respuesta guardada de una creación
+
+    Una fila por cada (grupo, clave) usada. Se borran solas después de
+    IDEMPOTENCIA_TTL_HORAS (ver app/idempotencia.py).
+
+    Campos:
+        - grupo_responsable: Grupo que envió la petición
+        - clave: Valor del header Idempotency-Key
+        - huella: Hash de la petición (ruta + datos enviados)
+        - codigo_estado: Código HTTP de la respuesta guardada
+        - respuesta: Cuerpo JSON de la respuesta guardada
+        - fecha_creacion: Cuándo se guardó
+    """
+
+    # Nombre de la tabla en la base de datos PostgreSQL
+    __tablename__ = "claves_idempotencia"
+
+    # La clave es única por grupo: dos grupos pueden usar el mismo valor
+    grupo_responsable = Column(
+        String(50),
+        primary_key=True,
+        comment="Grupo que envió la petición"
+    )
+
+    clave = Column(
+        String(255),
+        primary_key=True,
+        comment="Valor del header Idempotency-Key"
+    )
+
+    huella = Column(
+        String(64),
+        nullable=False,
+        comment="SHA-256 de la ruta y los datos enviados"
+    )
+
+    codigo_estado = Column(
+        Integer,
+        nullable=False,
+        comment="Código HTTP de la respuesta guardada"
+    )
+
+    respuesta = Column(
+        Text,
+        nullable=False,
+        comment="Cuerpo JSON de la respuesta guardada"
+    )
+
+    fecha_creacion = Column(
+        DateTime(timezone=True),
+        server_default=text("NOW()"),
+        nullable=False,
+        index=True,  # Para borrar rápido las claves vencidas
+        comment="Fecha y hora en que se guardó la respuesta"
+    )
+
+    def __repr__(self):
+        return (
+            f"<ClaveIdempotencia("
+            f"grupo='{self.grupo_responsable}', "
+            f"clave='{self.clave}', "
+            f"codigo_estado={self.codigo_estado}"
+            f")>"
+        )
@@ -8,7 +8,7 @@ la tabla 'productos' en PostgreSQL.
 Cada instancia de esta clase es un producto en la tienda virtual.
 """
 
-from sqlalchemy import Column, Integer, String, Numeric, Boolean, DateTime, Text
+from sqlalchemy import Column, Index, Integer, String, Numeric, Boolean, DateTime, Text
 from sqlalchemy.sql import text
 from typing import Any
 from ..database import Base
@@ -46,11 +46,26 @@ class Producto(Base):
         - fecha_actualizacion: Última modificación
         - grupo_creador: Qué grupo lo creó
         - grupo_ultima_modificacion: Último grupo que lo modificó
+        - version: Aumenta en cada modificación (If-Match / ETag)
     """
 
     # Nombre de la tabla en la base de datos PostgreSQL
     __tablename__ = "productos"
 
+    # Índice compuesto para la sincronización incremental (GET /productos/cambios):
+    # permite leer "lo que cambió después del cursor" en orden sin recorrer la tabla
+    #
+    # Índices parciales (solo productos activos) para los listados más comunes
+    # de GET /productos/: por precio y por más recientes, con o sin categoría.
+    # Terminan en 'id' para que la paginación con cursor siga el índice.
+    __table_args__ = (
+        Index("idx_productos_actualizacion_id", "fecha_actualizacion", "id"),
+        Index("idx_productos_activos_precio", "precio", "id", postgresql_where=text("activo")),
+        Index("idx_productos_activos_categoria_precio", "categoria", "precio", "id", postgresql_where=text("activo")),
+        Index("idx_productos_activos_recientes", "fecha_creacion", "id", postgresql_where=text("activo")),
+        Index("idx_productos_activos_categoria_recientes", "categoria", "fecha_creacion", "id", postgresql_where=text("activo")),
+    )
+
     # ========================================
     # COLUMNAS PRINCIPALES
     # ========================================
@@ -139,8 +154,8 @@ class Producto(Base):
         index=True,       # Índice para filtrar por grupo
         comment="Nombre del grupo de estudiantes que creó el producto"
     )
-    # Este campo se llena automáticamente con el valor de
-    # settings.GRUPO_ESTUDIANTES desde el archivo .env
+    # Este campo se llena con el grupo de la petición (header X-Grupo o token)
+    # o, si no se indica, con settings.GRUPO_ESTUDIANTES desde el archivo .env
 
     grupo_ultima_modificacion = Column(
         String(50),
@@ -148,6 +163,20 @@ class Producto(Base):
         comment="Nombre del grupo que hizo la última modificación"
     )
 
+    version = Column(
+        Integer,
+        nullable=False,
+        default=1,
+        server_default=text("1"),
+        comment="Número de versión: aumenta en cada modificación (control de concurrencia)"
+    )
+    # Con version_id_col, SQLAlchemy escribe cada cambio como
+    #   UPDATE productos SET ..., version = <leída + 1> WHERE id = ? AND version = <leída>
+    # Si otro grupo modificó el producto entre la lectura y el UPDATE, no se
+    # actualiza ninguna fila y se lanza StaleDataError (la API responde 412).
+    # Así dos ediciones simultáneas no se pisan, sin bloquear filas.
+    __mapper_args__ = {"version_id_col": version}
+
     def __repr__(self):
         """
         Representación en string del objeto.
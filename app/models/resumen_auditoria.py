@@ -0,0 +1,94 @@
+"""
+========================================
+MODELO: RESUMEN DE AUDITORÍA POR HORA
+========================================
+Este archivo define la clase ResumenAuditoriaHora que representa
+la tabla 'resumen_auditoria_hora' en PostgreSQL.
+
+Los paneles grafican "operaciones por grupo, tabla y tipo, por hora".
+Calcular eso con GROUP BY sobre todo 'historial_auditoria' recorre
+millones de filas; esta tabla guarda los conteos ya sumados.
+"""
+
+from sqlalchemy import Column, Integer, SmallInteger, String, DateTime
+from ..database import Base
+
+
+class ResumenAuditoriaHora(Base):
+    """
+    📈 CLASE RESUMEN DE AUDITORÍA - Conteo de operaciones por hora
+
+    Hasta AUDITORIA_RESUMEN_PARTICIONES filas por cada combinación
+    (hora, grupo, tabla, operación) con al menos una operación; el total
+    de la combinación es la suma de sus particiones. Se actualiza sola
+    cada vez que se escribe un registro de auditoría (ver
+    app/resumen_auditoria.py).
+
+    Ejemplo:
+        hora=2025-03-01 14:00, grupo=GRUPO_1, tabla=productos, operacion=UPDATE, particion=0, total=20
+        hora=2025-03-01 14:00, grupo=GRUPO_1, tabla=productos, operacion=UPDATE, particion=5, total=17
+        -> GRUPO_1 actualizó productos 37 veces entre las 14:00 y las 15:00
+
+    Campos:
+        - hora: Inicio de la hora (minutos y segundos en cero)
+        - grupo_responsable: Qué grupo hizo las operaciones
+        - tabla_afectada: "productos" o "clientes"
+        - operacion: "CREATE", "UPDATE" o "DELETE"
+        - particion: Reparte las escrituras concurrentes entre varias filas
+        - total: Cantidad de operaciones en esa hora (en esta partición)
+    """
+
+    # Nombre de la tabla en la base de datos PostgreSQL
+    __tablename__ = "resumen_auditoria_hora"
+
+    # La llave primaria es la combinación completa: la hora va primero para
+    # que las consultas por rango de fechas usen el índice directamente
+    hora = Column(
+        DateTime(timezone=True),
+        primary_key=True,
+        comment="Inicio de la hora"
+    )
+
+    grupo_responsable = Column(
+        String(50),
+        primary_key=True,
+        comment="Grupo que realizó las operaciones"
+    )
+
+    tabla_afectada = Column(
+        String(50),
+        primary_key=True,
+        comment="Tabla afectada (productos o clientes)"
+    )
+
+    operacion = Column(
+        String(20),
+        primary_key=True,
+        comment="Tipo de operación: CREATE, UPDATE, DELETE"
+    )
+
+    particion = Column(
+        SmallInteger,
+        primary_key=True,
+        default=0,
+        comment="Fila de la combinación donde se sumó (se suman todas al leer)"
+    )
+
+    total = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        comment="Operaciones realizadas en esa hora"
+    )
+
+    def __repr__(self):
+        return (
+            f"<ResumenAuditoriaHora("
+            f"hora={self.hora}, "
+            f"grupo='{self.grupo_responsable}', "
+            f"tabla='{self.tabla_afectada}', "
+            f"operacion='{self.operacion}', "
+            f"particion={self.particion}, "
+            f"total={self.total}"
+            f")>"
+        )
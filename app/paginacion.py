@@ -0,0 +1,147 @@
+"""
+========================================
+ORDEN Y PAGINACIÓN CON CURSOR
+========================================
+Con ?skip=5000 PostgreSQL tiene que leer y descartar 5000 filas antes
+de devolver la página. Con un cursor, cada página continúa justo donde
+terminó la anterior:
+
+    GET /productos/?orden=precio_asc&limit=50
+    -> header X-Siguiente-Cursor: eyJvIjoi...
+
+    GET /productos/?orden=precio_asc&limit=50&cursor=eyJvIjoi...
+
+El cursor guarda el valor de la columna de orden y el id del último
+registro entregado; la consulta usa una comparación de filas
+(precio, id) > (:precio, :id) que recorre el índice compuesto directamente.
+"""
+
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+
+# Header con el cursor de la página siguiente
+HEADER_SIGUIENTE_CURSOR = "X-Siguiente-Cursor"
+
+# Orden = (columna, descendente)
+Orden = Tuple[str, bool]
+
+
+def validar_orden(orden: str, ordenes: Dict[str, Orden]) -> Orden:
+    """
+    Verifica que el orden pedido esté en la lista permitida.
+
+    Raises:
+        HTTPException 400: Si el orden no existe
+    """
+    if orden not in ordenes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Orden no válido: '{orden}'. Opciones: {', '.join(ordenes)}"
+        )
+    return ordenes[orden]
+
+
+def _a_json(valor: Any) -> Any:
+    """Valores de la columna de orden que JSON no soporta directamente"""
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+
+def codificar_cursor(nombre_orden: str, valor: Any, id_registro: int) -> str:
+    """
+    Cursor opaco para la URL con (orden, valor de la columna, id).
+
+    El nombre del orden se incluye para rechazar un cursor usado con
+    un orden distinto al que lo generó.
+    """
+    crudo = json.dumps({"o": nombre_orden, "v": _a_json(valor), "id": id_registro}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(crudo.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: str, nombre_orden: str, columna: Any) -> Tuple[Any, int]:
+    """
+    Operación inversa de codificar_cursor().
+
+    Args:
+        cursor: Valor recibido en ?cursor=
+        nombre_orden: Orden de la petición actual
+        columna: Columna del modelo (para convertir el valor a su tipo)
+
+    Raises:
+        HTTPException 400: Si el cursor no es válido o es de otro orden
+    """
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if datos["o"] != nombre_orden:
+            raise ValueError("orden distinto")
+        valor = datos["v"]
+        tipo = columna.type.python_type
+        if valor is not None:
+            valor = datetime.fromisoformat(valor) if tipo is datetime else tipo(valor)
+        return valor, int(datos["id"])
+    except (ValueError, KeyError, TypeError, ArithmeticError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El 'cursor' no es válido para este orden. "
+                   f"Usa el valor del header {HEADER_SIGUIENTE_CURSOR} de la respuesta anterior."
+        )
+
+
+def aplicar_orden_y_cursor(
+    query,
+    modelo: Any,
+    nombre_orden: str,
+    orden: Orden,
+    cursor: Optional[str]
+):
+    """
+    Ordena por (columna, id) y, si hay cursor, continúa después de él.
+
+    El id desempata registros con el mismo valor (mismo precio, etc.)
+    para que ninguna fila se repita ni se pierda entre páginas.
+
+    Returns:
+        Query: Consulta ordenada (falta aplicar limit)
+    """
+    nombre_columna, descendente = orden
+    columna = getattr(modelo, nombre_columna)
+
+    if cursor:
+        valor, id_registro = decodificar_cursor(cursor, nombre_orden, columna)
+        if descendente:
+            query = query.filter(tuple_(columna, modelo.id) < tuple_(valor, id_registro))
+        else:
+            query = query.filter(tuple_(columna, modelo.id) > tuple_(valor, id_registro))
+
+    if descendente:
+        return query.order_by(columna.desc(), modelo.id.desc())
+    return query.order_by(columna.asc(), modelo.id.asc())
+
+
+def siguiente_cursor(
+    registros: List[Any],
+    limite: int,
+    nombre_orden: str,
+    orden: Orden
+) -> Optional[str]:
+    """
+    Cursor de la página siguiente, o None si esta fue la última.
+
+    Args:
+        registros: Registros de la página actual
+        limite: Tamaño de página pedido
+    """
+    if len(registros) < limite or not registros:
+        return None
+    ultimo = registros[-1]
+    return codificar_cursor(nombre_orden, getattr(ultimo, orden[0]), ultimo.id)
@@ -0,0 +1,159 @@
+"""
+========================================
+PERFILADOR DE CPU POR MUESTREO
+========================================
+Para saber en qué gasta CPU un worker en producción (validación de
+Pydantic, carga de objetos del ORM, JSON, middlewares...) sin
+reiniciarlo ni instalar nada.
+
+Un hilo aparte mira, N veces por segundo, qué función está ejecutando
+cada hilo del proceso (sys._current_frames()) y cuenta cuántas veces
+aparece cada pila. No modifica el código que se mide: el costo es solo
+el del hilo que mira (bajo a 100 Hz).
+
+El resultado va en formato "collapsed stacks", una línea por pila:
+
+    MainThread;run (uvicorn/server.py:61);...;validate_python (...) 42
+
+que leen directamente flamegraph.pl, speedscope.app o inferno.
+"""
+
+import os
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from types import CodeType, FrameType
+from typing import Dict, Optional, Tuple
+
+# Función más interna de un hilo que está esperando (no usa CPU):
+# (final de la ruta del archivo, nombre de la función)
+FUNCIONES_DE_ESPERA = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("concurrent/futures/thread.py", "_worker"),
+}
+
+# Profundidad máxima de una pila (recursiones muy profundas se cortan)
+MAX_PROFUNDIDAD = 200
+
+# Las rutas se muestran relativas a la carpeta del proyecto o de la
+# biblioteca estándar (las de site-packages, desde ahí)
+_CARPETA_PROYECTO = os.getcwd().replace("\\", "/") + "/"
+_CARPETA_STDLIB = sysconfig.get_paths()["stdlib"].replace("\\", "/") + "/"
+
+
+class PerfilEnCurso(Exception):
+    """Ya hay un perfil corriendo en este proceso"""
+
+
+@lru_cache(maxsize=8192)
+def _etiqueta(codigo: CodeType) -> str:
+    """
+    Nombre de una función en la pila: "funcion (paquete/archivo.py:linea)".
+
+    La ruta se acorta desde site-packages, la biblioteca estándar o la
+    carpeta del proyecto.
+    """
+    ruta = codigo.co_filename.replace("\\", "/")
+    if "site-packages/" in ruta:
+        ruta = ruta.split("site-packages/", 1)[1]
+    elif ruta.startswith(_CARPETA_STDLIB):
+        ruta = ruta[len(_CARPETA_STDLIB):]
+    elif ruta.startswith(_CARPETA_PROYECTO):
+        ruta = ruta[len(_CARPETA_PROYECTO):]
+    # ';' separa funciones en el formato collapsed
+    return f"{codigo.co_name} ({ruta}:{codigo.co_firstlineno})".replace(";", ":")
+
+
+def _esperando(marco: FrameType) -> bool:
+    """Indica si el hilo está bloqueado esperando (heurística por la función más interna)"""
+    codigo = marco.f_code
+    ruta = codigo.co_filename.replace("\\", "/")
+    return any(ruta.endswith(archivo) and codigo.co_name == funcion for archivo, funcion in FUNCIONES_DE_ESPERA)
+
+
+def _pila(marco: Optional[FrameType]) -> str:
+    """Pila de la más externa a la más interna, separada por ';'"""
+    etiquetas = []
+    while marco is not None and len(etiquetas) < MAX_PROFUNDIDAD:
+        etiquetas.append(_etiqueta(marco.f_code))
+        marco = marco.f_back
+    etiquetas.reverse()
+    return ";".join(etiquetas)
+
+
+class Perfilador:
+    """
+    Toma muestras de las pilas de todos los hilos del proceso.
+
+    Solo corre un perfil a la vez por proceso (dos a la vez se medirían
+    el uno al otro).
+    """
+
+    def __init__(self):
+        self._candado = threading.Lock()
+
+    def muestrear(self, segundos: float, frecuencia: int, incluir_espera: bool = False) -> Tuple[Dict[str, int], int]:
+        """
+        Muestrea durante 'segundos' (bloquea el hilo que lo llama).
+
+        Args:
+            segundos: Duración del perfil
+            frecuencia: Muestras por segundo
+            incluir_espera: Si False, omite los hilos que están esperando
+                            (pool de hilos ocioso, event loop sin trabajo)
+
+        Returns:
+            Tuple: ({"hilo;f1;f2": veces}, muestras tomadas)
+
+        Raises:
+            PerfilEnCurso: Si ya hay otro perfil corriendo
+        """
+        if not self._candado.acquire(blocking=False):
+            raise PerfilEnCurso("Ya hay un perfil en curso en este worker")
+
+        try:
+            propio = threading.get_ident()
+            intervalo = 1.0 / frecuencia
+            conteos: Counter = Counter()
+            muestras = 0
+
+            fin = time.perf_counter() + segundos
+            siguiente = time.perf_counter()
+            while siguiente < fin:
+                nombres = {hilo.ident: hilo.name for hilo in threading.enumerate()}
+                for ident, marco in sys._current_frames().items():
+                    if ident == propio:
+                        continue
+                    if not incluir_espera and _esperando(marco):
+                        continue
+                    conteos[f"{nombres.get(ident, ident)};{_pila(marco)}"] += 1
+                muestras += 1
+
+                siguiente += intervalo
+                espera = siguiente - time.perf_counter()
+                if espera > 0:
+                    time.sleep(espera)
+                else:
+                    # Atrasado (proceso muy ocupado): no intentar recuperar muestras
+                    siguiente = time.perf_counter()
+
+            return dict(conteos), muestras
+        finally:
+            self._candado.release()
+
+
+def formato_collapsed(conteos: Dict[str, int]) -> str:
+    """Texto para herramientas de flamegraph: "pila veces" por línea, la más frecuente primero"""
+    lineas = [f"{pila} {veces}" for pila, veces in sorted(conteos.items(), key=lambda par: -par[1])]
+    return "\n".join(lineas) + ("\n" if lineas else "")
+
+
+# ========================================
+# INSTANCIA DEL PROCESO
+# ========================================
+perfilador = Perfilador()
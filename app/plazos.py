@@ -0,0 +1,158 @@
+"""
+========================================
+PLAZOS DE CONSULTA Y CANCELACIÓN
+========================================
+Una búsqueda o un recorrido de auditoría puede tardar segundos. Si el
+cliente se cansa y cierra la conexión, la consulta seguía corriendo en
+PostgreSQL y ocupando una conexión del pool hasta terminar.
+
+- Plazo: cada transacción de una petición empieza con
+  SET LOCAL statement_timeout = <ms según el tipo de ruta>
+  (DB_TIMEOUT_LECTURAS_MS, DB_TIMEOUT_ESCRITURAS_MS, DB_TIMEOUT_AUDITORIA_MS).
+  Si la consulta se pasa, PostgreSQL la cancela y la API responde 503.
+- Cancelación: el middleware de cancelación (app/middleware/cancelacion.py)
+  avisa cuando el cliente se desconecta; en ese momento se envía una
+  solicitud de cancelación a las consultas de esa petición que estén
+  corriendo, y las siguientes ya no se ejecutan. Solo aplica a las
+  rutas que consultan con run_in_threadpool (búsquedas y auditoría,
+  ver RUTAS_CANCELABLES): las que consultan en el event loop no dejan
+  correr al vigilante hasta terminar.
+
+Para saber qué conexiones pertenecen a qué petición se usa una
+ContextVar: FastAPI la copia a los hilos donde corren las consultas.
+"""
+
+import logging
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Código de PostgreSQL para "consulta cancelada" (plazo vencido o cancelación)
+CODIGO_CONSULTA_CANCELADA = "57014"
+
+
+class PeticionAbandonada(Exception):
+    """El cliente se desconectó: no se ejecutan más consultas de su petición"""
+
+
+class PeticionEnCurso:
+    """
+    Estado de una petición HTTP frente a la base de datos.
+
+    Lo crea el middleware de cancelación al inicio de cada petición.
+    """
+
+    def __init__(self, timeout_ms: int):
+        self.timeout_ms = timeout_ms
+        self.cancelada = False
+        self._conexiones: Set[Any] = set()  # Conexiones DBAPI ejecutando una consulta ahora
+        self._candado = threading.Lock()  # Las consultas corren en otros hilos
+
+    def empieza(self, conexion: Any) -> None:
+        """
+        Anota que 'conexion' va a ejecutar una consulta de esta petición.
+
+        Raises:
+            PeticionAbandonada: Si el cliente ya se desconectó
+        """
+        with self._candado:
+            if self.cancelada:
+                raise PeticionAbandonada("El cliente se desconectó")
+            self._conexiones.add(conexion)
+
+    def termina(self, conexion: Any) -> None:
+        """La consulta de 'conexion' terminó (bien o con error)"""
+        with self._candado:
+            self._conexiones.discard(conexion)
+
+    def cancelar(self) -> int:
+        """
+        Cancela las consultas en curso y bloquea las siguientes.
+
+        Returns:
+            int: Consultas a las que se envió la cancelación
+        """
+        with self._candado:
+            self.cancelada = True
+            conexiones = list(self._conexiones)
+
+        canceladas = 0
+        for conexion in conexiones:
+            # psycopg2 tiene cancel(); sqlite3 (pruebas locales) tiene interrupt()
+            cancelar = getattr(conexion, "cancel", None) or getattr(conexion, "interrupt", None)
+            if cancelar is None:
+                continue
+            try:
+                cancelar()
+                canceladas += 1
+            except Exception:
+                logger.exception("No se pudo cancelar una consulta")
+
+        _contadores["consultas_canceladas"] += canceladas
+        return canceladas
+
+
+# Petición que se está atendiendo en este contexto (None fuera de una petición)
+peticion_actual: ContextVar[Optional[PeticionEnCurso]] = ContextVar("peticion_actual", default=None)
+
+_contadores: Dict[str, int] = {"consultas_canceladas": 0, "plazos_vencidos": 0}
+
+
+def estadisticas() -> Dict[str, int]:
+    """Contadores para /health"""
+    return dict(_contadores)
+
+
+def es_consulta_cancelada(error: Exception) -> bool:
+    """Indica si un error de SQLAlchemy es una consulta cancelada por PostgreSQL"""
+    return getattr(getattr(error, "orig", None), "pgcode", None) == CODIGO_CONSULTA_CANCELADA
+
+
+def registrar_plazo_vencido() -> None:
+    """Cuenta una consulta cancelada por statement_timeout"""
+    _contadores["plazos_vencidos"] += 1
+
+
+# ========================================
+# EVENTOS DE SQLALCHEMY
+# ========================================
+
+def instalar_en_motor(motor: Any) -> None:
+    """Lleva la cuenta de qué conexión ejecuta una consulta de qué petición"""
+
+    @event.listens_for(motor, "before_cursor_execute")
+    def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+        peticion = peticion_actual.get()
+        if peticion is not None:
+            peticion.empieza(cursor.connection)
+
+    @event.listens_for(motor, "after_cursor_execute")
+    def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+        peticion = peticion_actual.get()
+        if peticion is not None:
+            peticion.termina(cursor.connection)
+
+    @event.listens_for(motor, "handle_error")
+    def _al_fallar(contexto):
+        peticion = peticion_actual.get()
+        cursor = getattr(contexto.execution_context, "cursor", None)
+        if peticion is not None and cursor is not None:
+            peticion.termina(cursor.connection)
+
+
+def instalar_en_sesiones(fabrica: Any) -> None:
+    """Fija el statement_timeout de la petición al inicio de cada transacción"""
+
+    @event.listens_for(fabrica, "after_begin")
+    def _fijar_plazo(session, transaction, connection):
+        peticion = peticion_actual.get()
+        if peticion is None or not peticion.timeout_ms:
+            return
+        if connection.dialect.name != "postgresql":
+            return
+        # SET LOCAL dura solo esta transacción: la conexión vuelve limpia al pool
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(peticion.timeout_ms)}")
@@ -0,0 +1,60 @@
+"""
+========================================
+RESUMEN DE AUDITORÍA (CONTEOS POR HORA)
+========================================
+Cada registro de auditoría suma 1 a su fila de 'resumen_auditoria_hora'
+dentro de la MISMA transacción: si la operación se deshace, el conteo
+también. Así el resumen nunca se desincroniza y GET /auditoria/resumen
+lee unos cientos de filas en lugar de millones.
+
+Con una sola fila por (hora, grupo, tabla, operación), todas las
+escrituras concurrentes de un grupo sobre una tabla esperarían el
+bloqueo de esa fila hasta el commit de la anterior. Por eso cada
+combinación se reparte en AUDITORIA_RESUMEN_PARTICIONES filas (columna
+'particion', elegida al azar) y la lectura las suma.
+"""
+
+import random
+from datetime import datetime, timezone
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as insert_postgresql
+from sqlalchemy.dialects.sqlite import insert as insert_sqlite
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models import HistorialAuditoria, ResumenAuditoriaHora
+
+
+def sumar_al_resumen(db: Session, auditoria: HistorialAuditoria) -> None:
+    """
+    Suma una operación al resumen de su hora (insertar o incrementar).
+
+    Debe llamarse antes del commit del registro de auditoría.
+
+    Args:
+        db: Sesión de base de datos
+        auditoria: Registro de auditoría recién agregado
+    """
+    dialecto = db.get_bind().dialect.name
+    if dialecto == "postgresql":
+        # Misma hora que fecha_operacion (NOW() = inicio de la transacción)
+        hora = func.date_trunc("hour", func.now())
+        insert = insert_postgresql
+    else:
+        hora = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        insert = insert_sqlite
+
+    consulta = insert(ResumenAuditoriaHora).values(
+        hora=hora,
+        grupo_responsable=auditoria.grupo_responsable,
+        tabla_afectada=auditoria.tabla_afectada,
+        operacion=auditoria.operacion,
+        particion=random.randrange(max(1, settings.AUDITORIA_RESUMEN_PARTICIONES)),
+        total=1,
+    )
+    consulta = consulta.on_conflict_do_update(
+        index_elements=["hora", "grupo_responsable", "tabla_afectada", "operacion", "particion"],
+        set_={"total": ResumenAuditoriaHora.total + 1},
+    )
+    db.execute(consulta)
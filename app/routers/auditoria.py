@@ -4,16 +4,34 @@ ROUTER DE AUDITORÍA
 ========================================
 Endpoints para consultar el historial de auditoría.
 Permite ver qué grupos han hecho qué operaciones.
+
+Las consultas incluyen también el historial archivado en disco
+(ver app/archivo_auditoria.py), sin que el cliente lo note.
+
+Las consultas corren en un hilo aparte (run_in_threadpool): así el
+servidor sigue atento a la conexión y, si el cliente se va, las cancela
+(ver app/plazos.py).
+
+Las fechas sin zona horaria (?desde=2025-03-01T08:00:00) se toman como
+UTC, tanto para la tabla como para el archivo.
 """
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime, timedelta
-
-from ..database import get_db
-from ..models import HistorialAuditoria
-from ..schemas import AuditoriaResponse
+from starlette.concurrency import run_in_threadpool
+from typing import List, NamedTuple, Optional, Set, Tuple, Union
+from datetime import date, datetime, time, timedelta
+import asyncio
+import json
+
+from ..database import get_db_lectura
+from ..models import HistorialAuditoria, ResumenAuditoriaHora
+from ..schemas import AuditoriaResponse, ResumenAuditoriaResponse
+from ..eventos_auditoria import Suscripcion, difusor, registros_desde
+from ..archivo_auditoria import consultar_historial, cursor_historial, fecha_con_zona
+from ..paginacion import HEADER_SIGUIENTE_CURSOR, codificar_cursor, decodificar_cursor
 
 # ========================================
 # CREAR EL ROUTER
@@ -25,6 +43,104 @@ router = APIRouter(
 )
 
 
+# ========================================
+# FILTRO POR RANGO DE FECHAS
+# ========================================
+class RangoFechas(NamedTuple):
+    desde: Optional[datetime]
+    hasta: Optional[datetime]
+
+
+def _como_fecha_hora(valor: Union[datetime, date, None]) -> Optional[datetime]:
+    """
+    Una fecha sin hora (2025-03-01) se toma como el inicio de ese día,
+    y una sin zona horaria, como UTC (ver fecha_con_zona()).
+    """
+    if valor is not None and not isinstance(valor, datetime):
+        valor = datetime.combine(valor, time.min)
+    return fecha_con_zona(valor)
+
+
+def rango_de_fechas(
+    desde: Union[datetime, date, None] = Query(
+        None,
+        description="Solo operaciones desde esta fecha (incluida). Ej: 2025-03-01 o 2025-03-01T08:00:00"
+    ),
+    hasta: Union[datetime, date, None] = Query(
+        None,
+        description="Solo operaciones antes de esta fecha (no incluida)"
+    )
+) -> RangoFechas:
+    """
+    Dependencia con el rango [desde, hasta) de fecha_operacion.
+
+    El rango se compara directamente contra la columna (sin funciones
+    sobre ella), así PostgreSQL puede usar el índice BRIN y leer solo los
+    bloques de esas fechas.
+
+    Raises:
+        HTTPException 400: Si 'hasta' no es posterior a 'desde'
+    """
+    desde, hasta = _como_fecha_hora(desde), _como_fecha_hora(hasta)
+    if desde is not None and hasta is not None and hasta <= desde:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'hasta' debe ser posterior a 'desde'"
+        )
+    return RangoFechas(desde, hasta)
+
+
+# ========================================
+# PAGINACIÓN CON CURSOR
+# ========================================
+# Nombre del orden dentro del cursor (el historial siempre va de lo más
+# reciente a lo más antiguo)
+ORDEN_HISTORIAL = "fecha_desc"
+
+
+class PaginaHistorial(NamedTuple):
+    skip: int
+    limit: int
+    despues_de: Optional[Tuple[datetime, int]]
+
+
+def pagina_historial(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(
+        None,
+        description="Continuar después de la página anterior (header X-Siguiente-Cursor)"
+    )
+) -> PaginaHistorial:
+    """
+    Dependencia con la paginación del historial.
+
+    Con 'skip', la tabla y el archivo tienen que leer skip + limit filas
+    cada uno; con 'cursor' leen solo 'limit' a partir de la última fila
+    entregada, sin importar qué tan lejos esté la página.
+
+    Raises:
+        HTTPException 400: Si se usan 'cursor' y 'skip' a la vez, o el cursor no es válido
+    """
+    if cursor and skip:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Usa 'cursor' o 'skip', no ambos"
+        )
+    despues_de = None
+    if cursor:
+        despues_de = decodificar_cursor(cursor, ORDEN_HISTORIAL, HistorialAuditoria.fecha_operacion)
+    return PaginaHistorial(skip, limit, despues_de)
+
+
+def con_siguiente_cursor(response: Response, registros: List[dict], pagina: PaginaHistorial) -> List[dict]:
+    """Agrega el header X-Siguiente-Cursor si la página vino llena"""
+    if registros and len(registros) >= pagina.limit:
+        fecha, id_registro = cursor_historial(registros)
+        response.headers[HEADER_SIGUIENTE_CURSOR] = codificar_cursor(ORDEN_HISTORIAL, fecha, id_registro)
+    return registros
+
+
 # ========================================
 # ENDPOINT: LISTAR HISTORIAL COMPLETO
 # ========================================
@@ -35,27 +151,186 @@ router = APIRouter(
     description="Obtiene el historial de todas las operaciones realizadas en la API."
 )
 async def listar_historial(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    response: Response,
+    pagina: PaginaHistorial = Depends(pagina_historial),
+    rango: RangoFechas = Depends(rango_de_fechas),
+    db: Session = Depends(get_db_lectura)
 ):
     """
     Lista el historial de auditoría con paginación.
 
     - **skip**: Registros a saltar
     - **limit**: Máximo de registros a devolver
+    - **desde** / **hasta**: Rango de fechas de la operación (opcional)
+    - **cursor**: Página siguiente (header X-Siguiente-Cursor de la respuesta anterior)
 
     Returns:
         List[AuditoriaResponse]: Historial de operaciones
     """
 
-    historial = db.query(HistorialAuditoria)\
-        .order_by(HistorialAuditoria.fecha_operacion.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
+    registros = await run_in_threadpool(
+        consultar_historial, db, skip=pagina.skip, limit=pagina.limit, despues_de=pagina.despues_de,
+        desde=rango.desde, hasta=rango.hasta
+    )
+    return con_siguiente_cursor(response, registros, pagina)
+
+
+# ========================================
+# ENDPOINT: RESUMEN POR HORA (PANELES)
+# ========================================
+DIAS_RESUMEN_POR_DEFECTO = 7
+
+
+@router.get(
+    "/resumen",
+    response_model=List[ResumenAuditoriaResponse],
+    summary="Operaciones por hora",
+    description="Cantidad de operaciones por hora, grupo, tabla y tipo de operación. "
+                "Pensado para gráficas de actividad."
+)
+async def resumen_por_hora(
+    grupo: Optional[str] = None,
+    tabla: Optional[str] = None,
+    operacion: Optional[str] = None,
+    rango: RangoFechas = Depends(rango_de_fechas),
+    db: Session = Depends(get_db_lectura)
+):
+    """
+    Lee los conteos ya sumados de resumen_auditoria_hora
+    (no recorre el historial completo) y junta sus particiones.
+
+    - **grupo**, **tabla**, **operacion**: Filtros opcionales
+    - **desde** / **hasta**: Rango de fechas (por defecto, los últimos 7 días)
 
-    return historial
+    Returns:
+        List[ResumenAuditoriaResponse]: Una fila por hora y combinación, en orden de hora
+    """
+
+    desde = rango.desde
+    if desde is None:
+        desde = datetime.now().astimezone() - timedelta(days=DIAS_RESUMEN_POR_DEFECTO)
+
+    columnas = (
+        ResumenAuditoriaHora.hora,
+        ResumenAuditoriaHora.grupo_responsable,
+        ResumenAuditoriaHora.tabla_afectada,
+        ResumenAuditoriaHora.operacion,
+    )
+    query = db.query(*columnas, func.sum(ResumenAuditoriaHora.total).label("total"))
+    query = query.filter(ResumenAuditoriaHora.hora >= desde)
+    if rango.hasta is not None:
+        query = query.filter(ResumenAuditoriaHora.hora < rango.hasta)
+    if grupo:
+        query = query.filter(ResumenAuditoriaHora.grupo_responsable == grupo)
+    if tabla:
+        query = query.filter(ResumenAuditoriaHora.tabla_afectada == tabla)
+    if operacion:
+        query = query.filter(ResumenAuditoriaHora.operacion == operacion.upper())
+
+    query = query.group_by(*columnas).order_by(
+        ResumenAuditoriaHora.hora.asc(),
+        ResumenAuditoriaHora.grupo_responsable.asc(),
+        ResumenAuditoriaHora.tabla_afectada.asc(),
+        ResumenAuditoriaHora.operacion.asc()
+    )
+    return await run_in_threadpool(query.all)
+
+
+# ========================================
+# ENDPOINT: EVENTOS EN VIVO (SSE)
+# ========================================
+SEGUNDOS_ENTRE_PINGS = 15  # Mantiene viva la conexión a través de proxies
+TAMANO_LOTE_REANUDAR = 500  # Registros por consulta al reanudar
+
+
+def _formato_sse(registro: dict) -> str:
+    """Convierte un registro en un evento de Server-Sent Events"""
+    return f"id: {registro['id']}\nevent: auditoria\ndata: {json.dumps(registro)}\n\n"
+
+
+@router.get(
+    "/eventos",
+    summary="Recibir operaciones en vivo",
+    description="Stream (Server-Sent Events) con cada registro de auditoría nuevo. "
+                "Reemplaza consultar /auditoria/ cada pocos segundos.",
+    response_class=StreamingResponse
+)
+async def eventos_en_vivo(
+    tabla: Optional[str] = None,
+    operacion: Optional[str] = None,
+    grupo: Optional[str] = None,
+    desde_id: Optional[int] = Query(None, description="Reenviar primero los registros con id mayor a este"),
+    last_event_id: Optional[str] = Header(None, include_in_schema=False)
+):
+    """
+    Envía los registros de auditoría en el momento en que se guardan.
+
+    - **tabla**: Solo eventos de esta tabla (productos o clientes)
+    - **operacion**: Solo eventos de este tipo (CREATE, UPDATE, DELETE)
+    - **grupo**: Solo eventos de este grupo
+    - **desde_id**: Reanudar desde un id (el navegador envía Last-Event-ID solo al reconectar)
+
+    Ejemplo en JavaScript:
+        const fuente = new EventSource("/auditoria/eventos?grupo=GRUPO_1");
+        fuente.addEventListener("auditoria", e => console.log(JSON.parse(e.data)));
+    """
+
+    ultimo_id = desde_id
+    if last_event_id and last_event_id.isdigit():
+        ultimo_id = int(last_event_id)
+
+    # Suscribirse ANTES de leer lo pendiente para no perder eventos en medio
+    suscripcion = Suscripcion(tabla=tabla, operacion=operacion, grupo=grupo)
+    difusor.suscribir(suscripcion)
+
+    async def generar():
+        nonlocal ultimo_id
+        # Ids enviados al reanudar: pueden volver a llegar por la cola si se
+        # guardaron justo después de suscribirse
+        enviados_al_reanudar: Set[int] = set()
+        try:
+            yield "retry: 3000\n\n"  # El navegador reintenta a los 3 segundos
+
+            # 1. Registros que el cliente se perdió mientras estaba desconectado
+            if ultimo_id is not None:
+                while True:
+                    lote = await run_in_threadpool(
+                        registros_desde, suscripcion, ultimo_id, TAMANO_LOTE_REANUDAR
+                    )
+                    for registro in lote:
+                        ultimo_id = registro["id"]
+                        enviados_al_reanudar.add(registro["id"])
+                        yield _formato_sse(registro)
+                    if len(lote) < TAMANO_LOTE_REANUDAR:
+                        break
+
+            # 2. Registros nuevos a medida que llegan
+            while True:
+                try:
+                    registro = await asyncio.wait_for(
+                        suscripcion.cola.get(), timeout=SEGUNDOS_ENTRE_PINGS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+
+                if registro is None:  # El servidor cerró el stream
+                    break
+                # No se compara con el último id enviado: los ids se asignan
+                # al hacer flush y el aviso llega con el commit, así que un id
+                # menor puede llegar después de uno mayor y es un evento nuevo
+                if registro["id"] in enviados_al_reanudar:
+                    enviados_al_reanudar.discard(registro["id"])  # Cada id llega una sola vez
+                    continue
+                yield _formato_sse(registro)
+        finally:
+            difusor.cancelar(suscripcion)
+
+    return StreamingResponse(
+        generar(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 # ========================================
@@ -69,27 +344,27 @@ async def listar_historial(
 )
 async def historial_por_grupo(
     nombre_grupo: str,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    response: Response,
+    pagina: PaginaHistorial = Depends(pagina_historial),
+    rango: RangoFechas = Depends(rango_de_fechas),
+    db: Session = Depends(get_db_lectura)
 ):
     """
     Filtra el historial por grupo.
 
     - **nombre_grupo**: Nombre del grupo a buscar
+    - **desde** / **hasta**: Rango de fechas de la operación (opcional)
+    - **cursor**: Página siguiente (header X-Siguiente-Cursor de la respuesta anterior)
 
     Returns:
         List[AuditoriaResponse]: Operaciones del grupo
     """
 
-    historial = db.query(HistorialAuditoria)\
-        .filter(HistorialAuditoria.grupo_responsable == nombre_grupo)\
-        .order_by(HistorialAuditoria.fecha_operacion.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
-
-    return historial
+    registros = await run_in_threadpool(
+        consultar_historial, db, grupo=nombre_grupo, skip=pagina.skip, limit=pagina.limit, despues_de=pagina.despues_de,
+        desde=rango.desde, hasta=rango.hasta
+    )
+    return con_siguiente_cursor(response, registros, pagina)
 
 
 # ========================================
@@ -103,27 +378,27 @@ async def historial_por_grupo(
 )
 async def historial_por_tabla(
     nombre_tabla: str,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    response: Response,
+    pagina: PaginaHistorial = Depends(pagina_historial),
+    rango: RangoFechas = Depends(rango_de_fechas),
+    db: Session = Depends(get_db_lectura)
 ):
     """
     Filtra el historial por tabla.
 
     - **nombre_tabla**: Nombre de la tabla (productos o clientes)
+    - **desde** / **hasta**: Rango de fechas de la operación (opcional)
+    - **cursor**: Página siguiente (header X-Siguiente-Cursor de la respuesta anterior)
 
     Returns:
         List[AuditoriaResponse]: Operaciones en la tabla
     """
 
-    historial = db.query(HistorialAuditoria)\
-        .filter(HistorialAuditoria.tabla_afectada == nombre_tabla)\
-        .order_by(HistorialAuditoria.fecha_operacion.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
-
-    return historial
+    registros = await run_in_threadpool(
+        consultar_historial, db, tabla=nombre_tabla, skip=pagina.skip, limit=pagina.limit, despues_de=pagina.despues_de,
+        desde=rango.desde, hasta=rango.hasta
+    )
+    return con_siguiente_cursor(response, registros, pagina)
 
 
 # ========================================
@@ -137,27 +412,27 @@ async def historial_por_tabla(
 )
 async def historial_por_operacion(
     tipo_operacion: str,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    response: Response,
+    pagina: PaginaHistorial = Depends(pagina_historial),
+    rango: RangoFechas = Depends(rango_de_fechas),
+    db: Session = Depends(get_db_lectura)
 ):
     """
     Filtra el historial por tipo de operación.
 
     - **tipo_operacion**: Tipo de operación (CREATE, UPDATE, DELETE)
+    - **desde** / **hasta**: Rango de fechas de la operación (opcional)
+    - **cursor**: Página siguiente (header X-Siguiente-Cursor de la respuesta anterior)
 
     Returns:
         List[AuditoriaResponse]: Operaciones del tipo especificado
     """
 
-    historial = db.query(HistorialAuditoria)\
-        .filter(HistorialAuditoria.operacion == tipo_operacion.upper())\
-        .order_by(HistorialAuditoria.fecha_operacion.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
-
-    return historial
+    registros = await run_in_threadpool(
+        consultar_historial, db, operacion=tipo_operacion.upper(), skip=pagina.skip, limit=pagina.limit, despues_de=pagina.despues_de,
+        desde=rango.desde, hasta=rango.hasta
+    )
+    return con_siguiente_cursor(response, registros, pagina)
 
 
 # ========================================
@@ -172,22 +447,20 @@ async def historial_por_operacion(
 async def historial_de_registro(
     tabla: str,
     id_registro: int,
-    db: Session = Depends(get_db)
+    rango: RangoFechas = Depends(rango_de_fechas),
+    db: Session = Depends(get_db_lectura)
 ):
     """
     Obtiene todo el historial de un registro específico.
 
     - **tabla**: Nombre de la tabla (productos o clientes)
     - **id_registro**: ID del registro
+    - **desde** / **hasta**: Rango de fechas de la operación (opcional)
 
     Returns:
         List[AuditoriaResponse]: Historial completo del registro
     """
 
-    historial = db.query(HistorialAuditoria)\
-        .filter(HistorialAuditoria.tabla_afectada == tabla)\
-        .filter(HistorialAuditoria.id_registro == id_registro)\
-        .order_by(HistorialAuditoria.fecha_operacion.desc())\
-        .all()
-
-    return historial
+    return await run_in_threadpool(
+        consultar_historial, db, tabla=tabla, id_registro=id_registro, desde=rango.desde, hasta=rango.hasta
+    )
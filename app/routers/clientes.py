@@ -6,15 +6,34 @@ Este archivo contiene todos los endpoints relacionados con clientes.
 Similar a productos.py pero para gestionar clientes de la tienda.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
 import json
 
-from ..database import get_db
+from ..database import get_db, get_db_lectura
 from ..models import Cliente, HistorialAuditoria
-from ..schemas import ClienteCreate, ClienteUpdate, ClienteResponse, MensajeResponse
+from ..schemas import (
+    ClienteCreate, ClienteUpdate, ClienteResponse, MensajeResponse, CambiosClienteResponse, LoteClienteResponse,
+    SugerenciaResponse
+)
 from ..config import settings
+from ..grupo import obtener_grupo
+from ..eventos_auditoria import notificar_auditoria
+from ..resumen_auditoria import sumar_al_resumen
+from ..sincronizacion import consultar_cambios
+from ..autocompletar import autocompletar_clientes
+from ..archivo_eliminados import con_archivo, buscar_archivado, existe_archivado, restaurar
+from ..consultas import cliente_por_id, cliente_activo_por_email
+from ..concurrencia import etag_de, parametro_if_match, verificar_if_match, confirmar_version
+from ..idempotencia import (
+    parametro_clave, validar_clave, huella_peticion, respuesta_guardada, guardar_respuesta,
+    insertar_o_repetir, confirmar_o_repetir
+)
+from ..campos import parametro_fields, parsear_campos, opciones_columnas, respuesta_parcial
+from ..lote import parametro_ids, parsear_ids, consultar_lote, respuesta_lote_parcial
+from ..auditoria_compacta import diferencia, es_punto_completo, instantanea
 
 # ========================================
 # CREAR EL ROUTER
@@ -28,6 +47,9 @@ router = APIRouter(
     }
 )
 
+# Campos que se guardan en el historial de auditoría
+CAMPOS_AUDITADOS = ("nombre", "email", "telefono", "direccion", "ciudad", "documento", "activo")
+
 
 # ========================================
 # FUNCIÓN AUXILIAR: REGISTRAR AUDITORÍA
@@ -39,19 +61,25 @@ def registrar_auditoria(
     operacion: str,
     datos_anteriores: dict = None,
     datos_nuevos: dict = None,
-    observaciones: str = None
+    observaciones: str = None,
+    grupo: str = None,
+    completo: bool = False
 ):
     """Registra operaciones en el historial de auditoría"""
     auditoria = HistorialAuditoria(
         tabla_afectada=tabla,
         id_registro=id_registro,
         operacion=operacion,
-        grupo_responsable=settings.GRUPO_ESTUDIANTES,
-        datos_anteriores=json.dumps(datos_anteriores, default=str) if datos_anteriores else None,
-        datos_nuevos=json.dumps(datos_nuevos, default=str) if datos_nuevos else None,
-        observaciones=observaciones
+        grupo_responsable=grupo or settings.GRUPO_ESTUDIANTES,
+        datos_anteriores=json.dumps(datos_anteriores, default=str, separators=(",", ":")) if datos_anteriores else None,
+        datos_nuevos=json.dumps(datos_nuevos, default=str, separators=(",", ":")) if datos_nuevos else None,
+        observaciones=observaciones,
+        completo=completo
     )
     db.add(auditoria)
+    db.flush()  # Obtener el id antes del commit
+    sumar_al_resumen(db, auditoria)  # Conteo por hora de /auditoria/resumen
+    notificar_auditoria(db, auditoria)  # Avisar a los clientes de /auditoria/eventos
     db.commit()
 
 
@@ -67,7 +95,9 @@ def registrar_auditoria(
 )
 async def crear_cliente(
     cliente: ClienteCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    grupo: str = Depends(obtener_grupo),
+    idempotency_key: Optional[str] = parametro_clave()
 ):
     """
     Crea un nuevo cliente.
@@ -78,6 +108,8 @@ async def crear_cliente(
     - **direccion**: Dirección de entrega (opcional)
     - **ciudad**: Ciudad de residencia (opcional)
     - **documento**: Número de documento (opcional, debe ser único)
+    - **Idempotency-Key** (header): Los reintentos con la misma clave
+      reciben la respuesta original sin crear otro cliente
 
     Returns:
         ClienteResponse: Cliente creado con todos sus campos
@@ -86,9 +118,20 @@ async def crear_cliente(
         HTTPException 400: Si el email o documento ya existen
     """
 
+    # Reintento de una creación que ya se hizo: devolver la misma respuesta
+    # (antes de validar el email, que para el reintento ya "existe")
+    clave = validar_clave(idempotency_key)
+    huella = None
+    if clave:
+        huella = huella_peticion("POST /clientes/", cliente.model_dump(mode="json"))
+        guardada = respuesta_guardada(db, grupo, clave, huella)
+        if guardada is not None:
+            return guardada
+
     # Verificar si el email ya existe
+    # (también entre los clientes archivados: su email sigue ocupado)
     cliente_existente = db.query(Cliente).filter(Cliente.email == cliente.email).first()
-    if cliente_existente:
+    if cliente_existente or existe_archivado(db, Cliente, "email", cliente.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Ya existe un cliente con el email '{cliente.email}'"
@@ -97,7 +140,7 @@ async def crear_cliente(
     # Verificar si el documento ya existe (si se proporcionó)
     if cliente.documento:
         doc_existente = db.query(Cliente).filter(Cliente.documento == cliente.documento).first()
-        if doc_existente:
+        if doc_existente or existe_archivado(db, Cliente, "documento", cliente.documento):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Ya existe un cliente con el documento '{cliente.documento}'"
@@ -107,11 +150,26 @@ async def crear_cliente(
     cliente_dict = cliente.model_dump()
     db_cliente = Cliente(
         **cliente_dict,
-        grupo_creador=settings.GRUPO_ESTUDIANTES
+        grupo_creador=grupo
     )
 
     db.add(db_cliente)
-    db.commit()
+
+    # Guardar la respuesta de esta clave en la misma transacción
+    if clave:
+        # Un reintento simultáneo choca aquí con el email del primer intento
+        repetida = insertar_o_repetir(db, grupo, clave, huella)
+        if repetida is not None:
+            return repetida
+        db.refresh(db_cliente)
+        guardar_respuesta(
+            db, grupo, clave, huella, status.HTTP_201_CREATED,
+            ClienteResponse.model_validate(db_cliente).model_dump_json()
+        )
+
+    repetida = confirmar_o_repetir(db, grupo, clave, huella)
+    if repetida is not None:
+        return repetida
     db.refresh(db_cliente)
 
     # Registrar en auditoría
@@ -120,10 +178,15 @@ async def crear_cliente(
         tabla="clientes",
         id_registro=db_cliente.id,
         operacion="CREATE",
-        datos_nuevos=cliente_dict,
-        observaciones=f"Cliente '{db_cliente.nombre}' creado por {settings.GRUPO_ESTUDIANTES}"
+        datos_nuevos=instantanea(db_cliente, CAMPOS_AUDITADOS),
+        observaciones=f"Cliente '{db_cliente.nombre}' creado por {grupo}",
+        grupo=grupo,
+        completo=True
     )
 
+    # Actualizar el índice de /clientes/autocompletar
+    autocompletar_clientes.aplicar_cambio(db_cliente)
+
     return db_cliente
 
 
@@ -141,7 +204,8 @@ async def listar_clientes(
     limit: int = 100,
     incluir_inactivos: bool = False,
     ciudad: str = None,
-    db: Session = Depends(get_db)
+    fields: Optional[str] = parametro_fields(),
+    db: Session = Depends(get_db_lectura)
 ):
     """
     Lista clientes con opciones de filtrado y paginación.
@@ -150,25 +214,144 @@ async def listar_clientes(
     - **limit**: Máximo de clientes a devolver
     - **incluir_inactivos**: Si es True, incluye clientes inactivos
     - **ciudad**: Filtrar por ciudad específica
+    - **fields**: Campos a devolver (ej: nombre,email,ciudad)
 
     Returns:
         List[ClienteResponse]: Lista de clientes
     """
 
-    query = db.query(Cliente)
+    campos = parsear_campos(fields, ClienteResponse)
+
+    # Con inactivos se leen también los clientes archivados (UNION ALL)
+    modelo = con_archivo(Cliente) if incluir_inactivos else Cliente
+
+    query = db.query(modelo)
+
+    if campos:
+        query = query.options(opciones_columnas(modelo, campos))
 
     if not incluir_inactivos:
-        query = query.filter(Cliente.activo == True)
+        query = query.filter(modelo.activo == True)
 
     if ciudad:
-        query = query.filter(Cliente.ciudad == ciudad)
+        query = query.filter(modelo.ciudad == ciudad)
 
-    query = query.order_by(Cliente.fecha_creacion.desc())
+    query = query.order_by(modelo.fecha_creacion.desc())
     clientes = query.offset(skip).limit(limit).all()
 
+    if campos:
+        return respuesta_parcial(clientes, ClienteResponse, campos)
+
     return clientes
 
 
+# ========================================
+# ENDPOINT: CAMBIOS DESDE UN CURSOR
+# ========================================
+@router.get(
+    "/cambios",
+    response_model=CambiosClienteResponse,
+    summary="Sincronización incremental de clientes",
+    description="Devuelve solo los clientes creados, actualizados o eliminados después del cursor 'since'."
+)
+async def cambios_clientes(
+    since: Optional[str] = Query(None, description="Cursor devuelto por la consulta anterior (vacío = desde el principio)"),
+    limit: int = Query(500, ge=1, le=5000, description="Máximo de cambios por página"),
+    db: Session = Depends(get_db)
+):
+    """
+    Sincronización incremental: solo lo que cambió desde la última vez.
+
+    - **since**: Valor 'cursor' de la respuesta anterior
+    - **limit**: Máximo de cambios a devolver
+
+    Los clientes eliminados (activo = False) se devuelven en 'eliminados'
+    solo con su id. Si 'hay_mas' es True, se debe volver a consultar
+    de inmediato con el nuevo cursor.
+
+    Se lee del servidor principal: en una réplica atrasada el cursor
+    podría avanzar sobre cambios que todavía no han llegado.
+
+    Returns:
+        CambiosClienteResponse: Cambios y cursor siguiente
+    """
+
+    actualizados, eliminados, cursor, hay_mas = consultar_cambios(db, con_archivo(Cliente), since, limit)
+
+    return CambiosClienteResponse(
+        actualizados=actualizados,
+        eliminados=eliminados,
+        cursor=cursor,
+        hay_mas=hay_mas
+    )
+
+
+# ========================================
+# ENDPOINT: AUTOCOMPLETAR NOMBRES
+# ========================================
+@router.get(
+    "/autocompletar",
+    response_model=List[SugerenciaResponse],
+    summary="Sugerencias de nombres mientras se escribe",
+    description="Busca clientes cuyo nombre tenga palabras que empiecen por el texto, sin importar tildes ni mayúsculas."
+)
+async def sugerir_nombres_clientes(
+    query: str = Query(..., min_length=2, max_length=100, description="Texto escrito hasta ahora (ej: gonz)"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db_lectura)
+):
+    """
+    Sugerencias para un campo de autocompletar.
+
+    - **query**: Lo que el usuario lleva escrito
+    - **limit**: Máximo de sugerencias
+
+    Se resuelve con un índice en memoria (ver app/autocompletar.py):
+    normalmente no consulta la base de datos.
+
+    Returns:
+        List[SugerenciaResponse]: [{"id", "nombre"}]
+    """
+    # Cargar el índice o traer cambios consulta la base de datos: en el pool de hilos
+    if autocompletar_clientes.debe_sincronizar():
+        await run_in_threadpool(autocompletar_clientes.sincronizar, db)
+    return autocompletar_clientes.buscar(query, limit)
+
+
+# ========================================
+# ENDPOINT: VARIOS CLIENTES POR ID (LOTE)
+# ========================================
+@router.get(
+    "/lote",
+    response_model=LoteClienteResponse,
+    summary="Obtener varios clientes por ID",
+    description="Obtiene varios clientes en una sola petición (ej: ?ids=15,3,27). "
+                "Conserva el orden pedido e indica los ids que no existen."
+)
+async def obtener_clientes_lote(
+    ids: str = parametro_ids(),
+    fields: Optional[str] = parametro_fields(),
+    db: Session = Depends(get_db_lectura)
+):
+    """
+    Reemplaza muchas llamadas a GET /clientes/{id} por una sola consulta.
+
+    - **ids**: IDs separados por coma (máximo 100)
+    - **fields**: Campos a devolver (ej: nombre,precio)
+
+    Returns:
+        LoteClienteResponse: {"encontrados": [...], "faltantes": [ids]}
+    """
+
+    campos = parsear_campos(fields, ClienteResponse)
+    encontrados, faltantes = consultar_lote(db, Cliente, parsear_ids(ids), campos)
+
+    if campos:
+        return respuesta_lote_parcial(encontrados, faltantes, ClienteResponse, campos)
+
+    return LoteClienteResponse(encontrados=encontrados, faltantes=faltantes)
+
+
 # ========================================
 # ENDPOINT: OBTENER CLIENTE POR ID
 # ========================================
@@ -180,12 +363,15 @@ async def listar_clientes(
 )
 async def obtener_cliente(
     cliente_id: int,
-    db: Session = Depends(get_db)
+    response: Response,
+    fields: Optional[str] = parametro_fields(),
+    db: Session = Depends(get_db_lectura)
 ):
     """
     Obtiene un cliente por su ID.
 
     - **cliente_id**: ID del cliente a buscar
+    - **fields**: Campos a devolver (ej: nombre,email,ciudad)
 
     Returns:
         ClienteResponse: Datos del cliente
@@ -194,7 +380,20 @@ async def obtener_cliente(
         HTTPException 404: Si el cliente no existe
     """
 
-    cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
+    campos = parsear_campos(fields, ClienteResponse)
+
+    # Sin ?fields=, con la consulta en caché
+    if campos:
+        cliente = db.query(Cliente)\
+            .options(opciones_columnas(Cliente, campos))\
+            .filter(Cliente.id == cliente_id)\
+            .first()
+    else:
+        cliente = cliente_por_id(db, cliente_id)
+
+    # Eliminado hace tiempo: se movió al archivo
+    if not cliente:
+        cliente = buscar_archivado(db, Cliente, cliente_id, campos)
 
     if not cliente:
         raise HTTPException(
@@ -202,6 +401,11 @@ async def obtener_cliente(
             detail=f"Cliente con ID {cliente_id} no encontrado"
         )
 
+    if campos:
+        return respuesta_parcial(cliente, ClienteResponse, campos)
+
+    # La versión en el ETag, para enviarla luego en If-Match
+    response.headers["ETag"] = etag_de(cliente.version)
     return cliente
 
 
@@ -217,23 +421,33 @@ async def obtener_cliente(
 async def actualizar_cliente(
     cliente_id: int,
     cliente_actualizado: ClienteUpdate,
-    db: Session = Depends(get_db)
+    response: Response,
+    db: Session = Depends(get_db),
+    grupo: str = Depends(obtener_grupo),
+    if_match: Optional[str] = parametro_if_match()
 ):
     """
     Actualiza un cliente existente.
 
     - **cliente_id**: ID del cliente a actualizar
     - Campos opcionales: nombre, email, telefono, direccion, ciudad, documento, activo
+    - **If-Match** (header): Versión leída; si otro grupo guardó antes, responde 412
 
     Returns:
-        ClienteResponse: Cliente actualizado
+        ClienteResponse: Cliente actualizado (header ETag con la nueva versión)
 
     Raises:
         HTTPException 404: Si el cliente no existe
         HTTPException 400: Si el email o documento ya existen
+        HTTPException 412: Si el cliente cambió desde que se leyó
     """
 
-    cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
+    cliente = cliente_por_id(db, cliente_id)
+
+    # Eliminado hace tiempo: vuelve del archivo a la tabla principal
+    # (si la petición falla, el rollback lo deja archivado)
+    if not cliente and restaurar(db, Cliente, cliente_id):
+        cliente = cliente_por_id(db, cliente_id)
 
     if not cliente:
         raise HTTPException(
@@ -241,12 +455,14 @@ async def actualizar_cliente(
             detail=f"Cliente con ID {cliente_id} no encontrado"
         )
 
+    verificar_if_match(if_match, cliente.version, f"El cliente {cliente_id}")
+
     # Verificar email único si se va a actualizar
     update_data = cliente_actualizado.model_dump(exclude_unset=True)
 
     if "email" in update_data and update_data["email"] != cliente.email:
         email_existente = db.query(Cliente).filter(Cliente.email == update_data["email"]).first()
-        if email_existente:
+        if email_existente or existe_archivado(db, Cliente, "email", update_data["email"]):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Ya existe un cliente con el email '{update_data['email']}'"
@@ -256,43 +472,45 @@ async def actualizar_cliente(
     if "documento" in update_data and update_data["documento"] != cliente.documento:
         if update_data["documento"]:  # Solo si no es None
             doc_existente = db.query(Cliente).filter(Cliente.documento == update_data["documento"]).first()
-            if doc_existente:
+            if doc_existente or existe_archivado(db, Cliente, "documento", update_data["documento"]):
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"Ya existe un cliente con el documento '{update_data['documento']}'"
                 )
 
     # Guardar datos anteriores
-    datos_anteriores = {
-        "nombre": cliente.nombre,
-        "email": cliente.email,
-        "telefono": cliente.telefono,
-        "direccion": cliente.direccion,
-        "ciudad": cliente.ciudad,
-        "documento": cliente.documento,
-        "activo": cliente.activo
-    }
+    antes = instantanea(cliente, CAMPOS_AUDITADOS)
 
     # Actualizar campos
     for campo, valor in update_data.items():
         setattr(cliente, campo, valor)
 
-    cliente.grupo_ultima_modificacion = settings.GRUPO_ESTUDIANTES
+    cliente.grupo_ultima_modificacion = grupo
 
-    db.commit()
+    # UPDATE ... WHERE id = ? AND version = ?
+    confirmar_version(db, f"El cliente {cliente_id}")
     db.refresh(cliente)
 
-    # Registrar en auditoría
+    # Registrar en auditoría solo los campos que realmente cambiaron
+    # (y todos los anteriores si esta versión es un punto completo)
+    datos_anteriores, datos_nuevos = diferencia(antes, instantanea(cliente, CAMPOS_AUDITADOS))
+    completo = es_punto_completo("UPDATE", cliente.version)
     registrar_auditoria(
         db=db,
         tabla="clientes",
         id_registro=cliente.id,
         operacion="UPDATE",
-        datos_anteriores=datos_anteriores,
-        datos_nuevos=update_data,
-        observaciones=f"Cliente '{cliente.nombre}' actualizado por {settings.GRUPO_ESTUDIANTES}"
+        datos_anteriores=antes if completo else datos_anteriores,
+        datos_nuevos=datos_nuevos,
+        observaciones=f"Cliente '{cliente.nombre}' actualizado por {grupo}",
+        grupo=grupo,
+        completo=completo
     )
 
+    # Actualizar el índice de /clientes/autocompletar
+    autocompletar_clientes.aplicar_cambio(cliente)
+
+    response.headers["ETag"] = etag_de(cliente.version)
     return cliente
 
 
@@ -307,12 +525,15 @@ async def actualizar_cliente(
 )
 async def eliminar_cliente(
     cliente_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    grupo: str = Depends(obtener_grupo),
+    if_match: Optional[str] = parametro_if_match()
 ):
     """
     Elimina un cliente de forma lógica.
 
     - **cliente_id**: ID del cliente a eliminar
+    - **If-Match** (header): Versión leída; si otro grupo guardó antes, responde 412
 
     Returns:
         MensajeResponse: Confirmación de eliminación
@@ -320,9 +541,15 @@ async def eliminar_cliente(
     Raises:
         HTTPException 404: Si el cliente no existe
         HTTPException 400: Si el cliente ya está inactivo
+        HTTPException 412: Si el cliente cambió desde que se leyó
     """
 
-    cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
+    cliente = cliente_por_id(db, cliente_id)
+
+    # Eliminado hace tiempo: vuelve del archivo a la tabla principal
+    # (si la petición falla, el rollback lo deja archivado)
+    if not cliente and restaurar(db, Cliente, cliente_id):
+        cliente = cliente_por_id(db, cliente_id)
 
     if not cliente:
         raise HTTPException(
@@ -330,32 +557,34 @@ async def eliminar_cliente(
             detail=f"Cliente con ID {cliente_id} no encontrado"
         )
 
+    verificar_if_match(if_match, cliente.version, f"El cliente {cliente_id}")
+
     if not cliente.activo:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"El cliente '{cliente.nombre}' ya está inactivo"
         )
 
-    datos_anteriores = {
-        "nombre": cliente.nombre,
-        "activo": cliente.activo
-    }
-
     cliente.activo = False
-    cliente.grupo_ultima_modificacion = settings.GRUPO_ESTUDIANTES
+    cliente.grupo_ultima_modificacion = grupo
 
-    db.commit()
+    confirmar_version(db, f"El cliente {cliente_id}")
 
     registrar_auditoria(
         db=db,
         tabla="clientes",
         id_registro=cliente.id,
         operacion="DELETE",
-        datos_anteriores=datos_anteriores,
+        datos_anteriores=dict(instantanea(cliente, CAMPOS_AUDITADOS), activo=True),
         datos_nuevos={"activo": False},
-        observaciones=f"Cliente '{cliente.nombre}' eliminado (lógicamente) por {settings.GRUPO_ESTUDIANTES}"
+        observaciones=f"Cliente '{cliente.nombre}' eliminado (lógicamente) por {grupo}",
+        grupo=grupo,
+        completo=True
     )
 
+    # Quitar el cliente del índice de /clientes/autocompletar
+    autocompletar_clientes.aplicar_cambio(cliente)
+
     return MensajeResponse(
         mensaje=f"Cliente '{cliente.nombre}' eliminado correctamente",
         detalle="Eliminación lógica: el cliente está marcado como inactivo"
@@ -373,12 +602,14 @@ async def eliminar_cliente(
 )
 async def buscar_clientes_por_nombre(
     query: str,
-    db: Session = Depends(get_db)
+    fields: Optional[str] = parametro_fields(),
+    db: Session = Depends(get_db_lectura)
 ):
     """
     Busca clientes por nombre.
 
     - **query**: Texto a buscar en el nombre
+    - **fields**: Campos a devolver (ej: nombre,email,ciudad)
 
     Returns:
         List[ClienteResponse]: Clientes que coinciden
@@ -390,10 +621,21 @@ async def buscar_clientes_por_nombre(
             detail="La búsqueda debe tener al menos 2 caracteres"
         )
 
-    clientes = db.query(Cliente)\
+    campos = parsear_campos(fields, ClienteResponse)
+
+    consulta = db.query(Cliente)
+    if campos:
+        consulta = consulta.options(opciones_columnas(Cliente, campos))
+
+    consulta = consulta\
         .filter(Cliente.activo == True)\
-        .filter(Cliente.nombre.ilike(f"%{query}%"))\
-        .all()
+        .filter(Cliente.nombre.ilike(f"%{query}%"))
+
+    # En un hilo aparte: si el cliente se desconecta, la consulta se cancela
+    clientes = await run_in_threadpool(consulta.all)
+
+    if campos:
+        return respuesta_parcial(clientes, ClienteResponse, campos)
 
     return clientes
 
@@ -409,12 +651,14 @@ async def buscar_clientes_por_nombre(
 )
 async def buscar_cliente_por_email(
     email: str,
-    db: Session = Depends(get_db)
+    fields: Optional[str] = parametro_fields(),
+    db: Session = Depends(get_db_lectura)
 ):
     """
     Busca un cliente por email.
 
     - **email**: Email del cliente a buscar
+    - **fields**: Campos a devolver (ej: nombre,email,ciudad)
 
     Returns:
         ClienteResponse: Cliente encontrado
@@ -423,10 +667,17 @@ async def buscar_cliente_por_email(
         HTTPException 404: Si no se encuentra el cliente
     """
 
-    cliente = db.query(Cliente)\
-        .filter(Cliente.email == email)\
-        .filter(Cliente.activo == True)\
-        .first()
+    campos = parsear_campos(fields, ClienteResponse)
+
+    # Sin ?fields=, con la consulta en caché
+    if campos:
+        cliente = db.query(Cliente)\
+            .options(opciones_columnas(Cliente, campos))\
+            .filter(Cliente.email == email)\
+            .filter(Cliente.activo == True)\
+            .first()
+    else:
+        cliente = cliente_activo_por_email(db, email)
 
     if not cliente:
         raise HTTPException(
@@ -434,4 +685,7 @@ async def buscar_cliente_por_email(
             detail=f"No se encontró un cliente con el email '{email}'"
         )
 
+    if campos:
+        return respuesta_parcial(cliente, ClienteResponse, campos)
+
     return cliente
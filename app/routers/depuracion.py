@@ -0,0 +1,95 @@
+"""
+========================================
+ROUTER DE DEPURACIÓN
+========================================
+Herramientas para diagnosticar un worker en producción.
+
+Desactivado por defecto: solo responde si PERFIL_HABILITADO=true y
+PERFIL_TOKEN tiene un valor; cada petición debe enviar ese token en
+el header X-Perfil-Token. En cualquier otro caso responde 404, como si
+la ruta no existiera. No aparece en /docs.
+"""
+
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+
+from ..config import settings
+from ..perfilador import PerfilEnCurso, formato_collapsed, perfilador
+
+router = APIRouter(
+    prefix="/debug",
+    tags=["Depuración"],
+    include_in_schema=False
+)
+
+
+def verificar_acceso(x_perfil_token: Optional[str] = Header(None)) -> None:
+    """
+    Permite el acceso solo con el perfilador habilitado y el token correcto.
+
+    Raises:
+        HTTPException 404: Si está deshabilitado (no se revela que existe)
+        HTTPException 403: Si el token falta o no coincide
+    """
+    if not settings.PERFIL_HABILITADO or not settings.PERFIL_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    # compare_digest: el tiempo de respuesta no revela cuántos caracteres coinciden
+    if x_perfil_token is None or not hmac.compare_digest(x_perfil_token.encode(), settings.PERFIL_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Token de perfil inválido")
+
+
+# ========================================
+# ENDPOINT: PERFIL DE CPU
+# ========================================
+@router.get(
+    "/profile",
+    response_class=PlainTextResponse,
+    summary="Perfil de CPU de este worker (formato collapsed para flamegraph)",
+    dependencies=[Depends(verificar_acceso)]
+)
+async def perfil_cpu(
+    seconds: float = Query(10, gt=0, description="Duración del muestreo"),
+    hz: Optional[int] = Query(None, ge=1, le=1000, description="Muestras por segundo (por defecto PERFIL_FRECUENCIA_HZ)"),
+    incluir_espera: bool = Query(False, description="Incluir hilos esperando (pool ocioso, event loop sin trabajo)")
+):
+    """
+    Muestrea las pilas de este worker durante 'seconds' segundos.
+
+    El worker sigue atendiendo peticiones mientras tanto: eso es lo que
+    se mide. Con varios workers (servidor.py), cada petición perfila
+    solo al worker que la recibió (header X-Perfil-Pid).
+
+    Uso:
+        curl -H "X-Perfil-Token: ..." "http://api/debug/profile?seconds=30" > perfil.txt
+        flamegraph.pl perfil.txt > perfil.svg    (o abrir perfil.txt en speedscope.app)
+
+    Raises:
+        HTTPException 400: Si 'seconds' supera PERFIL_MAX_SEGUNDOS
+        HTTPException 409: Si ya hay un perfil en curso en este worker
+    """
+    if seconds > settings.PERFIL_MAX_SEGUNDOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"'seconds' no puede ser mayor que {settings.PERFIL_MAX_SEGUNDOS}"
+        )
+
+    frecuencia = hz or settings.PERFIL_FRECUENCIA_HZ
+    try:
+        conteos, muestras = await run_in_threadpool(perfilador.muestrear, seconds, frecuencia, incluir_espera)
+    except PerfilEnCurso as error:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(error))
+
+    return PlainTextResponse(
+        formato_collapsed(conteos),
+        headers={
+            "X-Perfil-Muestras": str(muestras),
+            "X-Perfil-Hz": str(frecuencia),
+            "X-Perfil-Pid": str(os.getpid()),
+            "Cache-Control": "no-store",
+        }
+    )
@@ -6,16 +6,39 @@ Este archivo contiene todos los endpoints relacionados con productos.
 Cada función es un endpoint de la API.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
 import json
 from datetime import datetime
+from decimal import Decimal
 
-from ..database import get_db
+from ..database import get_db, get_db_lectura
 from ..models import Producto, HistorialAuditoria
-from ..schemas import ProductoCreate, ProductoUpdate, ProductoResponse, MensajeResponse
+from ..schemas import (
+    ProductoCreate, ProductoUpdate, ProductoResponse, MensajeResponse, CambiosProductoResponse, LoteProductoResponse,
+    SugerenciaResponse, BusquedaFacetadaResponse
+)
 from ..config import settings
+from ..grupo import obtener_grupo
+from ..eventos_auditoria import notificar_auditoria
+from ..resumen_auditoria import sumar_al_resumen
+from ..sincronizacion import consultar_cambios
+from ..catalogo import catalogo
+from ..autocompletar import autocompletar_productos
+from ..middleware.compresion import elegir_codificacion
+from ..campos import parametro_fields, parsear_campos, opciones_columnas, respuesta_parcial
+from ..lote import parametro_ids, parsear_ids, consultar_lote, respuesta_lote_parcial
+from ..paginacion import HEADER_SIGUIENTE_CURSOR, aplicar_orden_y_cursor, siguiente_cursor, validar_orden
+from ..auditoria_compacta import diferencia, es_punto_completo, instantanea
+from ..busqueda import buscar_con_facetas
+from ..archivo_eliminados import con_archivo, buscar_archivado, restaurar
+from ..consultas import producto_por_id
+from ..concurrencia import etag_de, parametro_if_match, verificar_if_match, confirmar_version
+from ..idempotencia import (
+    parametro_clave, validar_clave, huella_peticion, respuesta_guardada, guardar_respuesta, confirmar_o_repetir
+)
 
 # ========================================
 # CREAR EL ROUTER
@@ -33,6 +56,9 @@ router = APIRouter(
     }
 )
 
+# Campos que se guardan en el historial de auditoría
+CAMPOS_AUDITADOS = ("nombre", "descripcion", "precio", "stock", "categoria", "imagen_url", "activo")
+
 
 # ========================================
 # FUNCIÓN AUXILIAR: REGISTRAR AUDITORÍA
@@ -44,7 +70,9 @@ def registrar_auditoria(
     operacion: str,
     datos_anteriores: dict = None,
     datos_nuevos: dict = None,
-    observaciones: str = None
+    observaciones: str = None,
+    grupo: str = None,
+    completo: bool = False
 ):
     """
     Registra una operación en el historial de auditoría.
@@ -54,20 +82,28 @@ def registrar_auditoria(
         tabla: Nombre de la tabla afectada
         id_registro: ID del registro afectado
         operacion: Tipo de operación (CREATE, UPDATE, DELETE)
-        datos_anteriores: Datos antes de la modificación (dict)
-        datos_nuevos: Datos nuevos (dict)
+        datos_anteriores: Valores anteriores de los campos que cambiaron (dict)
+        datos_nuevos: Valores nuevos de los campos que cambiaron (dict);
+            en CREATE, el registro completo
         observaciones: Comentarios adicionales
+        grupo: Grupo responsable (por defecto GRUPO_ESTUDIANTES)
+        completo: La fila guarda el estado completo (CREATE, DELETE y
+            puntos completos de UPDATE, ver app/auditoria_compacta.py)
     """
     auditoria = HistorialAuditoria(
         tabla_afectada=tabla,
         id_registro=id_registro,
         operacion=operacion,
-        grupo_responsable=settings.GRUPO_ESTUDIANTES,
-        datos_anteriores=json.dumps(datos_anteriores, default=str) if datos_anteriores else None,
-        datos_nuevos=json.dumps(datos_nuevos, default=str) if datos_nuevos else None,
-        observaciones=observaciones
+        grupo_responsable=grupo or settings.GRUPO_ESTUDIANTES,
+        datos_anteriores=json.dumps(datos_anteriores, default=str, separators=(",", ":")) if datos_anteriores else None,
+        datos_nuevos=json.dumps(datos_nuevos, default=str, separators=(",", ":")) if datos_nuevos else None,
+        observaciones=observaciones,
+        completo=completo
     )
     db.add(auditoria)
+    db.flush()  # Obtener el id antes del commit
+    sumar_al_resumen(db, auditoria)  # Conteo por hora de /auditoria/resumen
+    notificar_auditoria(db, auditoria)  # Avisar a los clientes de /auditoria/eventos
     db.commit()
 
 
@@ -83,7 +119,9 @@ def registrar_auditoria(
 )
 async def crear_producto(
     producto: ProductoCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    grupo: str = Depends(obtener_grupo),
+    idempotency_key: Optional[str] = parametro_clave()
 ):
     """
     Crea un nuevo producto.
@@ -94,25 +132,47 @@ async def crear_producto(
     - **stock**: Cantidad en inventario (opcional, por defecto 0)
     - **categoria**: Categoría del producto (opcional)
     - **imagen_url**: URL de la imagen (opcional)
+    - **Idempotency-Key** (header): Los reintentos con la misma clave
+      reciben la respuesta original sin crear otro producto
 
     Returns:
         ProductoResponse: Producto creado con todos sus campos
     """
 
+    # Reintento de una creación que ya se hizo: devolver la misma respuesta
+    clave = validar_clave(idempotency_key)
+    huella = None
+    if clave:
+        huella = huella_peticion("POST /productos/", producto.model_dump(mode="json"))
+        guardada = respuesta_guardada(db, grupo, clave, huella)
+        if guardada is not None:
+            return guardada
+
     # Convertir el schema de Pydantic a un diccionario
     producto_dict = producto.model_dump()
 
     # Crear el objeto del modelo de SQLAlchemy
     db_producto = Producto(
         **producto_dict,  # Desempaquetar el diccionario
-        grupo_creador=settings.GRUPO_ESTUDIANTES  # Registrar el grupo creador
+        grupo_creador=grupo  # Registrar el grupo creador
     )
 
     # Agregar a la sesión de base de datos
     db.add(db_producto)
 
+    # Guardar la respuesta de esta clave en la misma transacción
+    if clave:
+        db.flush()
+        db.refresh(db_producto)
+        guardar_respuesta(
+            db, grupo, clave, huella, status.HTTP_201_CREATED,
+            ProductoResponse.model_validate(db_producto).model_dump_json()
+        )
+
     # Guardar en la base de datos
-    db.commit()
+    repetida = confirmar_o_repetir(db, grupo, clave, huella)
+    if repetida is not None:
+        return repetida
 
     # Refrescar para obtener los campos generados automáticamente (id, fecha_creacion, etc.)
     db.refresh(db_producto)
@@ -123,16 +183,32 @@ async def crear_producto(
         tabla="productos",
         id_registro=db_producto.id,
         operacion="CREATE",
-        datos_nuevos=producto_dict,
-        observaciones=f"Producto '{db_producto.nombre}' creado por {settings.GRUPO_ESTUDIANTES}"
+        datos_nuevos=instantanea(db_producto, CAMPOS_AUDITADOS),
+        observaciones=f"Producto '{db_producto.nombre}' creado por {grupo}",
+        grupo=grupo,
+        completo=True
     )
 
+    # Actualizar el snapshot de /productos/catalogo (en segundo plano) y el autocompletar
+    catalogo.avisar_cambio()
+    autocompletar_productos.aplicar_cambio(db_producto)
+
     return db_producto
 
 
 # ========================================
 # ENDPOINT: LISTAR PRODUCTOS
 # ========================================
+# Órdenes permitidos: nombre -> (columna, descendente)
+ORDENES_PRODUCTOS = {
+    "recientes": ("fecha_creacion", True),
+    "precio_asc": ("precio", False),
+    "precio_desc": ("precio", True),
+    "nombre": ("nombre", False),
+    "stock": ("stock", True),
+}
+
+
 @router.get(
     "/",
     response_model=List[ProductoResponse],
@@ -140,44 +216,255 @@ async def crear_producto(
     description="Obtiene la lista de todos los productos. Por defecto solo muestra productos activos."
 )
 async def listar_productos(
+    response: Response,
     skip: int = 0,          # Número de registros a saltar (paginación)
     limit: int = 100,       # Máximo de registros a devolver
     incluir_inactivos: bool = False,  # Si True, incluye productos eliminados lógicamente
     categoria: str = None,  # Filtrar por categoría
-    db: Session = Depends(get_db)
+    precio_min: Optional[Decimal] = Query(None, ge=0, description="Precio mínimo (incluido)"),
+    precio_max: Optional[Decimal] = Query(None, ge=0, description="Precio máximo (incluido)"),
+    en_stock: Optional[bool] = Query(None, description="true = solo con stock, false = solo agotados"),
+    orden: str = Query("recientes", description=f"Orden: {', '.join(ORDENES_PRODUCTOS)}"),
+    cursor: Optional[str] = Query(None, description="Continuar después de la página anterior (header X-Siguiente-Cursor)"),
+    fields: Optional[str] = parametro_fields(),  # Campos a devolver
+    db: Session = Depends(get_db_lectura)
 ):
     """
-    Lista productos con opciones de filtrado y paginación.
+    Lista productos con opciones de filtrado, orden y paginación.
 
     - **skip**: Número de productos a saltar (para paginación)
     - **limit**: Máximo de productos a devolver
     - **incluir_inactivos**: Si es True, incluye productos eliminados
     - **categoria**: Filtrar por categoría específica
+    - **precio_min** / **precio_max**: Rango de precio
+    - **en_stock**: Solo productos con (o sin) unidades disponibles
+    - **orden**: recientes, precio_asc, precio_desc, nombre o stock
+    - **cursor**: Página siguiente (más rápido que skip en listados largos)
+    - **fields**: Campos a devolver (ej: nombre,precio,stock)
+
+    El header X-Siguiente-Cursor de la respuesta trae el cursor de la
+    página siguiente (no viene si ya no hay más productos).
 
     Returns:
         List[ProductoResponse]: Lista de productos
     """
 
+    campos = parsear_campos(fields, ProductoResponse)
+    criterio = validar_orden(orden, ORDENES_PRODUCTOS)
+
+    if precio_min is not None and precio_max is not None and precio_min > precio_max:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'precio_min' no puede ser mayor que 'precio_max'"
+        )
+    if cursor and skip:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Usa 'cursor' o 'skip', no ambos"
+        )
+
+    # Con inactivos se leen también los productos archivados (UNION ALL)
+    modelo = con_archivo(Producto) if incluir_inactivos else Producto
+
     # Crear la consulta base
-    query = db.query(Producto)
+    query = db.query(modelo)
+
+    # Leer solo las columnas pedidas (más la del orden, para el cursor).
+    # Siempre en el mismo orden: el mismo ?fields= reutiliza el SQL compilado
+    if campos:
+        columnas = campos + ((criterio[0],) if criterio[0] not in campos else ())
+        query = query.options(opciones_columnas(modelo, columnas))
 
     # Filtrar por activos/inactivos
     if not incluir_inactivos:
-        query = query.filter(Producto.activo == True)
+        query = query.filter(modelo.activo == True)
 
     # Filtrar por categoría si se especifica
     if categoria:
-        query = query.filter(Producto.categoria == categoria)
+        query = query.filter(modelo.categoria == categoria)
+
+    # Filtrar por rango de precio y disponibilidad
+    if precio_min is not None:
+        query = query.filter(modelo.precio >= precio_min)
+    if precio_max is not None:
+        query = query.filter(modelo.precio <= precio_max)
+    if en_stock is True:
+        query = query.filter(modelo.stock > 0)
+    elif en_stock is False:
+        query = query.filter(modelo.stock == 0)
 
-    # Ordenar por fecha de creación (más recientes primero)
-    query = query.order_by(Producto.fecha_creacion.desc())
+    # Ordenar (por defecto, más recientes primero) y continuar después del cursor
+    query = aplicar_orden_y_cursor(query, modelo, orden, criterio, cursor)
 
     # Aplicar paginación y ejecutar consulta
     productos = query.offset(skip).limit(limit).all()
 
+    siguiente = siguiente_cursor(productos, limit, orden, criterio)
+
+    if campos:
+        respuesta = respuesta_parcial(productos, ProductoResponse, campos)
+        if siguiente:
+            respuesta.headers[HEADER_SIGUIENTE_CURSOR] = siguiente
+        return respuesta
+
+    if siguiente:
+        response.headers[HEADER_SIGUIENTE_CURSOR] = siguiente
     return productos
 
 
+# ========================================
+# ENDPOINT: CATÁLOGO COMPLETO (SNAPSHOT)
+# ========================================
+@router.get(
+    "/catalogo",
+    summary="Catálogo público completo",
+    description="Todos los productos activos agrupados por categoría. "
+                "Se sirve desde una copia en memoria, sin consultar la base de datos."
+)
+async def catalogo_completo(
+    accept_encoding: str = Header("", include_in_schema=False),
+    if_none_match: Optional[str] = Header(None, include_in_schema=False)
+):
+    """
+    Devuelve el catálogo completo ya serializado y comprimido.
+
+    La copia se actualiza en segundo plano cada vez que se crea,
+    actualiza o elimina un producto, y trae los cambios hechos fuera de
+    este servidor cada CATALOGO_VERIFICAR_SEGUNDOS.
+
+    Returns:
+        JSON: {"generado", "total", "categorias": [{"categoria", "productos"}]}
+    """
+
+    codificacion = elegir_codificacion(accept_encoding) or "identity"
+
+    # Cada tanto, una consulta (en el pool de hilos) pone la foto al día
+    if catalogo.debe_verificar():
+        await run_in_threadpool(catalogo.verificar)
+    cuerpo, codificacion, etag = catalogo.obtener(codificacion)
+    if codificacion != "identity":
+        # Otros bytes que la versión sin comprimir: el ETag no puede ser fuerte
+        etag = "W/" + etag
+
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+
+    # El cliente ya tiene esta versión: no se reenvía el cuerpo
+    if if_none_match == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if codificacion != "identity":
+        headers["Content-Encoding"] = codificacion
+
+    return Response(content=cuerpo, media_type="application/json", headers=headers)
+
+
+# ========================================
+# ENDPOINT: CAMBIOS DESDE UN CURSOR
+# ========================================
+@router.get(
+    "/cambios",
+    response_model=CambiosProductoResponse,
+    summary="Sincronización incremental de productos",
+    description="Devuelve solo los productos creados, actualizados o eliminados después del cursor 'since'."
+)
+async def cambios_productos(
+    since: Optional[str] = Query(None, description="Cursor devuelto por la consulta anterior (vacío = desde el principio)"),
+    limit: int = Query(500, ge=1, le=5000, description="Máximo de cambios por página"),
+    db: Session = Depends(get_db)
+):
+    """
+    Sincronización incremental: solo lo que cambió desde la última vez.
+
+    - **since**: Valor 'cursor' de la respuesta anterior
+    - **limit**: Máximo de cambios a devolver
+
+    Los productos eliminados (activo = False) se devuelven en 'eliminados'
+    solo con su id. Si 'hay_mas' es True, se debe volver a consultar
+    de inmediato con el nuevo cursor.
+
+    Se lee del servidor principal: en una réplica atrasada el cursor
+    podría avanzar sobre cambios que todavía no han llegado.
+
+    Returns:
+        CambiosProductoResponse: Cambios y cursor siguiente
+    """
+
+    actualizados, eliminados, cursor, hay_mas = consultar_cambios(db, con_archivo(Producto), since, limit)
+
+    return CambiosProductoResponse(
+        actualizados=actualizados,
+        eliminados=eliminados,
+        cursor=cursor,
+        hay_mas=hay_mas
+    )
+
+
+# ========================================
+# ENDPOINT: AUTOCOMPLETAR NOMBRES
+# ========================================
+@router.get(
+    "/autocompletar",
+    response_model=List[SugerenciaResponse],
+    summary="Sugerencias de nombres mientras se escribe",
+    description="Busca productos cuyo nombre tenga palabras que empiecen por el texto, sin importar tildes ni mayúsculas."
+)
+async def sugerir_nombres_productos(
+    query: str = Query(..., min_length=2, max_length=100, description="Texto escrito hasta ahora (ej: port)"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db_lectura)
+):
+    """
+    Sugerencias para un campo de autocompletar.
+
+    - **query**: Lo que el usuario lleva escrito
+    - **limit**: Máximo de sugerencias
+
+    Se resuelve con un índice en memoria (ver app/autocompletar.py):
+    normalmente no consulta la base de datos.
+
+    Returns:
+        List[SugerenciaResponse]: [{"id", "nombre"}]
+    """
+    # Cargar el índice o traer cambios consulta la base de datos: en el pool de hilos
+    if autocompletar_productos.debe_sincronizar():
+        await run_in_threadpool(autocompletar_productos.sincronizar, db)
+    return autocompletar_productos.buscar(query, limit)
+
+
+# ========================================
+# ENDPOINT: VARIOS PRODUCTOS POR ID (LOTE)
+# ========================================
+@router.get(
+    "/lote",
+    response_model=LoteProductoResponse,
+    summary="Obtener varios productos por ID",
+    description="Obtiene varios productos en una sola petición (ej: ?ids=15,3,27). "
+                "Conserva el orden pedido e indica los ids que no existen."
+)
+async def obtener_productos_lote(
+    ids: str = parametro_ids(),
+    fields: Optional[str] = parametro_fields(),
+    db: Session = Depends(get_db_lectura)
+):
+    """
+    Reemplaza muchas llamadas a GET /productos/{id} por una sola consulta.
+
+    - **ids**: IDs separados por coma (máximo 100)
+    - **fields**: Campos a devolver (ej: nombre,precio)
+
+    Returns:
+        LoteProductoResponse: {"encontrados": [...], "faltantes": [ids]}
+    """
+
+    campos = parsear_campos(fields, ProductoResponse)
+    encontrados, faltantes = consultar_lote(db, Producto, parsear_ids(ids), campos)
+
+    if campos:
+        return respuesta_lote_parcial(encontrados, faltantes, ProductoResponse, campos)
+
+    return LoteProductoResponse(encontrados=encontrados, faltantes=faltantes)
+
+
 # ========================================
 # ENDPOINT: OBTENER PRODUCTO POR ID
 # ========================================
@@ -189,12 +476,15 @@ async def listar_productos(
 )
 async def obtener_producto(
     producto_id: int,
-    db: Session = Depends(get_db)
+    response: Response,
+    fields: Optional[str] = parametro_fields(),
+    db: Session = Depends(get_db_lectura)
 ):
     """
     Obtiene un producto por su ID.
 
     - **producto_id**: ID del producto a buscar
+    - **fields**: Campos a devolver (ej: nombre,precio,stock)
 
     Returns:
         ProductoResponse: Datos del producto
@@ -203,8 +493,20 @@ async def obtener_producto(
         HTTPException 404: Si el producto no existe
     """
 
-    # Buscar el producto en la base de datos
-    producto = db.query(Producto).filter(Producto.id == producto_id).first()
+    campos = parsear_campos(fields, ProductoResponse)
+
+    # Buscar el producto en la base de datos (sin ?fields=, con la consulta en caché)
+    if campos:
+        producto = db.query(Producto)\
+            .options(opciones_columnas(Producto, campos))\
+            .filter(Producto.id == producto_id)\
+            .first()
+    else:
+        producto = producto_por_id(db, producto_id)
+
+    # Eliminado hace tiempo: se movió al archivo
+    if not producto:
+        producto = buscar_archivado(db, Producto, producto_id, campos)
 
     # Si no existe, retornar error 404
     if not producto:
@@ -213,6 +515,11 @@ async def obtener_producto(
             detail=f"Producto con ID {producto_id} no encontrado"
         )
 
+    if campos:
+        return respuesta_parcial(producto, ProductoResponse, campos)
+
+    # La versión en el ETag, para enviarla luego en If-Match
+    response.headers["ETag"] = etag_de(producto.version)
     return producto
 
 
@@ -228,7 +535,10 @@ async def obtener_producto(
 async def actualizar_producto(
     producto_id: int,
     producto_actualizado: ProductoUpdate,
-    db: Session = Depends(get_db)
+    response: Response,
+    db: Session = Depends(get_db),
+    grupo: str = Depends(obtener_grupo),
+    if_match: Optional[str] = parametro_if_match()
 ):
     """
     Actualiza un producto existente.
@@ -238,16 +548,23 @@ async def actualizar_producto(
 
     - **producto_id**: ID del producto a actualizar
     - Campos opcionales: nombre, descripcion, precio, stock, categoria, imagen_url, activo
+    - **If-Match** (header): Versión leída; si otro grupo guardó antes, responde 412
 
     Returns:
-        ProductoResponse: Producto actualizado
+        ProductoResponse: Producto actualizado (header ETag con la nueva versión)
 
     Raises:
         HTTPException 404: Si el producto no existe
+        HTTPException 412: Si el producto cambió desde que se leyó
     """
 
     # Buscar el producto
-    producto = db.query(Producto).filter(Producto.id == producto_id).first()
+    producto = producto_por_id(db, producto_id)
+
+    # Eliminado hace tiempo: vuelve del archivo a la tabla principal
+    # (si la petición falla, el rollback lo deja archivado)
+    if not producto and restaurar(db, Producto, producto_id):
+        producto = producto_por_id(db, producto_id)
 
     if not producto:
         raise HTTPException(
@@ -255,16 +572,10 @@ async def actualizar_producto(
             detail=f"Producto con ID {producto_id} no encontrado"
         )
 
+    verificar_if_match(if_match, producto.version, f"El producto {producto_id}")
+
     # Guardar datos anteriores para auditoría
-    datos_anteriores = {
-        "nombre": producto.nombre,
-        "descripcion": producto.descripcion,
-        "precio": float(producto.precio),
-        "stock": producto.stock,
-        "categoria": producto.categoria,
-        "imagen_url": producto.imagen_url,
-        "activo": producto.activo
-    }
+    antes = instantanea(producto, CAMPOS_AUDITADOS)
 
     # Actualizar solo los campos que fueron enviados
     update_data = producto_actualizado.model_dump(exclude_unset=True)
@@ -273,23 +584,33 @@ async def actualizar_producto(
         setattr(producto, campo, valor)  # Establecer el nuevo valor
 
     # Registrar quién hizo la modificación
-    producto.grupo_ultima_modificacion = settings.GRUPO_ESTUDIANTES
+    producto.grupo_ultima_modificacion = grupo
 
-    # Guardar cambios
-    db.commit()
+    # Guardar cambios (UPDATE ... WHERE id = ? AND version = ?)
+    confirmar_version(db, f"El producto {producto_id}")
     db.refresh(producto)
 
-    # Registrar en auditoría
+    # Registrar en auditoría solo los campos que realmente cambiaron
+    # (y todos los anteriores si esta versión es un punto completo)
+    datos_anteriores, datos_nuevos = diferencia(antes, instantanea(producto, CAMPOS_AUDITADOS))
+    completo = es_punto_completo("UPDATE", producto.version)
     registrar_auditoria(
         db=db,
         tabla="productos",
         id_registro=producto.id,
         operacion="UPDATE",
-        datos_anteriores=datos_anteriores,
-        datos_nuevos=update_data,
-        observaciones=f"Producto '{producto.nombre}' actualizado por {settings.GRUPO_ESTUDIANTES}"
+        datos_anteriores=antes if completo else datos_anteriores,
+        datos_nuevos=datos_nuevos,
+        observaciones=f"Producto '{producto.nombre}' actualizado por {grupo}",
+        grupo=grupo,
+        completo=completo
     )
 
+    # Actualizar el snapshot de /productos/catalogo (en segundo plano) y el autocompletar
+    catalogo.avisar_cambio()
+    autocompletar_productos.aplicar_cambio(producto)
+
+    response.headers["ETag"] = etag_de(producto.version)
     return producto
 
 
@@ -304,7 +625,9 @@ async def actualizar_producto(
 )
 async def eliminar_producto(
     producto_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    grupo: str = Depends(obtener_grupo),
+    if_match: Optional[str] = parametro_if_match()
 ):
     """
     Elimina un producto de forma lógica (no lo borra de la BD).
@@ -313,6 +636,7 @@ async def eliminar_producto(
     Esto permite mantener historial y recuperar el producto si es necesario.
 
     - **producto_id**: ID del producto a eliminar
+    - **If-Match** (header): Versión leída; si otro grupo guardó antes, responde 412
 
     Returns:
         MensajeResponse: Confirmación de eliminación
@@ -320,10 +644,16 @@ async def eliminar_producto(
     Raises:
         HTTPException 404: Si el producto no existe
         HTTPException 400: Si el producto ya está inactivo
+        HTTPException 412: Si el producto cambió desde que se leyó
     """
 
     # Buscar el producto
-    producto = db.query(Producto).filter(Producto.id == producto_id).first()
+    producto = producto_por_id(db, producto_id)
+
+    # Eliminado hace tiempo: vuelve del archivo a la tabla principal
+    # (si la petición falla, el rollback lo deja archivado)
+    if not producto and restaurar(db, Producto, producto_id):
+        producto = producto_por_id(db, producto_id)
 
     if not producto:
         raise HTTPException(
@@ -331,6 +661,8 @@ async def eliminar_producto(
             detail=f"Producto con ID {producto_id} no encontrado"
         )
 
+    verificar_if_match(if_match, producto.version, f"El producto {producto_id}")
+
     # Verificar si ya está inactivo
     if not producto.activo:
         raise HTTPException(
@@ -338,17 +670,11 @@ async def eliminar_producto(
             detail=f"El producto '{producto.nombre}' ya está inactivo"
         )
 
-    # Guardar datos para auditoría
-    datos_anteriores = {
-        "nombre": producto.nombre,
-        "activo": producto.activo
-    }
-
     # Marcar como inactivo
     producto.activo = False
-    producto.grupo_ultima_modificacion = settings.GRUPO_ESTUDIANTES
+    producto.grupo_ultima_modificacion = grupo
 
-    db.commit()
+    confirmar_version(db, f"El producto {producto_id}")
 
     # Registrar en auditoría
     registrar_auditoria(
@@ -356,11 +682,17 @@ async def eliminar_producto(
         tabla="productos",
         id_registro=producto.id,
         operacion="DELETE",
-        datos_anteriores=datos_anteriores,
+        datos_anteriores=dict(instantanea(producto, CAMPOS_AUDITADOS), activo=True),
         datos_nuevos={"activo": False},
-        observaciones=f"Producto '{producto.nombre}' eliminado (lógicamente) por {settings.GRUPO_ESTUDIANTES}"
+        observaciones=f"Producto '{producto.nombre}' eliminado (lógicamente) por {grupo}",
+        grupo=grupo,
+        completo=True
     )
 
+    # Quitar el producto del snapshot de /productos/catalogo (en segundo plano) y del autocompletar
+    catalogo.avisar_cambio()
+    autocompletar_productos.aplicar_cambio(producto)
+
     return MensajeResponse(
         mensaje=f"Producto '{producto.nombre}' eliminado correctamente",
         detalle="Eliminación lógica: el producto está marcado como inactivo"
@@ -378,12 +710,14 @@ async def eliminar_producto(
 )
 async def buscar_productos_por_nombre(
     query: str,  # Texto a buscar
-    db: Session = Depends(get_db)
+    fields: Optional[str] = parametro_fields(),
+    db: Session = Depends(get_db_lectura)
 ):
     """
     Busca productos por nombre (búsqueda parcial).
 
     - **query**: Texto a buscar en el nombre del producto
+    - **fields**: Campos a devolver (ej: nombre,precio,stock)
 
     Returns:
         List[ProductoResponse]: Productos que coinciden con la búsqueda
@@ -395,11 +729,64 @@ async def buscar_productos_por_nombre(
             detail="La búsqueda debe tener al menos 2 caracteres"
         )
 
+    campos = parsear_campos(fields, ProductoResponse)
+
     # Búsqueda usando ILIKE (case-insensitive en PostgreSQL)
     # %query% encuentra el texto en cualquier parte del nombre
-    productos = db.query(Producto)\
+    consulta = db.query(Producto)
+    if campos:
+        consulta = consulta.options(opciones_columnas(Producto, campos))
+
+    consulta = consulta\
         .filter(Producto.activo == True)\
-        .filter(Producto.nombre.ilike(f"%{query}%"))\
-        .all()
+        .filter(Producto.nombre.ilike(f"%{query}%"))
+
+    # En un hilo aparte: si el cliente se desconecta, la consulta se cancela
+    productos = await run_in_threadpool(consulta.all)
+
+    if campos:
+        return respuesta_parcial(productos, ProductoResponse, campos)
 
     return productos
+
+
+# ========================================
+# ENDPOINT: BÚSQUEDA CON FACETAS
+# ========================================
+@router.get(
+    "/buscar/facetas",
+    response_model=BusquedaFacetadaResponse,
+    summary="Buscar productos con conteos por faceta",
+    description="Devuelve una página de productos y, en la misma consulta, cuántos hay por categoría, rango de precio y disponibilidad."
+)
+async def buscar_productos_con_facetas(
+    query: Optional[str] = None,  # Texto a buscar en el nombre (opcional)
+    categoria: Optional[str] = None,
+    en_stock: Optional[bool] = Query(None, description="true = solo con stock, false = solo agotados"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db_lectura)
+):
+    """
+    Búsqueda para la página de resultados con filtros laterales.
+
+    - **query**: Texto a buscar en el nombre (mínimo 2 caracteres)
+    - **categoria**: Filtrar por categoría
+    - **en_stock**: Solo productos con (o sin) unidades disponibles
+    - **skip** / **limit**: Página de resultados (ordenados por nombre)
+
+    Las facetas cuentan todas las coincidencias (no solo la página). En
+    búsquedas muy amplias se cuentan las primeras 10.000 y
+    'conteo_exacto' viene en false.
+
+    Returns:
+        BusquedaFacetadaResponse: Productos, total y facetas
+    """
+
+    if query is not None and len(query) < 2:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La búsqueda debe tener al menos 2 caracteres"
+        )
+
+    return await run_in_threadpool(buscar_con_facetas, db, query, categoria, en_stock, skip, limit)
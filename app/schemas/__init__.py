@@ -10,6 +10,16 @@ from .schemas import (
     ClienteUpdate,
     ClienteResponse,
     AuditoriaResponse,
+    ResumenAuditoriaResponse,
+    EliminadoResponse,
+    CambiosProductoResponse,
+    CambiosClienteResponse,
+    LoteProductoResponse,
+    LoteClienteResponse,
+    SugerenciaResponse,
+    FacetaResponse,
+    FacetasProductoResponse,
+    BusquedaFacetadaResponse,
     MensajeResponse,
     ErrorResponse
 )
@@ -8,7 +8,7 @@ con las reglas definidas aquí.
 """
 
 from pydantic import BaseModel, Field, EmailStr, field_validator
-from typing import Optional
+from typing import List, Optional, Union
 from datetime import datetime
 from decimal import Decimal
 
@@ -123,6 +123,7 @@ class ProductoResponse(ProductoBase):
     fecha_actualizacion: datetime
     grupo_creador: str
     grupo_ultima_modificacion: Optional[str] = None
+    version: int  # Enviar en If-Match al actualizar o eliminar
 
     class Config:
         """
@@ -225,6 +226,7 @@ class ClienteResponse(ClienteBase):
     fecha_actualizacion: datetime
     grupo_creador: str
     grupo_ultima_modificacion: Optional[str] = None
+    version: int  # Enviar en If-Match al actualizar o eliminar
 
     class Config:
         from_attributes = True
@@ -252,6 +254,118 @@ class AuditoriaResponse(BaseModel):
         from_attributes = True
 
 
+class ResumenAuditoriaResponse(BaseModel):
+    """
+    Cantidad de operaciones de un grupo, en una tabla y de un tipo,
+    durante una hora (para gráficas de actividad).
+    """
+    hora: datetime
+    grupo_responsable: str
+    tabla_afectada: str
+    operacion: str
+    total: int
+
+    class Config:
+        from_attributes = True
+
+
+# ========================================
+# SCHEMAS PARA SINCRONIZACIÓN INCREMENTAL
+# ========================================
+
+class EliminadoResponse(BaseModel):
+    """
+    "Lápida" de un registro eliminado lógicamente (activo = False).
+    Solo indica qué id se debe borrar de la copia local.
+    """
+    id: int
+    fecha_actualizacion: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class CambiosProductoResponse(BaseModel):
+    """
+    Respuesta de GET /productos/cambios.
+
+    Para seguir sincronizando, se envía 'cursor' en el siguiente ?since=
+    """
+    actualizados: List[ProductoResponse]
+    eliminados: List[EliminadoResponse]
+    cursor: Optional[str] = None
+    hay_mas: bool
+
+
+class CambiosClienteResponse(BaseModel):
+    """Respuesta de GET /clientes/cambios"""
+    actualizados: List[ClienteResponse]
+    eliminados: List[EliminadoResponse]
+    cursor: Optional[str] = None
+    hay_mas: bool
+
+
+# ========================================
+# SCHEMAS PARA CONSULTA POR LOTE
+# ========================================
+
+class LoteProductoResponse(BaseModel):
+    """
+    Respuesta de GET /productos/lote.
+
+    'encontrados' conserva el orden de los ids pedidos;
+    'faltantes' lista los ids que no existen.
+    """
+    encontrados: List[ProductoResponse]
+    faltantes: List[int]
+
+
+class LoteClienteResponse(BaseModel):
+    """Respuesta de GET /clientes/lote"""
+    encontrados: List[ClienteResponse]
+    faltantes: List[int]
+
+
+# ========================================
+# SCHEMAS PARA AUTOCOMPLETAR
+# ========================================
+
+class SugerenciaResponse(BaseModel):
+    """Una sugerencia de /productos/autocompletar o /clientes/autocompletar"""
+    id: int
+    nombre: str
+
+
+# ========================================
+# SCHEMAS PARA BÚSQUEDA CON FACETAS
+# ========================================
+
+class FacetaResponse(BaseModel):
+    """Un valor de faceta y cuántos productos lo tienen"""
+    valor: Union[str, bool, None] = None
+    total: int
+
+
+class FacetasProductoResponse(BaseModel):
+    """Conteos por categoría, rango de precio y disponibilidad"""
+    categoria: List[FacetaResponse]
+    rango_precio: List[FacetaResponse]
+    en_stock: List[FacetaResponse]
+
+
+class BusquedaFacetadaResponse(BaseModel):
+    """
+    Respuesta de GET /productos/buscar/facetas.
+
+    Si 'conteo_exacto' es False hubo más coincidencias de las que se
+    cuentan: 'total' y las facetas son un mínimo.
+    """
+    productos: List[ProductoResponse]
+    total: int
+    conteo_exacto: bool
+    facetas: FacetasProductoResponse
+
+
 # ========================================
 # SCHEMAS AUXILIARES
 # ========================================
@@ -0,0 +1,114 @@
+"""
+========================================
+SINCRONIZACIÓN INCREMENTAL ("CAMBIOS DESDE")
+========================================
+Las tiendas y los feeds de socios guardan una copia del catálogo.
+En lugar de descargar todo /productos/ para ver qué cambió, piden:
+
+    GET /productos/cambios?since=<cursor>
+
+y reciben solo lo creado, actualizado o eliminado después del cursor.
+
+El cursor es la pareja (fecha_actualizacion, id) del último registro
+entregado, codificada en base64. El índice (fecha_actualizacion, id)
+permite que PostgreSQL lea directamente desde ese punto.
+"""
+
+import base64
+from datetime import datetime, timedelta
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+
+from .config import settings
+
+
+def codificar_cursor(fecha: datetime, id_registro: int) -> str:
+    """
+    Convierte (fecha, id) en un texto opaco para la URL.
+
+    Args:
+        fecha: fecha_actualizacion del último registro entregado
+        id_registro: id del último registro entregado
+
+    Returns:
+        str: Cursor en base64 (seguro para URLs)
+    """
+    crudo = f"{fecha.isoformat()}|{id_registro}".encode("utf-8")
+    return base64.urlsafe_b64encode(crudo).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Operación inversa de codificar_cursor().
+
+    Raises:
+        HTTPException 400: Si el cursor no es válido
+    """
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        crudo = base64.urlsafe_b64decode(cursor + relleno).decode("utf-8")
+        fecha, id_registro = crudo.rsplit("|", 1)
+        return datetime.fromisoformat(fecha), int(id_registro)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El cursor 'since' no es válido. Usa el valor 'cursor' de la respuesta anterior."
+        )
+
+
+def consultar_cambios(
+    db: Session,
+    modelo: Any,
+    since: Optional[str],
+    limite: int
+) -> Tuple[List[Any], List[Any], Optional[str], bool]:
+    """
+    Lee los registros modificados después del cursor.
+
+    Args:
+        db: Sesión de base de datos
+        modelo: Producto o Cliente
+        since: Cursor de la consulta anterior (None = desde el principio)
+        limite: Máximo de registros por página
+
+    Returns:
+        Tuple: (activos, eliminados, cursor siguiente, hay_mas)
+    """
+    query = db.query(modelo)
+
+    if since:
+        fecha, id_registro = decodificar_cursor(since)
+        # Comparación de filas: (fecha, id) > (fecha_cursor, id_cursor)
+        query = query.filter(
+            tuple_(modelo.fecha_actualizacion, modelo.id) > tuple_(fecha, id_registro)
+        )
+
+    # NOW() en PostgreSQL es la hora de inicio de la transacción: un registro
+    # con fecha de hace un instante podría no tener COMMIT todavía. Esos se
+    # entregan en la siguiente consulta.
+    margen = settings.SINCRONIZACION_MARGEN_SEGUNDOS
+    if margen > 0:
+        query = query.filter(
+            modelo.fecha_actualizacion < func.now() - timedelta(seconds=margen)
+        )
+
+    filas = query\
+        .order_by(modelo.fecha_actualizacion.asc(), modelo.id.asc())\
+        .limit(limite + 1)\
+        .all()
+
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+
+    # Sin filas nuevas, el cliente sigue usando el mismo cursor
+    cursor = since
+    if filas:
+        cursor = codificar_cursor(filas[-1].fecha_actualizacion, filas[-1].id)
+
+    activos = [fila for fila in filas if fila.activo]
+    eliminados = [fila for fila in filas if not fila.activo]
+
+    return activos, eliminados, cursor, hay_mas
@@ -0,0 +1,49 @@
+"""
+========================================
+ARCHIVADOR DEL HISTORIAL DE AUDITORÍA
+========================================
+Mueve las filas antiguas de 'historial_auditoria' a segmentos
+comprimidos en disco (ver app/archivo_auditoria.py).
+
+Se puede ejecutar a mano o programar una vez al día (cron):
+
+USO:
+    python archivar_auditoria.py
+    python archivar_auditoria.py --dias 90
+"""
+
+import argparse
+import logging
+from typing import Optional, Sequence
+
+from app.archivo_auditoria import archivar, archivo
+from app.config import settings
+from app.database import SessionLocal
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Lee los argumentos y archiva"""
+    parser = argparse.ArgumentParser(description="Archiva el historial de auditoría antiguo")
+    parser.add_argument(
+        "--dias", type=int, default=settings.AUDITORIA_DIAS_EN_CALIENTE,
+        help="Días que se mantienen en la tabla; lo anterior se archiva"
+    )
+    parser.add_argument(
+        "--filas-por-segmento", type=int, default=settings.AUDITORIA_FILAS_POR_SEGMENTO,
+        help="Filas máximas en cada archivo de segmento"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    db = SessionLocal()
+    try:
+        total = archivar(db, args.dias, args.filas_por_segmento)
+    finally:
+        db.close()
+
+    print(f"✅ {total} registros archivados en {archivo.carpeta}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+========================================
+ARCHIVADOR DE PRODUCTOS Y CLIENTES ELIMINADOS
+========================================
+Mueve los productos y clientes eliminados (activo = False) hace tiempo
+a 'productos_archivo' y 'clientes_archivo' (ver app/archivo_eliminados.py).
+
+Se puede ejecutar a mano o programar una vez al día (cron):
+
+USO:
+    python archivar_eliminados.py
+    python archivar_eliminados.py --dias 30
+"""
+
+import argparse
+import logging
+from typing import Optional, Sequence
+
+from app.archivo_eliminados import archivar
+from app.config import settings
+from app.database import SessionLocal
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Lee los argumentos y archiva"""
+    parser = argparse.ArgumentParser(description="Archiva los productos y clientes eliminados hace tiempo")
+    parser.add_argument(
+        "--dias", type=int, default=settings.ARCHIVO_ELIMINADOS_DIAS,
+        help="Días desde la eliminación; lo anterior se archiva"
+    )
+    parser.add_argument(
+        "--lote", type=int, default=settings.ARCHIVO_ELIMINADOS_LOTE,
+        help="Filas movidas por transacción"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    db = SessionLocal()
+    try:
+        movidas = archivar(db, args.dias, args.lote)
+    finally:
+        db.close()
+
+    for tabla, total in movidas.items():
+        print(f"✅ {total} registros de '{tabla}' movidos a '{tabla}_archivo'")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,16 +10,30 @@ INSTITUCIÓN: FUMC
 PROYECTO: API de Tienda Virtual con PostgreSQL
 """
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, status
+from sqlalchemy.exc import OperationalError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 # Importar routers (endpoints organizados por módulos)
-from app.routers import productos_router, clientes_router, auditoria_router
+from app.routers import productos_router, clientes_router, auditoria_router, depuracion_router
 
 # Importar configuración y base de datos
 from app.config import settings
-from app.database import engine, Base
+from app.database import engine, Base, cerrar_conexiones
+from app.middleware import (
+    AdmisionMiddleware,
+    CancelacionMiddleware,
+    Coalescencia,
+    CoalescenciaMiddleware,
+    CompresionMiddleware,
+    ControlAdmision,
+    LecturaTrasEscrituraMiddleware,
+)
+from app.eventos_auditoria import difusor
+from app import plazos
 
 # ========================================
 # CREAR LAS TABLAS EN LA BASE DE DATOS
@@ -30,14 +44,37 @@ si no existen en la base de datos.
 
 IMPORTANTE: En producción se usaría Alembic para migraciones,
 pero para el curso esto es más simple y directo.
+
+servidor.py lo ejecuta una sola vez antes de iniciar los workers
+y lo desactiva para ellos con CREAR_TABLAS_AL_INICIAR=false.
 """
-Base.metadata.create_all(bind=engine)
+if settings.CREAR_TABLAS_AL_INICIAR:
+    Base.metadata.create_all(bind=engine)
+
+
+# ========================================
+# CICLO DE VIDA DE LA APLICACIÓN
+# ========================================
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    """
+    Código que se ejecuta al iniciar y al apagar la API.
+
+    Al apagar, uvicorn primero deja de aceptar conexiones y espera a que
+    terminen las peticiones en curso (incluida su escritura de auditoría,
+    que se hace dentro de la misma petición). Después se cierran las
+    conexiones del pool (principal y réplicas).
+    """
+    yield
+    difusor.detener()  # Terminar los streams de /auditoria/eventos
+    cerrar_conexiones()  # Cerrar todas las conexiones de los pools
 
 
 # ========================================
 # CREAR LA APLICACIÓN FASTAPI
 # ========================================
 app = FastAPI(
+    lifespan=ciclo_de_vida,
     # Información que aparece en la documentación
     title="API Tienda Virtual - FUMC",
     description="""
@@ -79,6 +116,73 @@ app = FastAPI(
 )
 
 
+# ========================================
+# RÉPLICAS: LEER TUS PROPIAS ESCRITURAS
+# ========================================
+"""
+Si hay réplicas de lectura configuradas, después de escribir un grupo
+lee del servidor principal durante unos segundos (ver app/database.py).
+"""
+app.add_middleware(LecturaTrasEscrituraMiddleware)
+
+
+# ========================================
+# CONFIGURAR COMPRESIÓN
+# ========================================
+"""
+Comprime con brotli o gzip las respuestas grandes (listados de productos,
+historial de auditoría...). Los cuerpos comprimidos se guardan en caché,
+así el mismo listado sin cambios no se vuelve a comprimir en cada petición.
+"""
+app.add_middleware(
+    CompresionMiddleware,
+    minimo_bytes=settings.COMPRESION_MINIMO_BYTES,
+    max_entradas_cache=settings.COMPRESION_CACHE_ENTRADAS,
+)
+
+
+# ========================================
+# PLAZOS Y CANCELACIÓN DE CONSULTAS
+# ========================================
+"""
+Las consultas de cada petición tienen un tiempo máximo según el tipo
+de ruta. En búsquedas y auditoría (las que consultan en un hilo aparte)
+además se cancelan si el cliente se desconecta antes de recibir la
+respuesta (ver app/plazos.py). Va por dentro del control de admisión.
+"""
+app.add_middleware(CancelacionMiddleware, timeouts=settings.timeouts_consulta)
+
+
+# ========================================
+# CONTROL DE ADMISIÓN
+# ========================================
+"""
+En picos de tráfico, el exceso de peticiones recibe 503/429 con
+'Retry-After' de inmediato, en lugar de esperar una conexión del pool
+hasta agotar el tiempo (ver app/middleware/admision.py).
+"""
+control_admision = ControlAdmision(
+    limites=settings.limites_admision,
+    tasa_por_grupo=settings.ADMISION_TASA_POR_GRUPO,
+    rafaga_por_grupo=settings.ADMISION_RAFAGA_POR_GRUPO,
+)
+app.add_middleware(AdmisionMiddleware, control=control_admision)
+
+
+# ========================================
+# COALESCENCIA DE PETICIONES IDÉNTICAS
+# ========================================
+"""
+Si llegan muchas peticiones GET idénticas al mismo tiempo, solo la
+primera consulta la base de datos y las demás reciben su respuesta
+(ver app/middleware/coalescencia.py). Va por fuera del control de
+admisión: las que esperan no ocupan cupo.
+"""
+coalescencia = Coalescencia(rutas=settings.COALESCENCIA_RUTAS)
+if settings.COALESCENCIA_RUTAS:
+    app.add_middleware(CoalescenciaMiddleware, coalescencia=coalescencia)
+
+
 # ========================================
 # CONFIGURAR CORS
 # ========================================
@@ -88,6 +192,11 @@ accedan a la API desde diferentes dominios.
 
 Esto es necesario si vas a consumir la API desde un frontend
 que esté en un dominio diferente.
+
+Se agrega al FINAL para que sea el middleware más externo: así también
+llevan los headers de CORS las respuestas que otros middlewares generan
+por su cuenta (429/503 del control de admisión), y el navegador puede
+leer su código y su 'Retry-After'.
 """
 app.add_middleware(
     CORSMiddleware,
@@ -95,6 +204,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Permite todos los métodos HTTP (GET, POST, PUT, DELETE, etc.)
     allow_headers=["*"],  # Permite todos los headers
+    expose_headers=["X-Siguiente-Cursor", "Idempotent-Replayed", "ETag", "Retry-After"],  # Headers que el frontend puede leer
 )
 
 
@@ -124,6 +234,9 @@ app.include_router(
     # tags=["Auditoría"]  # Ya está definido en el router
 )
 
+# Router de depuración: /debug (desactivado salvo PERFIL_HABILITADO)
+app.include_router(depuracion_router)
+
 
 # ========================================
 # ENDPOINTS RAÍZ Y DE INFORMACIÓN
@@ -176,7 +289,10 @@ async def health_check():
     return {
         "status": "OK",
         "mensaje": "La API está funcionando correctamente ✅",
-        "grupo": settings.GRUPO_ESTUDIANTES
+        "grupo": settings.GRUPO_ESTUDIANTES,
+        "admision": control_admision.estadisticas(),
+        "coalescencia": coalescencia.estadisticas(),
+        "consultas": plazos.estadisticas()
     }
 
 
@@ -213,25 +329,38 @@ async def info():
                 "listar": "GET /productos/",
                 "crear": "POST /productos/",
                 "obtener": "GET /productos/{id}",
+                "lote": "GET /productos/lote?ids=1,2,3",
                 "actualizar": "PUT /productos/{id}",
                 "eliminar": "DELETE /productos/{id}",
-                "buscar": "GET /productos/buscar/nombre?query=..."
+                "buscar": "GET /productos/buscar/nombre?query=...",
+                "autocompletar": "GET /productos/autocompletar?query=...",
+                "buscar_facetas": "GET /productos/buscar/facetas?query=...",
+                "cambios": "GET /productos/cambios?since=<cursor>",
+                "catalogo": "GET /productos/catalogo"
             },
             "clientes": {
                 "listar": "GET /clientes/",
                 "crear": "POST /clientes/",
                 "obtener": "GET /clientes/{id}",
+                "lote": "GET /clientes/lote?ids=1,2,3",
                 "actualizar": "PUT /clientes/{id}",
                 "eliminar": "DELETE /clientes/{id}",
                 "buscar_nombre": "GET /clientes/buscar/nombre?query=...",
-                "buscar_email": "GET /clientes/buscar/email/{email}"
+                "autocompletar": "GET /clientes/autocompletar?query=...",
+                "buscar_email": "GET /clientes/buscar/email/{email}",
+                "cambios": "GET /clientes/cambios?since=<cursor>"
             },
             "auditoria": {
                 "listar": "GET /auditoria/",
                 "por_grupo": "GET /auditoria/grupo/{nombre_grupo}",
                 "por_tabla": "GET /auditoria/tabla/{nombre_tabla}",
                 "por_operacion": "GET /auditoria/operacion/{tipo}",
-                "por_registro": "GET /auditoria/registro/{tabla}/{id}"
+                "por_registro": "GET /auditoria/registro/{tabla}/{id}",
+                "en_vivo": "GET /auditoria/eventos (Server-Sent Events)",
+                "resumen": "GET /auditoria/resumen"
+            },
+            "depuracion": {
+                "perfil_cpu": "GET /debug/profile?seconds=N (requiere PERFIL_HABILITADO y X-Perfil-Token)"
             }
         }
     }
@@ -258,6 +387,26 @@ async def not_found_handler(request, exc):
     )
 
 
+@app.exception_handler(OperationalError)
+@app.exception_handler(plazos.PeticionAbandonada)
+async def consulta_cancelada_handler(request, exc):
+    """Handler para consultas canceladas (plazo vencido o cliente desconectado)"""
+    peticion = plazos.peticion_actual.get()
+    abandonada = isinstance(exc, plazos.PeticionAbandonada) or (peticion is not None and peticion.cancelada)
+    if not abandonada and not plazos.es_consulta_cancelada(exc):
+        raise exc  # Otro error de la base de datos: lo atiende el handler de 500
+    if not abandonada:
+        plazos.registrar_plazo_vencido()
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": "1"},
+        content={
+            "error": "Consulta cancelada",
+            "detalle": "La consulta superó el tiempo máximo permitido. Intenta con filtros más específicos."
+        }
+    )
+
+
 @app.exception_handler(500)
 async def internal_error_handler(request, exc):
     """Handler para errores 500 (Error interno del servidor)"""
@@ -279,6 +428,9 @@ Este bloque solo se ejecuta cuando corres el archivo directamente
 con: python main.py
 
 NO se ejecuta cuando se usa uvicorn desde la terminal o VS Code.
+
+Es solo para desarrollo (un proceso, recarga automática).
+En producción usa: python servidor.py
 """
 if __name__ == "__main__":
     import uvicorn
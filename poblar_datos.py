@@ -0,0 +1,72 @@
+"""
+========================================
+GENERADOR DE DATOS DE PRUEBA
+========================================
+Llena la base de datos con productos, clientes e historial de auditoría
+generados (ver app/datos_prueba.py). Sirve para entornos de staging y
+pruebas de carga.
+
+Solo funciona con PostgreSQL (usa COPY).
+
+USO:
+    python poblar_datos.py --productos 100000 --clientes 50000
+    python poblar_datos.py --productos 4000000 --clientes 2000000 --truncar
+    python poblar_datos.py --semilla 7 --cambios-por-registro 5 --dias 730
+
+⚠️ --truncar BORRA productos, clientes y el historial antes de cargar.
+"""
+
+import argparse
+import logging
+import sys
+import time
+from typing import Optional, Sequence
+
+from app.database import engine
+from app.datos_prueba import Escala, poblar
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Lee los argumentos y carga los datos"""
+    parser = argparse.ArgumentParser(description="Genera datos de prueba y los carga con COPY")
+    parser.add_argument("--productos", type=int, default=10_000, help="Productos a generar")
+    parser.add_argument("--clientes", type=int, default=5_000, help="Clientes a generar")
+    parser.add_argument(
+        "--cambios-por-registro", type=int, default=2,
+        help="UPDATE promedio en el historial de cada registro"
+    )
+    parser.add_argument("--dias", type=int, default=365, help="Días que abarca el historial")
+    parser.add_argument("--semilla", type=int, default=42, help="Misma semilla = mismos datos")
+    parser.add_argument(
+        "--truncar", action="store_true",
+        help="Vacía las tablas antes de cargar (los ids empiezan en 1)"
+    )
+    args = parser.parse_args(argv)
+
+    if min(args.productos, args.clientes, args.cambios_por_registro, args.dias) < 0:
+        parser.error("Las cantidades no pueden ser negativas")
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if engine.dialect.name != "postgresql":
+        print("❌ poblar_datos.py necesita PostgreSQL (usa COPY)")
+        sys.exit(1)
+
+    escala = Escala(args.productos, args.clientes, args.cambios_por_registro, args.dias)
+    inicio = time.perf_counter()
+
+    conexion = engine.raw_connection()
+    try:
+        cargadas = poblar(conexion, escala, semilla=args.semilla, truncar=args.truncar)
+    finally:
+        conexion.close()
+
+    segundos = time.perf_counter() - inicio
+    total = sum(cargadas.values())
+    print(f"✅ {total:,} filas cargadas en {segundos:.1f} s ({total / max(segundos, 0.001):,.0f} filas/s)")
+    for tabla, filas in cargadas.items():
+        print(f"   {tabla}: {filas:,}")
+
+
+if __name__ == "__main__":
+    main()
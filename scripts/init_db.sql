@@ -19,6 +19,10 @@
 -- ⚠️ CUIDADO: Esto eliminará todas las tablas y sus datos
 -- Descomenta las siguientes líneas solo si quieres empezar desde cero
 
+-- DROP TABLE IF EXISTS claves_idempotencia CASCADE;
+-- DROP TABLE IF EXISTS productos_archivo CASCADE;
+-- DROP TABLE IF EXISTS clientes_archivo CASCADE;
+-- DROP TABLE IF EXISTS resumen_auditoria_hora CASCADE;
 -- DROP TABLE IF EXISTS historial_auditoria CASCADE;
 -- DROP TABLE IF EXISTS productos CASCADE;
 -- DROP TABLE IF EXISTS clientes CASCADE;
@@ -43,14 +47,25 @@ CREATE TABLE IF NOT EXISTS productos (
     fecha_creacion TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL,
     fecha_actualizacion TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL,
     grupo_creador VARCHAR(50) NOT NULL,
-    grupo_ultima_modificacion VARCHAR(50)
+    grupo_ultima_modificacion VARCHAR(50),
+    version INTEGER NOT NULL DEFAULT 1
 );
 
+-- Bases creadas antes de la columna 'version' (control de concurrencia con If-Match)
+ALTER TABLE productos ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+
 -- Índices para mejorar el rendimiento de búsquedas
 CREATE INDEX IF NOT EXISTS idx_productos_nombre ON productos(nombre);
 CREATE INDEX IF NOT EXISTS idx_productos_categoria ON productos(categoria);
 CREATE INDEX IF NOT EXISTS idx_productos_grupo_creador ON productos(grupo_creador);
 CREATE INDEX IF NOT EXISTS idx_productos_activo ON productos(activo);
+-- Sincronización incremental (GET /productos/cambios)
+CREATE INDEX IF NOT EXISTS idx_productos_actualizacion_id ON productos(fecha_actualizacion, id);
+-- Listados de GET /productos/ por precio y por más recientes (solo activos)
+CREATE INDEX IF NOT EXISTS idx_productos_activos_precio ON productos(precio, id) WHERE activo;
+CREATE INDEX IF NOT EXISTS idx_productos_activos_categoria_precio ON productos(categoria, precio, id) WHERE activo;
+CREATE INDEX IF NOT EXISTS idx_productos_activos_recientes ON productos(fecha_creacion, id) WHERE activo;
+CREATE INDEX IF NOT EXISTS idx_productos_activos_categoria_recientes ON productos(categoria, fecha_creacion, id) WHERE activo;
 
 -- Tabla de CLIENTES
 CREATE TABLE IF NOT EXISTS clientes (
@@ -65,15 +80,21 @@ CREATE TABLE IF NOT EXISTS clientes (
     fecha_creacion TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL,
     fecha_actualizacion TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL,
     grupo_creador VARCHAR(50) NOT NULL,
-    grupo_ultima_modificacion VARCHAR(50)
+    grupo_ultima_modificacion VARCHAR(50),
+    version INTEGER NOT NULL DEFAULT 1
 );
 
+-- Bases creadas antes de la columna 'version' (control de concurrencia con If-Match)
+ALTER TABLE clientes ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+
 -- Índices
 CREATE INDEX IF NOT EXISTS idx_clientes_email ON clientes(email);
 CREATE INDEX IF NOT EXISTS idx_clientes_documento ON clientes(documento);
 CREATE INDEX IF NOT EXISTS idx_clientes_ciudad ON clientes(ciudad);
 CREATE INDEX IF NOT EXISTS idx_clientes_grupo_creador ON clientes(grupo_creador);
 CREATE INDEX IF NOT EXISTS idx_clientes_activo ON clientes(activo);
+-- Sincronización incremental (GET /clientes/cambios)
+CREATE INDEX IF NOT EXISTS idx_clientes_actualizacion_id ON clientes(fecha_actualizacion, id);
 
 -- Tabla de HISTORIAL DE AUDITORÍA
 CREATE TABLE IF NOT EXISTS historial_auditoria (
@@ -85,15 +106,68 @@ CREATE TABLE IF NOT EXISTS historial_auditoria (
     datos_anteriores TEXT,
     datos_nuevos TEXT,
     fecha_operacion TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL,
-    observaciones TEXT
+    observaciones TEXT,
+    completo BOOLEAN NOT NULL DEFAULT FALSE
 );
 
+-- Bases creadas antes de los puntos completos (ver app/auditoria_compacta.py):
+-- los CREATE ya guardan el registro completo
+ALTER TABLE historial_auditoria ADD COLUMN IF NOT EXISTS completo BOOLEAN NOT NULL DEFAULT FALSE;
+UPDATE historial_auditoria SET completo = TRUE WHERE operacion = 'CREATE' AND NOT completo;
+
 -- Índices
 CREATE INDEX IF NOT EXISTS idx_auditoria_tabla ON historial_auditoria(tabla_afectada);
 CREATE INDEX IF NOT EXISTS idx_auditoria_id_registro ON historial_auditoria(id_registro);
 CREATE INDEX IF NOT EXISTS idx_auditoria_operacion ON historial_auditoria(operacion);
 CREATE INDEX IF NOT EXISTS idx_auditoria_grupo ON historial_auditoria(grupo_responsable);
 CREATE INDEX IF NOT EXISTS idx_auditoria_fecha ON historial_auditoria(fecha_operacion);
+-- Historia de un registro en orden (reconstrucción de la auditoría compacta)
+CREATE INDEX IF NOT EXISTS idx_auditoria_registro_id ON historial_auditoria(tabla_afectada, id_registro, id);
+-- Último punto completo de un registro (dónde empezar a reconstruir)
+CREATE INDEX IF NOT EXISTS idx_auditoria_punto_completo ON historial_auditoria(tabla_afectada, id_registro, id) WHERE completo;
+-- Rangos de fecha (?desde=&hasta=): BRIN, las filas llegan en orden de fecha
+CREATE INDEX IF NOT EXISTS idx_auditoria_fecha_brin ON historial_auditoria USING brin (fecha_operacion) WITH (pages_per_range = 32);
+
+-- Tabla de RESUMEN DE AUDITORÍA POR HORA (GET /auditoria/resumen)
+CREATE TABLE IF NOT EXISTS resumen_auditoria_hora (
+    hora TIMESTAMP WITH TIME ZONE NOT NULL,
+    grupo_responsable VARCHAR(50) NOT NULL,
+    tabla_afectada VARCHAR(50) NOT NULL,
+    operacion VARCHAR(20) NOT NULL,
+    particion SMALLINT NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (hora, grupo_responsable, tabla_afectada, operacion, particion)
+);
+
+-- Bases creadas antes de las particiones (ver app/resumen_auditoria.py):
+-- las filas existentes quedan en la partición 0
+ALTER TABLE resumen_auditoria_hora ADD COLUMN IF NOT EXISTS particion SMALLINT NOT NULL DEFAULT 0;
+ALTER TABLE resumen_auditoria_hora DROP CONSTRAINT IF EXISTS resumen_auditoria_hora_pkey;
+ALTER TABLE resumen_auditoria_hora ADD PRIMARY KEY (hora, grupo_responsable, tabla_afectada, operacion, particion);
+
+-- Tabla de CLAVES DE IDEMPOTENCIA (respuestas guardadas de POST con Idempotency-Key)
+CREATE TABLE IF NOT EXISTS claves_idempotencia (
+    grupo_responsable VARCHAR(50) NOT NULL,
+    clave VARCHAR(255) NOT NULL,
+    huella VARCHAR(64) NOT NULL,
+    codigo_estado INTEGER NOT NULL,
+    respuesta TEXT NOT NULL,
+    fecha_creacion TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    PRIMARY KEY (grupo_responsable, clave)
+);
+
+-- Para borrar rápido las claves vencidas
+CREATE INDEX IF NOT EXISTS ix_claves_idempotencia_fecha_creacion ON claves_idempotencia(fecha_creacion);
+
+-- Tablas de ARCHIVO: productos y clientes eliminados hace tiempo
+-- (mismas columnas que la tabla principal; ver archivar_eliminados.py)
+CREATE TABLE IF NOT EXISTS productos_archivo (LIKE productos, PRIMARY KEY (id));
+CREATE INDEX IF NOT EXISTS idx_productos_archivo_actualizacion_id ON productos_archivo(fecha_actualizacion, id);
+
+CREATE TABLE IF NOT EXISTS clientes_archivo (LIKE clientes, PRIMARY KEY (id));
+CREATE INDEX IF NOT EXISTS idx_clientes_archivo_actualizacion_id ON clientes_archivo(fecha_actualizacion, id);
+CREATE INDEX IF NOT EXISTS idx_clientes_archivo_email ON clientes_archivo(email);
+CREATE INDEX IF NOT EXISTS idx_clientes_archivo_documento ON clientes_archivo(documento);
 
 
 -- ========================================
@@ -164,11 +238,18 @@ INSERT INTO clientes (nombre, email, telefono, direccion, ciudad, documento, gru
 -- INSERTAR REGISTROS DE AUDITORÍA INICIALES
 -- ========================================
 
-INSERT INTO historial_auditoria (tabla_afectada, id_registro, operacion, grupo_responsable, datos_nuevos, observaciones) VALUES
-('productos', 1, 'CREATE', 'DATOS_INICIALES', '{"nombre": "Laptop HP Pavilion 15", "precio": 1850000}', 'Carga inicial de datos de ejemplo'),
-('productos', 2, 'CREATE', 'DATOS_INICIALES', '{"nombre": "iPhone 13 Pro Max", "precio": 4500000}', 'Carga inicial de datos de ejemplo'),
-('clientes', 1, 'CREATE', 'DATOS_INICIALES', '{"nombre": "María González Pérez", "email": "maria.gonzalez@email.com"}', 'Carga inicial de datos de ejemplo'),
-('clientes', 2, 'CREATE', 'DATOS_INICIALES', '{"nombre": "Carlos Andrés Rodríguez", "email": "carlos.rodriguez@email.com"}', 'Carga inicial de datos de ejemplo');
+INSERT INTO historial_auditoria (tabla_afectada, id_registro, operacion, grupo_responsable, datos_nuevos, observaciones, completo) VALUES
+('productos', 1, 'CREATE', 'DATOS_INICIALES', '{"nombre": "Laptop HP Pavilion 15", "precio": 1850000}', 'Carga inicial de datos de ejemplo', TRUE),
+('productos', 2, 'CREATE', 'DATOS_INICIALES', '{"nombre": "iPhone 13 Pro Max", "precio": 4500000}', 'Carga inicial de datos de ejemplo', TRUE),
+('clientes', 1, 'CREATE', 'DATOS_INICIALES', '{"nombre": "María González Pérez", "email": "maria.gonzalez@email.com"}', 'Carga inicial de datos de ejemplo', TRUE),
+('clientes', 2, 'CREATE', 'DATOS_INICIALES', '{"nombre": "Carlos Andrés Rodríguez", "email": "carlos.rodriguez@email.com"}', 'Carga inicial de datos de ejemplo', TRUE);
+
+-- Conteos por hora del historial existente (después, la API los mantiene sola)
+INSERT INTO resumen_auditoria_hora (hora, grupo_responsable, tabla_afectada, operacion, total)
+SELECT date_trunc('hour', fecha_operacion), grupo_responsable, tabla_afectada, operacion, COUNT(*)
+FROM historial_auditoria
+GROUP BY 1, 2, 3, 4
+ON CONFLICT (hora, grupo_responsable, tabla_afectada, operacion, particion) DO NOTHING;
 
 
 -- ========================================
@@ -0,0 +1,151 @@
+"""
+========================================
+SERVIDOR DE PRODUCCIÓN
+========================================
+Inicia la API con varios procesos (workers) para aprovechar todos los
+núcleos de la CPU, sin recarga automática.
+
+Diferencias con 'python main.py' (modo desarrollo):
+- Varios workers (por defecto uno por núcleo)
+- uvloop y httptools si están instalados (más rápidos que asyncio/h11)
+- Las tablas se crean UNA vez antes de iniciar los workers
+- El pool de conexiones se reparte entre los workers para no superar
+  el máximo de conexiones de PostgreSQL (con al menos una conexión por
+  worker: nunca hay más workers que conexiones)
+- Apagado ordenado: al recibir Ctrl+C / SIGTERM se dejan de aceptar
+  conexiones y se espera a que terminen las peticiones en curso
+
+USO:
+    python servidor.py
+    python servidor.py --workers 4 --max-conexiones-bd 40
+"""
+
+import argparse
+import importlib.util
+import os
+from typing import Optional, Sequence, Tuple
+
+import uvicorn
+
+from app.config import settings
+
+
+def calcular_pool(max_conexiones: int, workers: int) -> Tuple[int, int]:
+    """
+    Reparte un total de conexiones a PostgreSQL entre los workers.
+
+    Args:
+        max_conexiones: Conexiones totales disponibles para la API
+        workers: Número de procesos
+
+    Returns:
+        Tuple[int, int]: (pool_size, max_overflow) para cada worker
+
+    Raises:
+        ValueError: Si hay más workers que conexiones (cada uno necesita
+                    al menos una y el total superaría max_conexiones)
+    """
+    if workers > max_conexiones:
+        raise ValueError(
+            f"{workers} workers necesitan al menos {workers} conexiones a PostgreSQL "
+            f"y el máximo es {max_conexiones}"
+        )
+    por_worker = max_conexiones // workers
+    # Sin overflow: así el total nunca supera max_conexiones
+    return por_worker, 0
+
+
+def elegir_implementaciones() -> Tuple[str, str]:
+    """
+    Usa uvloop y httptools solo si están instalados (no existen en Windows).
+
+    Returns:
+        Tuple[str, str]: (loop, http) para uvicorn
+    """
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    return loop, http
+
+
+def verificar_aplicacion() -> None:
+    """
+    Importa la aplicación una vez en el proceso principal.
+
+    Si hay un error de configuración o de conexión, el servidor falla
+    aquí antes de iniciar los workers. También crea las tablas una sola
+    vez, en lugar de que cada worker lo intente al mismo tiempo.
+
+    No ahorra memoria ni tiempo de arranque en los workers: uvicorn los
+    inicia como procesos nuevos (spawn) que vuelven a importar 'main:app'
+    por su cuenta, sin compartir nada con este proceso.
+    """
+    import main  # noqa: F401  (importar ejecuta create_all)
+    from app.database import cerrar_conexiones
+
+    # Los workers abren sus propias conexiones; el proceso principal no las necesita
+    cerrar_conexiones()
+    os.environ["CREAR_TABLAS_AL_INICIAR"] = "false"
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Lee los argumentos e inicia uvicorn con los workers configurados"""
+    parser = argparse.ArgumentParser(description="Servidor de producción de la API Tienda Virtual")
+    parser.add_argument("--host", default=settings.SERVIDOR_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVIDOR_PUERTO)
+    parser.add_argument(
+        "--workers", type=int, default=settings.SERVIDOR_WORKERS,
+        help="Número de procesos (0 = uno por núcleo de CPU)"
+    )
+    parser.add_argument(
+        "--max-conexiones-bd", type=int, default=settings.SERVIDOR_MAX_CONEXIONES_BD,
+        help="Conexiones a PostgreSQL a repartir entre todos los workers (0 = usar DB_POOL_SIZE)"
+    )
+    parser.add_argument(
+        "--tiempo-apagado", type=int, default=settings.SERVIDOR_TIEMPO_APAGADO,
+        help="Segundos para terminar las peticiones en curso al apagar"
+    )
+    args = parser.parse_args(argv)
+
+    workers = args.workers or os.cpu_count() or 1
+
+    # Los workers leen el tamaño del pool desde las variables de entorno
+    if args.max_conexiones_bd:
+        if not args.workers and workers > args.max_conexiones_bd:
+            # Uno por núcleo no cabe en el presupuesto: se usan menos workers
+            workers = args.max_conexiones_bd
+        try:
+            pool_size, max_overflow = calcular_pool(args.max_conexiones_bd, workers)
+        except ValueError as error:
+            parser.error(f"{error}: usa menos --workers o más --max-conexiones-bd")
+        os.environ["DB_POOL_SIZE"] = str(pool_size)
+        os.environ["DB_MAX_OVERFLOW"] = str(max_overflow)
+    else:
+        pool_size, max_overflow = settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW
+
+    loop, http = elegir_implementaciones()
+
+    print("=" * 60)
+    print("🚀 SERVIDOR DE PRODUCCIÓN - API TIENDA VIRTUAL")
+    print("=" * 60)
+    print(f"Workers: {workers}  |  loop: {loop}  |  http: {http}")
+    print(f"Pool por worker: {pool_size} (+{max_overflow} extra)")
+    print(f"Escuchando en: http://{args.host}:{args.port}")
+    print("=" * 60)
+
+    verificar_aplicacion()
+
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        reload=False,
+        proxy_headers=True,
+        timeout_graceful_shutdown=args.tiempo_apagado,
+    )
+
+
+if __name__ == "__main__":
+    main()